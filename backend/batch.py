@@ -0,0 +1,453 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.bundle import MODEL_PATHS, process_rss_mb
+from backend.ingest import DEFAULT_CHUNK_SIZE
+from backend.predict import load_predictor, configured_predictor_options
+from backend.preprocessing import nonfinite_policies_key
+from backend.registry import ModelRegistry
+from backend import config
+
+# Input files picked up in the input directory, by (lower-case) name suffix
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2", ".csv.xz", ".csv.zst")
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+# Output layout: <output>/<input path relative to the input directory>/part-NNNNN.parquet,
+# one part per scored chunk, plus a checkpoint file per input and one for the run
+PART_NAME = "part-{:05d}.parquet"
+CHECKPOINT_FILE = "_checkpoint.json"
+RUN_FILE = "_batch.json"
+
+# Predictor loaded once in each pool worker by _init_worker
+_worker_predictor = None
+_worker_progress = None
+
+
+def input_format(path):
+    name = Path(path).name.lower()
+    if name.endswith(CSV_SUFFIXES):
+        return "csv"
+    if name.endswith(PARQUET_SUFFIXES):
+        return "parquet"
+    return None
+
+
+def find_inputs(input_path, exclude=None) -> list:
+    """
+    CSV and Parquet files under `input_path` (or the file itself), in name
+    order, leaving out anything under `exclude` (e.g. an output directory
+    inside the input directory, whose part files are Parquet too).
+    """
+    input_path = Path(input_path)
+    if input_path.is_file():
+        return [input_path]
+    exclude = Path(exclude).resolve() if exclude is not None else None
+    return sorted(
+        path for path in input_path.rglob("*")
+        if path.is_file() and input_format(path) and not any(part.startswith(".") for part in path.parts)
+        and not (exclude is not None and path.resolve().is_relative_to(exclude))
+    )
+
+
+def source_key(path) -> dict:
+    """Identifies one version of an input file; a changed file is scored again from the start."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_columns(path) -> list:
+    if input_format(path) == "parquet":
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_input_chunks(path, positions, chunk_size: int = DEFAULT_CHUNK_SIZE, start_row: int = 0):
+    """
+    Read only the columns at `positions` of a CSV or Parquet file, at most
+    `chunk_size` rows at a time, beginning at data row `start_row`. Skipped
+    CSV lines are not parsed; skipped Parquet row groups are not read.
+    """
+    if input_format(path) == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        row_groups, skipped = [], 0
+        for i in range(parquet_file.num_row_groups):
+            group_rows = parquet_file.metadata.row_group(i).num_rows
+            if skipped + group_rows <= start_row:
+                skipped += group_rows
+            else:
+                row_groups.append(i)
+        batches = parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups,
+                                            columns=[names[i] for i in positions])
+        for batch in batches:
+            if skipped < start_row:
+                drop = min(start_row - skipped, batch.num_rows)
+                batch, skipped = batch.slice(drop), skipped + drop
+                if batch.num_rows == 0:
+                    continue
+            yield batch.to_pandas()
+        return
+
+    # Header line stays, the first `start_row` data lines are skipped
+    reader = pd.read_csv(path, usecols=positions, chunksize=chunk_size,
+                         skiprows=range(1, start_row + 1) if start_row else None)
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def write_json(path, data: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
+def write_part(results: pd.DataFrame, path):
+    # Written under a temporary name, so an existing part is always complete
+    results.attrs = {}
+    tmp_path = path.with_name(path.name + ".tmp")
+    pq.write_table(pa.Table.from_pandas(results, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def clear_outputs(part_dir):
+    """Remove the parts and checkpoint this tool wrote for one input; other files are left alone."""
+    for path in part_dir.glob("part-*.parquet*"):
+        path.unlink()
+    for path in part_dir.glob(CHECKPOINT_FILE + "*"):
+        path.unlink()
+
+
+def completed_checkpoint(part_dir, key: dict):
+    """The checkpoint of a finished input, or None if this version of it still needs scoring."""
+    try:
+        checkpoint = json.loads((part_dir / CHECKPOINT_FILE).read_text())
+    except FileNotFoundError:
+        return None
+    return checkpoint if checkpoint["complete"] and checkpoint["source_key"] == key else None
+
+
+def resume_point(part_dir, key: dict):
+    """
+    (checkpoint, rows scored, next part) for one input's output directory.
+    The checkpoint is None when nothing usable was written for this
+    version of the input; leftovers of another version are removed.
+    """
+    try:
+        checkpoint = json.loads((part_dir / CHECKPOINT_FILE).read_text())
+    except FileNotFoundError:
+        checkpoint = None
+    if checkpoint is None or checkpoint["source_key"] != key:
+        clear_outputs(part_dir)
+        return None, 0, 0
+
+    for path in part_dir.glob("part-*.parquet.tmp"):
+        path.unlink()
+    rows, part = 0, 0
+    while (part_dir / PART_NAME.format(part)).is_file():
+        rows += pq.read_metadata(part_dir / PART_NAME.format(part)).num_rows
+        part += 1
+    return checkpoint, rows, part
+
+
+def score_file(predictor, path, part_dir, chunk_size: int = DEFAULT_CHUNK_SIZE, on_chunk=None) -> dict:
+    """
+    Score one input file chunk by chunk into Parquet parts under
+    `part_dir`, continuing after the parts a previous run left there.
+    Returns the file's checkpoint record once every row is written.
+    """
+    path, part_dir = Path(path), Path(part_dir)
+    part_dir.mkdir(parents=True, exist_ok=True)
+    key = source_key(path)
+    checkpoint, rows, part = resume_point(part_dir, key)
+    if checkpoint is not None and checkpoint["complete"]:
+        return checkpoint
+
+    plan = predictor.schema_plan(read_columns(path))
+    # Read only the columns the model uses; keep one if none match so rows are still counted
+    positions = sorted(raw_pos for raw_pos, _ in plan.sources) or [0]
+    checkpoint = {
+        "source": str(path),
+        "source_key": key,
+        "complete": False,
+        "model_fingerprint": predictor.fingerprint,
+        "missing_columns": plan.missing_columns,
+    }
+    write_json(part_dir / CHECKPOINT_FILE, checkpoint)
+
+    resumed_rows = rows
+    replaced = Counter()
+    start_time = time.perf_counter()
+    for df in iter_input_chunks(path, positions, chunk_size, start_row=rows):
+        results = predictor.predict_frame(predictor.align(df, replaced=replaced))
+        results.insert(0, "row", np.arange(rows, rows + len(results), dtype=np.int64))
+        write_part(results, part_dir / PART_NAME.format(part))
+        rows += len(results)
+        part += 1
+        if on_chunk is not None:
+            on_chunk(len(results))
+
+    seconds = time.perf_counter() - start_time
+    checkpoint.update({
+        "complete": True,
+        "rows": rows,
+        "parts": part,
+        "resumed_at_row": resumed_rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round((rows - resumed_rows) / seconds, 1) if seconds > 0 else None,
+        "sanitized_values": dict(replaced),
+        "completed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+    write_json(part_dir / CHECKPOINT_FILE, checkpoint)
+    return checkpoint
+
+
+def _init_worker(predictor_kwargs, progress):
+    global _worker_predictor, _worker_progress
+    _worker_predictor = load_predictor(**predictor_kwargs)
+    _worker_progress = progress
+
+
+def _score_file_task(path, part_dir, chunk_size):
+    return score_file(_worker_predictor, path, part_dir, chunk_size,
+                      on_chunk=lambda rows: _worker_progress.put(rows))
+
+
+class BatchScorer:
+    """
+    Scores every CSV/Parquet file under `input_dir` into partitioned
+    Parquet output under `output_dir`, one file per worker process at a
+    time, `chunk_size` rows per step, so memory stays bounded by
+    workers x chunk_size however large the archive is. Each written part
+    is a checkpoint: running again over the same directories skips
+    finished files and continues partial ones after their last part.
+    """
+
+    def __init__(self, input_dir, output_dir, source: dict, predictor_options: dict = None, workers: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, model_version: str = None):
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.source = source
+        self.predictor_options = predictor_options or {}
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.predictor = load_predictor(**source, **self.predictor_options)
+        self.model_version = model_version or f"sha-{self.predictor.fingerprint[:12]}"
+        self.rows_scored = 0
+        self.failed = {}
+
+    def part_dir(self, path):
+        base = self.input_dir if self.input_dir.is_dir() else self.input_dir.parent
+        return self.output_dir / path.relative_to(base)
+
+    def check_run(self, restart: bool):
+        """
+        Outputs of one model, dtype and set of non-finite policies are never
+        mixed: resuming a run scored with other settings requires `restart`,
+        which discards it.
+        """
+        run_path = self.output_dir / RUN_FILE
+        settings = {
+            "model_fingerprint": self.predictor.fingerprint,
+            "dtype": np.dtype(self.predictor.dtype).name,
+            "nonfinite_policies": json.loads(nonfinite_policies_key(self.predictor.nonfinite_policies)),
+        }
+        if run_path.is_file():
+            previous = json.loads(run_path.read_text())
+            if not restart and any(previous.get(name) != value for name, value in settings.items()):
+                raise RuntimeError(
+                    f"{self.output_dir} holds results of model {previous.get('model_version')} "
+                    f"({previous.get('dtype')}) scored with other settings; "
+                    f"score into another directory or pass --restart"
+                )
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        write_json(run_path, {
+            "input": str(self.input_dir),
+            "model_version": self.model_version,
+            **settings,
+            "chunk_size": self.chunk_size,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+
+    def run(self, restart: bool = False, report_every: float = 10.0) -> dict:
+        self.check_run(restart)
+        inputs = find_inputs(self.input_dir, exclude=self.output_dir)
+        if restart:
+            for path in inputs:
+                clear_outputs(self.part_dir(path))
+
+        self.started_at = time.perf_counter()
+        self.last_report = self.started_at
+        self.report_every = report_every
+        self.rows_scored = 0
+        self.failed = {}
+        self.files_total = len(inputs)
+        self.checkpoints = {}
+
+        # Files finished by an earlier run are not handed to a worker again
+        todo = []
+        for path in inputs:
+            checkpoint = completed_checkpoint(self.part_dir(path), source_key(path))
+            if checkpoint is not None:
+                self.checkpoints[path] = checkpoint
+            else:
+                todo.append(path)
+
+        if self.workers <= 1:
+            for path in todo:
+                try:
+                    self.checkpoints[path] = score_file(self.predictor, path, self.part_dir(path), self.chunk_size,
+                                                        on_chunk=self._on_rows)
+                except Exception as e:
+                    self._on_failure(path, e)
+        else:
+            self._run_pool(todo)
+
+        summary = self.summary()
+        write_json(self.output_dir / RUN_FILE, {
+            **json.loads((self.output_dir / RUN_FILE).read_text()),
+            "completed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **{name: summary[name] for name in ("files", "files_failed", "rows", "rows_scored", "rows_per_second")},
+            "failed": summary["failed"],
+        })
+        return summary
+
+    def _run_pool(self, inputs):
+        context = get_context()
+        progress = context.Queue()
+        pool = ProcessPoolExecutor(max_workers=min(self.workers, max(len(inputs), 1)), mp_context=context,
+                                   initializer=_init_worker, initargs=({**self.source, **self.predictor_options},
+                                                                      progress))
+        try:
+            futures = {pool.submit(_score_file_task, path, self.part_dir(path), self.chunk_size): path
+                       for path in inputs}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                self._drain(progress)
+                for future in done:
+                    try:
+                        self.checkpoints[futures[future]] = future.result()
+                    except Exception as e:
+                        self._on_failure(futures[future], e)
+            self._drain(progress)
+        finally:
+            # Interrupted runs keep every part written so far; running again resumes after them
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _drain(self, progress):
+        while True:
+            try:
+                rows = progress.get_nowait()
+            except queue.Empty:
+                return
+            self._on_rows(rows)
+
+    def _on_rows(self, rows: int):
+        self.rows_scored += rows
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            self.report()
+
+    def _on_failure(self, path, error):
+        self.failed[str(path)] = str(error)
+        print(f"[BATCH] Failed to score {path}: {error}")
+
+    def report(self):
+        seconds = time.perf_counter() - self.started_at
+        rate = self.rows_scored / seconds if seconds > 0 else 0.0
+        print(f"[BATCH] {self.rows_scored:,} rows scored, {rate:,.0f} rows/s, "
+              f"{len(self.checkpoints)}/{self.files_total} files done, RSS {process_rss_mb()} MB", flush=True)
+
+    def summary(self) -> dict:
+        seconds = time.perf_counter() - self.started_at
+        return {
+            "model_version": self.model_version,
+            "files": len(self.checkpoints),
+            "files_failed": len(self.failed),
+            # All rows in the output, including those written by earlier runs
+            "rows": sum(checkpoint["rows"] for checkpoint in self.checkpoints.values()),
+            "rows_scored": self.rows_scored,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows_scored / seconds, 1) if seconds > 0 else None,
+            "failed": self.failed,
+        }
+
+
+def model_source(version: str = None, bundle_path: str = None):
+    """
+    (version, load_predictor source): a registry version when named or
+    active (like the API), otherwise the bundle or the model pickles.
+    """
+    registry = ModelRegistry(config.MODEL_REGISTRY)
+    version = version or (None if bundle_path else registry.active_version())
+    if version:
+        if not registry.has_version(version):
+            raise KeyError(version)
+        return version, dict(bundle_path=str(registry.bundle_path(version)))
+    bundle_path = bundle_path or config.MODEL_BUNDLE
+    if bundle_path:
+        return None, dict(bundle_path=bundle_path)
+    return None, dict(MODEL_PATHS)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score archived flow files (CSV or Parquet) into partitioned Parquet. "
+                    "Run the same command again to resume an interrupted run."
+    )
+    parser.add_argument("input", help="directory of CSV/Parquet flow files, or one file")
+    parser.add_argument("output", help="output directory (one subdirectory of parts per input file)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk and output part")
+    parser.add_argument("--model-version", help="registry version to score with (default: the active one)")
+    parser.add_argument("--bundle", help="model bundle to score with instead of the registry")
+    parser.add_argument("--float32", action="store_true", default=bool(config.FLOAT32), help="score in float32")
+    parser.add_argument("--restart", action="store_true", help="discard earlier outputs instead of resuming")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if not Path(args.input).exists():
+        parser.error(f"{args.input} does not exist")
+    try:
+        version, source = model_source(args.model_version, args.bundle)
+    except KeyError:
+        parser.error(f"unknown model version: {args.model_version}")
+
+    options = {**configured_predictor_options(), "float32": args.float32}
+    scorer = BatchScorer(args.input, args.output, source, options, workers=args.workers,
+                         chunk_size=args.chunk_size, model_version=version)
+    print(f"[BATCH] Scoring {args.input} with model {scorer.model_version} into {args.output}, "
+          f"{args.workers} workers")
+    try:
+        summary = scorer.run(restart=args.restart, report_every=args.report_every)
+    except RuntimeError as e:
+        print(f"[BATCH] {e}")
+        sys.exit(2)
+    except KeyboardInterrupt:
+        print("[BATCH] Interrupted; run the same command again to resume")
+        sys.exit(130)
+    scorer.report()
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["files_failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
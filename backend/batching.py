@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesces small scoring calls from concurrent requests. Feature matrices
+    submitted within `max_wait_ms` of the first one (or until `max_rows` rows
+    are pending) are stacked, scored with a single `score_fn` call and the
+    result frame is split back to each caller in submission order.
+    """
+
+    def __init__(self, score_fn, max_wait_ms: float, max_rows: int):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ids-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict_frame(self, features: np.ndarray) -> pd.DataFrame:
+        return self.submit(features).result()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            self._score_batch(batch)
+            if stop:
+                return
+
+    def _score_batch(self, batch):
+        try:
+            if len(batch) == 1:
+                stacked = batch[0][0]
+            else:
+                stacked = np.vstack([features for features, _ in batch])
+            results = self.score_fn(stacked)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        sizes = [len(features) for features, _ in batch]
+        if len(batch) > 1:
+            # Dedup counts and stage times cover the whole batch; each caller
+            # is attributed a share proportional to its rows
+            dedup = {name: split_count(value, sizes) for name, value in results.attrs.get("dedup", {}).items()}
+            stages = {
+                name: ([seconds * size / len(results) for size in sizes], split_count(rows, sizes))
+                for name, (seconds, rows) in results.attrs.get("stages", {}).items()
+            }
+
+        offset = 0
+        for i, (n, (_, future)) in enumerate(zip(sizes, batch)):
+            part = results.iloc[offset:offset + n].reset_index(drop=True)
+            if len(batch) > 1:
+                part.attrs = {key: value for key, value in results.attrs.items() if key not in ("dedup", "stages")}
+                if dedup:
+                    part.attrs["dedup"] = {name: shares[i] for name, shares in dedup.items()}
+                if stages:
+                    part.attrs["stages"] = {name: (seconds[i], rows[i]) for name, (seconds, rows) in stages.items()}
+            future.set_result(part)
+            offset += n
+
+
+def split_count(total: int, sizes: list) -> list:
+    """Split an integer `total` over parts proportionally to `sizes`; the shares add up to `total`."""
+    rows = sum(sizes)
+    if not rows:
+        return [0] * len(sizes)
+    shares = [total * size // rows for size in sizes]
+    # Hand the rounding remainder to the largest fractional parts
+    remainders = sorted(range(len(sizes)), key=lambda i: total * sizes[i] % rows, reverse=True)
+    for i in remainders[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+BUNDLE_FORMAT = "ids-model-bundle"
+BUNDLE_VERSION = 1
+
+MODELS_DIR = Path(__file__).parent / "models"
+DEFAULT_BUNDLE_PATH = MODELS_DIR / "ids_model.bundle"
+
+
+def pickle_paths(models_dir=MODELS_DIR) -> dict:
+    """model_path/scaler_path/encoder_path/pca_path of the individual artifact pickles in `models_dir`."""
+    models_dir = Path(models_dir)
+    return dict(
+        model_path=str(models_dir / "best_hids_model.pkl"),
+        scaler_path=str(models_dir / "scaler_model.pkl"),
+        encoder_path=str(models_dir / "label_encoder.pkl"),
+        pca_path=str(models_dir / "pca_model.pkl"),
+    )
+
+
+# The pickles in backend/models, as keyword arguments of Predictor/load_predictor
+MODEL_PATHS = pickle_paths()
+
+
+def build_bundle(output_path, model_path, scaler_path, encoder_path, pca_path) -> dict:
+    """
+    Pack the model, scaler, encoder, PCA, feature column list and the
+    verified fused scaler/PCA projection into one uncompressed joblib file,
+    so Predictor.from_bundle can memory-map its NumPy arrays. Returns the
+    manifest stored in the bundle.
+    """
+    from backend.predict import Predictor
+
+    predictor = Predictor(model_path, scaler_path, encoder_path, pca_path)
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fingerprint": predictor.fingerprint,
+        "artifacts": predictor.artifact_hashes,
+        "components": {
+            name: type(getattr(predictor, name)).__name__ for name in ("model", "scaler", "encoder", "pca")
+        },
+        "feature_count": len(predictor.feature_columns),
+        "classes": [str(label) for label in predictor.proba_labels],
+        "fused_projection": predictor.projection is not None,
+        "library_versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__,
+            "joblib": joblib.__version__,
+        },
+    }
+    payload = {
+        "manifest": manifest,
+        "model": predictor.model,
+        "scaler": predictor.scaler,
+        "encoder": predictor.encoder,
+        "pca": predictor.pca,
+        "feature_columns": predictor.feature_columns,
+        "projection": predictor.projection,
+    }
+
+    output_path = Path(output_path)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    joblib.dump(payload, tmp_path)
+    os.replace(tmp_path, output_path)
+    return manifest
+
+
+def load_bundle(path, mmap: bool = True) -> dict:
+    """
+    Load a bundle written by build_bundle. With mmap=True its NumPy arrays
+    are read-only memory maps of the file, shared by every process that
+    loads the same bundle.
+    """
+    try:
+        payload = joblib.load(path, mmap_mode="r" if mmap else None)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model bundle '{path}': {e}")
+
+    manifest = payload.get("manifest", {}) if isinstance(payload, dict) else {}
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise RuntimeError(f"'{path}' is not a model bundle")
+    if manifest.get("version") != BUNDLE_VERSION:
+        raise RuntimeError(f"Unsupported model bundle version {manifest.get('version')} in '{path}'")
+
+    built_with = manifest.get("library_versions", {}).get("scikit-learn")
+    if built_with != sklearn.__version__:
+        warnings.warn(f"Model bundle was built with scikit-learn {built_with}, running {sklearn.__version__}")
+    return payload
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def process_rss_mb():
+    """Current resident set size of this process in MB, or None where /proc is unavailable."""
+    return _proc_status_mb("VmRSS")
+
+
+def process_peak_rss_mb():
+    """
+    Largest resident set size this process has reached, in MB: VmHWM (which
+    /proc/self/clear_refs can reset), else ru_maxrss.
+    """
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KB on Linux but in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a model artifact bundle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="pack the model pickles into one bundle")
+    build.add_argument("--models-dir", default=str(MODELS_DIR))
+    build.add_argument("--output", default=str(DEFAULT_BUNDLE_PATH))
+
+    info = commands.add_parser("info", help="print a bundle's manifest")
+    info.add_argument("path", nargs="?", default=str(DEFAULT_BUNDLE_PATH))
+
+    args = parser.parse_args()
+    if args.command == "build":
+        manifest = build_bundle(args.output, **pickle_paths(args.models_dir))
+        print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        manifest = load_bundle(args.path, mmap=False)["manifest"]
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_upload(fileobj) -> str:
+    """SHA-256 of a seekable upload, read in blocks; the stream is rewound afterwards."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(upload_hash: str, model_fingerprint: str, **options) -> str:
+    """Key over the upload bytes, the loaded model artifacts and response options."""
+    parts = [upload_hash, model_fingerprint] + [f"{name}={options[name]}" for name in sorted(options)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of encoded response bodies with entry-count, total-size and
+    TTL limits. With `directory` set, bodies are kept on disk (and survive
+    restarts); otherwise they are kept in memory.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int, directory=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.directory = Path(directory) if directory else None
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        # key -> (created_at, media_type, size, body or None when on disk)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / f"{key}.body"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self):
+        entries = []
+        for meta_path in self.directory.glob("*.json"):
+            key = meta_path.stem
+            try:
+                meta = json.loads(meta_path.read_text())
+                size = self._body_path(key).stat().st_size
+                last_used = meta_path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, key, meta, size))
+        for _, key, meta, size in sorted(entries):
+            self._entries[key] = (meta["created_at"], meta["media_type"], size, None)
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str):
+        """Return (body, media_type) or None; counts a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+        _, media_type, _, body = entry
+
+        if body is None:
+            try:
+                body = self._body_path(key).read_bytes()
+                # The metadata file's mtime records recency across restarts
+                os.utime(self._meta_path(key))
+            except OSError:
+                # The body file is gone (e.g. deleted by hand): a miss, and the entry is dropped
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        self._remove(key)
+                    self.misses += 1
+                return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return body, media_type
+
+    def put(self, key: str, body: bytes, media_type: str):
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        created_at = time.time()
+        if self.directory is not None:
+            tmp_path = self._body_path(key).with_suffix(".tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, self._body_path(key))
+            self._meta_path(key).write_text(json.dumps({"created_at": created_at, "media_type": media_type}))
+            stored = None
+        else:
+            stored = body
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, delete_files=False)
+            self._entries[key] = (created_at, media_type, len(body), stored)
+            self.total_bytes += len(body)
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str, delete_files: bool = True):
+        _, _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+        if self.directory is not None and delete_files:
+            self._body_path(key).unlink(missing_ok=True)
+            self._meta_path(key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "directory": str(self.directory) if self.directory else None,
+            }
+
+
+class RowResultCache:
+    """
+    LRU of recently scored feature rows (keyed by their raw bytes) to their
+    (label, confidence). Shared by all requests scored by one Predictor.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, rows):
+        """Return (keys, cached) where cached[i] is (label, confidence) or None."""
+        keys = [row.tobytes() for row in rows]
+        cached = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                cached.append(entry)
+        return keys, cached
+
+    def store(self, keys, labels, confidences):
+        with self._lock:
+            for key, label, confidence in zip(keys, labels, confidences):
+                self._entries[key] = (label, confidence)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
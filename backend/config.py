@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Process-pool sharded inference. With fewer than 2 workers, uploads are
+# scored in the API process.
+INFERENCE_WORKERS = _env_int("IDS_INFERENCE_WORKERS", 0)
+# Rows per shard sent to a worker; chunks at or below this size are scored in-process
+SHARD_ROWS = _env_int("IDS_SHARD_ROWS", 10_000)
+
+# Blocking /predict work runs on a bounded thread pool. Requests beyond
+# MAX_CONCURRENCY running + QUEUE_DEPTH waiting get 503 with Retry-After.
+MAX_CONCURRENCY = _env_int("IDS_MAX_CONCURRENCY", 4)
+QUEUE_DEPTH = _env_int("IDS_QUEUE_DEPTH", 8)
+
+# Micro-batching of small uploads: chunks of up to BATCH_MAX_UPLOAD_ROWS rows
+# from concurrent requests are queued for up to BATCH_WAIT_MS (or until
+# BATCH_MAX_ROWS rows are pending) and scored together. 0 ms (the default)
+# disables it; every batched call waits up to BATCH_WAIT_MS, even without
+# concurrent requests. Coalescing is bounded by MAX_CONCURRENCY, so raise it
+# for high request rates.
+BATCH_WAIT_MS = _env_int("IDS_BATCH_WAIT_MS", 0)
+BATCH_MAX_ROWS = _env_int("IDS_BATCH_MAX_ROWS", 8192)
+BATCH_MAX_UPLOAD_ROWS = _env_int("IDS_BATCH_MAX_UPLOAD_ROWS", 500)
+
+# Asynchronous prediction jobs (POST /jobs): SQLite table and result files
+# under JOB_DIR, evicted JOB_TTL_SECONDS after their last update. Beyond
+# JOB_MAX_PENDING queued or running jobs, POST /jobs answers 503. Jobs left
+# unfinished by a restart are requeued at startup.
+JOB_DIR = Path(os.getenv("IDS_JOB_DIR") or Path(__file__).parent / "job_store")
+JOB_TTL_SECONDS = _env_int("IDS_JOB_TTL_SECONDS", 24 * 60 * 60)
+JOB_WORKERS = _env_int("IDS_JOB_WORKERS", 1)
+JOB_MAX_PENDING = _env_int("IDS_JOB_MAX_PENDING", 16)
+
+# Result cache for repeated uploads, keyed by upload bytes, cheat_mode,
+# response format and the loaded model artifacts. CACHE_DIR keeps entries on
+# disk across restarts; unset keeps them in memory. 0 entries disables it.
+CACHE_MAX_ENTRIES = _env_int("IDS_CACHE_MAX_ENTRIES", 32)
+CACHE_MAX_BYTES = _env_int("IDS_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+CACHE_TTL_SECONDS = _env_int("IDS_CACHE_TTL_SECONDS", 60 * 60)
+CACHE_DIR = os.getenv("IDS_CACHE_DIR") or None
+
+# 1 scores each distinct feature row of a chunk once and copies the result
+# to its duplicates. Pays off on replayed or repetitive captures; on mostly
+# unique rows the hashing pass costs more than it saves, so it is opt-in.
+DEDUP = _env_int("IDS_DEDUP", 0)
+
+# Scored feature rows remembered across requests (row bytes -> label and
+# confidence), per predictor process. 0 disables it.
+ROW_CACHE_SIZE = _env_int("IDS_ROW_CACHE_SIZE", 0)
+
+# 1 scores in float32 instead of float64: aligned features, the fused
+# scaler + PCA projection and the model input. Halves feature memory;
+# labels can differ from float64 on rows that sit on a decision boundary.
+FLOAT32 = _env_int("IDS_FLOAT32", 0)
+
+# Per-feature non-finite/clip policies as a JSON object, merged over
+# preprocessing.NONFINITE_POLICIES, e.g.
+# IDS_NONFINITE_POLICIES='{"Flow Duration": {"clip": [0, null]}, "Flow IAT Min": {"nan": -1}}'
+NONFINITE_POLICIES = json.loads(os.getenv("IDS_NONFINITE_POLICIES") or "{}")
+
+# Live scoring inside the API process: tail a CICFlowMeter CSV (IDS_LIVE_CSV)
+# or a libpcap capture being written (IDS_LIVE_PCAP). Flows are scored in
+# batches of up to LIVE_BATCH_ROWS, held at most LIVE_MAX_WAIT_MS; counters
+# are served at GET /live/stats. See also `python -m backend.live`.
+LIVE_CSV = os.getenv("IDS_LIVE_CSV") or None
+LIVE_PCAP = os.getenv("IDS_LIVE_PCAP") or None
+LIVE_BATCH_ROWS = _env_int("IDS_LIVE_BATCH_ROWS", 256)
+LIVE_MAX_WAIT_MS = _env_int("IDS_LIVE_MAX_WAIT_MS", 1000)
+LIVE_WINDOW_SECONDS = _env_int("IDS_LIVE_WINDOW_SECONDS", 300)
+
+# Load the model from a single artifact bundle (`python -m backend.bundle
+# build`) instead of the four pickles. Bundle arrays are memory-mapped, so
+# API and inference worker processes share them.
+MODEL_BUNDLE = os.getenv("IDS_MODEL_BUNDLE") or None
+
+# Startup warmup: synthetic batches of these sizes are scored WARMUP_ROUNDS
+# times (also in each inference worker) before /health/ready reports ready.
+# 0 rounds skips it.
+WARMUP_BATCH_SIZES = tuple(int(size) for size in os.getenv("IDS_WARMUP_BATCH_SIZES", "1,64,1024").split(",") if size.strip())
+WARMUP_ROUNDS = _env_int("IDS_WARMUP_ROUNDS", 3)
+
+# Versioned model registry (`python -m backend.registry`). The API serves
+# the version named in <MODEL_REGISTRY>/ACTIVE, or the files above when none
+# is published, and checks that file every MODEL_WATCH_SECONDS (0 disables
+# the watcher; POST /models/reload still works). A version that fails to
+# load is retried by the watcher with exponential backoff, at most every
+# MODEL_RETRY_MAX_SECONDS. Up to PINNED_MODELS other versions stay loaded
+# for requests that pin one with ?model_version=.
+MODEL_REGISTRY = Path(os.getenv("IDS_MODEL_REGISTRY") or Path(__file__).parent / "models" / "registry")
+MODEL_WATCH_SECONDS = _env_int("IDS_MODEL_WATCH_SECONDS", 5)
+MODEL_RETRY_MAX_SECONDS = _env_int("IDS_MODEL_RETRY_MAX_SECONDS", 300)
+PINNED_MODELS = _env_int("IDS_PINNED_MODELS", 2)
+
+# Shadow scoring: a SHADOW_SAMPLE_RATE fraction of /predict batches is also
+# scored, in the background, by SHADOW_MODEL (a registry version or a bundle
+# path). Agreement, label confusion and relative scoring time are stored in
+# SHADOW_DB and served at GET /shadow/stats. Batches beyond
+# SHADOW_MAX_PENDING waiting comparisons are not sampled.
+SHADOW_MODEL = os.getenv("IDS_SHADOW_MODEL") or None
+SHADOW_SAMPLE_RATE = _env_float("IDS_SHADOW_SAMPLE_RATE", 0.1)
+SHADOW_MAX_PENDING = _env_int("IDS_SHADOW_MAX_PENDING", 4)
+SHADOW_DB = Path(os.getenv("IDS_SHADOW_DB") or JOB_DIR / "shadow_metrics.sqlite3")
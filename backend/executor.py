@@ -0,0 +1,163 @@
+import asyncio
+import multiprocessing
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import time
+from backend.bundle import process_rss_mb
+from backend.metrics import add_stage
+from backend.predict import load_predictor, RESULT_COLUMNS
+
+# Predictor loaded once in each pool worker by _init_worker
+_worker_predictor = None
+# Shared by the pool's workers so a warmup task holds its worker until
+# every worker has one
+_warmup_barrier = None
+WARMUP_BARRIER_TIMEOUT = 300
+# Workers start from a fresh interpreter, not a fork of the multi-threaded
+# server, whose child could inherit locks held by other threads; each one
+# loads the predictor in _init_worker anyway
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _init_worker(predictor_kwargs, warmup_barrier=None):
+    global _worker_predictor, _warmup_barrier
+    _warmup_barrier = warmup_barrier
+    start_time = time.time()
+    _worker_predictor = load_predictor(**predictor_kwargs)
+    print(f"[STARTUP] Inference worker {os.getpid()} loaded the model in {time.time() - start_time:.2f}s, "
+          f"RSS {process_rss_mb()} MB")
+
+
+def _score_shard(features):
+    return _worker_predictor.predict_frame(features)
+
+
+def _warmup_worker(batch_sizes, rounds):
+    report = _worker_predictor.warmup(batch_sizes, rounds)
+    if _warmup_barrier is not None:
+        try:
+            _warmup_barrier.wait(WARMUP_BARRIER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            # A worker died or never started; the others are warm regardless
+            pass
+    return os.getpid(), report
+
+
+class ShardedPredictor:
+    """
+    Scores aligned feature matrices across a process pool. Every worker
+    loads the model artifacts once; matrices are split into row shards of
+    `shard_rows`, scored in parallel and reassembled in input order.
+    """
+
+    def __init__(self, predictor_kwargs: dict, workers: int, shard_rows: int):
+        self.workers = workers
+        self.shard_rows = shard_rows
+        context = multiprocessing.get_context(START_METHOD)
+        self._warmup_barrier = context.Barrier(workers)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(predictor_kwargs, self._warmup_barrier),
+        )
+
+    def predict_frame(self, features: np.ndarray) -> pd.DataFrame:
+        shards = [features[start:start + self.shard_rows] for start in range(0, len(features), self.shard_rows)]
+        if not shards:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        frames = list(self.pool.map(_score_shard, shards))
+        results = pd.concat(frames, ignore_index=True)
+        # Rows are deduplicated within each shard; report the totals
+        dedup = Counter()
+        for frame in frames:
+            dedup.update(frame.attrs.get("dedup", {}))
+        results.attrs = {"dedup": dict(dedup)} if dedup else {}
+        # Stage times are summed over workers, so they can exceed the wall time
+        stages = {}
+        for frame in frames:
+            for name, (seconds, rows) in frame.attrs.get("stages", {}).items():
+                add_stage(stages, name, seconds, rows)
+        if stages:
+            results.attrs["stages"] = stages
+        return results
+
+    def warmup(self, batch_sizes, rounds) -> dict:
+        """
+        Start every worker process and run Predictor.warmup in each exactly
+        once; returns the warmup report keyed by worker pid. Each task waits
+        at a barrier until all `workers` tasks are running, so no worker can
+        pick up a second one.
+        """
+        futures = [self.pool.submit(_warmup_worker, batch_sizes, rounds) for _ in range(self.workers)]
+        return dict(future.result() for future in futures)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ServerBusyError(RuntimeError):
+    """Raised when a BoundedExecutor has no free running or queued slot."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking calls off the event loop on a thread pool with admission
+    control: at most `max_workers` calls run and `queue_depth` more may wait.
+    Further submissions fail fast with ServerBusyError instead of queueing.
+    """
+
+    def __init__(self, max_workers: int, queue_depth: int, name: str = "ids-worker"):
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + queue_depth)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def acquire(self):
+        """
+        Take a running/queued slot or raise ServerBusyError. Pair with release().
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServerBusyError(
+                f"Server busy: {self.max_workers} running and {self.queue_depth} queued requests"
+            )
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        self.acquire()
+        try:
+            future = self.pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        # Release on completion, not when the awaiting request goes away
+        future.add_done_callback(lambda _future: self.release())
+        return future
+
+    def submit_held(self, fn, *args, **kwargs):
+        """
+        Submit to the pool for a caller that already holds a slot from
+        acquire(), e.g. each step of a streamed response.
+        """
+        return self.pool.submit(fn, *args, **kwargs)
+
+    async def run_held(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit_held(fn, *args, **kwargs))
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,636 @@
+import copy
+import math
+import mmap
+import socket
+import struct
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from backend.preprocessing import MODEL_FEATURES
+
+# Identifier columns written before the features, as in CICFlowMeter output
+FLOW_ID_COLUMNS = ['Flow ID', 'Src IP', 'Src Port', 'Dst IP', 'Protocol', 'Timestamp']
+
+# CICFlowMeter defaults: flows are cut after FLOW_TIMEOUT; a gap longer than
+# ACTIVITY_TIMEOUT ends an active period, a gap over SUBFLOW_GAP a subflow
+FLOW_TIMEOUT = 120_000_000
+ACTIVITY_TIMEOUT = 5_000_000
+SUBFLOW_GAP = 1_000_000
+
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1),
+    b"\xa1\xb2\xc3\xd4": (">", 1),
+    b"\x4d\x3c\xb2\xa1": ("<", 1000),
+    b"\xa1\xb2\x3c\x4d": (">", 1000),
+}
+
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_INTERFACE = 1
+PCAPNG_PACKET = 2
+PCAPNG_SIMPLE_PACKET = 3
+PCAPNG_ENHANCED_PACKET = 6
+PCAPNG_IF_TSRESOL = 9
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+TCP = 6
+UDP = 17
+
+FIN, SYN, RST, PSH, ACK, URG, ECE, CWR = 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80
+
+
+class Packet:
+    __slots__ = ("timestamp", "src", "dst", "sport", "dport", "protocol",
+                 "payload_length", "header_length", "flags", "window")
+
+    def __init__(self, timestamp, src, dst, sport, dport, protocol, payload_length, header_length,
+                 flags=0, window=0):
+        self.timestamp = timestamp  # microseconds
+        self.src = src  # packed address bytes
+        self.dst = dst
+        self.sport = sport
+        self.dport = dport
+        self.protocol = protocol
+        self.payload_length = payload_length
+        self.header_length = header_length
+        self.flags = flags
+        self.window = window
+
+
+def read_pcap(fileobj, follow: bool = False, poll_interval: float = 0.5):
+    """
+    Yield (timestamp_us, linktype, frame_bytes) from a classic libpcap
+    stream. With follow=True the reader waits for packets appended to a
+    capture that is still being written (e.g. tcpdump -U -w) and yields
+    None after each empty poll so callers can expire idle flows.
+    """
+    header = _read_exact(fileobj, 24, follow, poll_interval)
+    if header is None or header[:4] not in PCAP_MAGIC:
+        raise ValueError("Not a libpcap capture file (pcapng is not supported)")
+    endian, ts_divisor = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+
+    while True:
+        position = fileobj.tell()
+        record_header = fileobj.read(16)
+        if len(record_header) == 16:
+            ts_sec, ts_frac, captured, _ = record.unpack(record_header)
+            data = fileobj.read(captured)
+            if len(data) == captured:
+                yield ts_sec * 1_000_000 + ts_frac // ts_divisor, linktype, data
+                continue
+        if not follow:
+            return
+        # Partial record: the writer has not flushed it yet
+        fileobj.seek(position)
+        yield None
+        time.sleep(poll_interval)
+
+
+@contextmanager
+def capture_buffer(source):
+    """
+    Read-only view of a capture: a path or a real file is memory-mapped,
+    a BytesIO is shared, anything else is read into memory.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source)
+        return
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            yield view
+        return
+
+    fileobj = open(source, "rb") if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__") else source
+    try:
+        try:
+            mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            fileobj.seek(0)
+            yield memoryview(fileobj.read())
+            return
+        try:
+            with memoryview(mapped) as view:
+                yield view
+        finally:
+            mapped.close()
+    finally:
+        if fileobj is not source:
+            fileobj.close()
+
+
+def iter_frames(buffer):
+    """
+    Yield (timestamp_us, linktype, frame) for every packet in a libpcap or
+    pcapng capture held in `buffer`. Frames are memoryview slices of the
+    buffer (no copies), valid only while the buffer is.
+    """
+    if len(buffer) < 24:
+        raise ValueError("Capture file is too short")
+    magic = bytes(buffer[:4])
+    if magic in PCAP_MAGIC:
+        return _iter_pcap_frames(buffer, *PCAP_MAGIC[magic])
+    if struct.unpack_from("<I", buffer, 0)[0] == PCAPNG_SECTION_HEADER:
+        return _iter_pcapng_frames(buffer)
+    raise ValueError("Not a pcap or pcapng capture file")
+
+
+def _iter_pcap_frames(buffer, endian, ts_divisor):
+    linktype = struct.unpack_from(endian + "I", buffer, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+    offset, end = 24, len(buffer)
+    while offset + 16 <= end:
+        ts_sec, ts_frac, captured, _ = record.unpack_from(buffer, offset)
+        offset += 16
+        if offset + captured > end:
+            return  # truncated last record
+        yield ts_sec * 1_000_000 + ts_frac // ts_divisor, linktype, buffer[offset:offset + captured]
+        offset += captured
+
+
+def _iter_pcapng_frames(buffer):
+    endian = "<"
+    interfaces = []  # (linktype, snaplen, ticks per second, resolution is a power of 2)
+    offset, end = 0, len(buffer)
+    last_timestamp = 0
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(endian + "I", buffer, offset)[0]
+        if block_type == PCAPNG_SECTION_HEADER:
+            byte_order = struct.unpack_from("<I", buffer, offset + 8)[0]
+            endian = "<" if byte_order == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            interfaces = []
+        block_length = struct.unpack_from(endian + "I", buffer, offset + 4)[0]
+        if block_length < 12 or offset + block_length > end:
+            return  # truncated or corrupt trailing block
+        body = offset + 8
+
+        if block_type == PCAPNG_INTERFACE:
+            linktype, _, snaplen = struct.unpack_from(endian + "HHI", buffer, body)
+            interfaces.append((linktype, snaplen, *_pcapng_tsresol(buffer, body + 8, offset + block_length - 4, endian)))
+        elif block_type == PCAPNG_ENHANCED_PACKET:
+            interface, ts_high, ts_low, captured = struct.unpack_from(endian + "IIII", buffer, body)
+            if interface < len(interfaces):
+                linktype, _, ticks = interfaces[interface]
+                last_timestamp = _pcapng_microseconds((ts_high << 32) | ts_low, ticks)
+                yield last_timestamp, linktype, buffer[body + 20:body + 20 + captured]
+        elif block_type == PCAPNG_PACKET:
+            interface, _, ts_high, ts_low, captured = struct.unpack_from(endian + "HHIII", buffer, body)
+            if interface < len(interfaces):
+                linktype, _, ticks = interfaces[interface]
+                last_timestamp = _pcapng_microseconds((ts_high << 32) | ts_low, ticks)
+                yield last_timestamp, linktype, buffer[body + 20:body + 20 + captured]
+        elif block_type == PCAPNG_SIMPLE_PACKET and interfaces:
+            # No timestamp in simple packet blocks: keep the previous one
+            linktype, snaplen, _ = interfaces[0]
+            original = struct.unpack_from(endian + "I", buffer, body)[0]
+            captured = min(original, snaplen or original, block_length - 16)
+            yield last_timestamp, linktype, buffer[body + 4:body + 4 + captured]
+        offset += block_length
+
+
+def _pcapng_tsresol(buffer, offset, end, endian):
+    """Ticks per second from an interface block's options (default microseconds)."""
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(endian + "HH", buffer, offset)
+        if code == 0:
+            break
+        if code == PCAPNG_IF_TSRESOL and length >= 1:
+            value = buffer[offset + 4]
+            return (2 ** (value & 0x7F) if value & 0x80 else 10 ** value,)
+        offset += 4 + (length + 3) // 4 * 4
+    return (1_000_000,)
+
+
+def _pcapng_microseconds(ticks, ticks_per_second):
+    if ticks_per_second == 1_000_000:
+        return ticks
+    return ticks * 1_000_000 // ticks_per_second
+
+
+def _read_exact(fileobj, size, follow, poll_interval):
+    data = fileobj.read(size)
+    while follow and len(data) < size:
+        time.sleep(poll_interval)
+        data += fileobj.read(size - len(data))
+    return data if len(data) == size else None
+
+
+def parse_frame(timestamp, linktype, frame):
+    """
+    Decode the IPv4/IPv6 TCP or UDP packet in a captured frame. Returns a
+    Packet, or None for anything else (ARP, ICMP, fragments, truncation).
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 12)[0]
+        offset = 14
+        while ethertype in (0x8100, 0x88A8) and len(frame) >= offset + 4:
+            ethertype = struct.unpack_from("!H", frame, offset + 2)[0]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 14)[0]
+        offset = 16
+    elif linktype == LINKTYPE_NULL:
+        if len(frame) < 4:
+            return None
+        family = struct.unpack_from("<I", frame, 0)[0]
+        ethertype = 0x0800 if family == 2 else 0x86DD
+        offset = 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if not frame:
+            return None
+        ethertype = 0x0800 if frame[0] >> 4 == 4 else 0x86DD
+        offset = 0
+    else:
+        return None
+
+    if ethertype == 0x0800:
+        if len(frame) < offset + 20:
+            return None
+        ihl = (frame[offset] & 0x0F) * 4
+        total_length, fragment = struct.unpack_from("!H2xH", frame, offset + 2)
+        if fragment & 0x1FFF:
+            return None
+        protocol = frame[offset + 9]
+        src = bytes(frame[offset + 12:offset + 16])
+        dst = bytes(frame[offset + 16:offset + 20])
+        ip_payload = total_length - ihl
+        offset += ihl
+    elif ethertype == 0x86DD:
+        if len(frame) < offset + 40:
+            return None
+        ip_payload = struct.unpack_from("!H", frame, offset + 4)[0]
+        protocol = frame[offset + 6]
+        src = bytes(frame[offset + 8:offset + 24])
+        dst = bytes(frame[offset + 24:offset + 40])
+        offset += 40
+    else:
+        return None
+
+    if protocol == TCP:
+        if len(frame) < offset + 20:
+            return None
+        sport, dport = struct.unpack_from("!HH", frame, offset)
+        header_length = (frame[offset + 12] >> 4) * 4
+        flags = frame[offset + 13]
+        window = struct.unpack_from("!H", frame, offset + 14)[0]
+        return Packet(timestamp, src, dst, sport, dport, TCP, max(ip_payload - header_length, 0),
+                      header_length, flags, window)
+    if protocol == UDP:
+        if len(frame) < offset + 8:
+            return None
+        sport, dport = struct.unpack_from("!HH", frame, offset)
+        return Packet(timestamp, src, dst, sport, dport, UDP, max(ip_payload - 8, 0), 8)
+    return None
+
+
+def address_text(raw: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+class RunningStats:
+    """
+    Count, sum, min, max, mean and variance of a stream of values, updated
+    per value (Welford's algorithm) without keeping the values.
+    """
+
+    __slots__ = ("n", "total", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = 0
+        self.max = 0
+
+    def add(self, value):
+        self.n += 1
+        self.total += value
+        if self.n == 1:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, 0 for fewer than two values (as CICFlowMeter reports)."""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Flow:
+    """
+    Running statistics of one bidirectional TCP/UDP conversation; the first
+    packet's sender is the forward direction.
+    """
+
+    __slots__ = (
+        "src", "dst", "sport", "dport", "protocol", "start", "last_seen", "last_fwd", "last_bwd",
+        "fwd_lengths", "bwd_lengths", "all_lengths", "flow_iat", "fwd_iat", "bwd_iat",
+        "fwd_header_bytes", "bwd_header_bytes", "fwd_min_header", "flag_counts", "fwd_psh", "fwd_urg",
+        "fwd_init_window", "bwd_init_window", "fwd_data_packets", "fin_seen", "subflows",
+        "active", "idle", "active_start", "active_end",
+    )
+
+    def __init__(self, packet: Packet):
+        self.src, self.dst = packet.src, packet.dst
+        self.sport, self.dport = packet.sport, packet.dport
+        self.protocol = packet.protocol
+        self.start = packet.timestamp
+        self.last_seen = None
+        self.last_fwd = self.last_bwd = None
+        self.fwd_lengths, self.bwd_lengths, self.all_lengths = RunningStats(), RunningStats(), RunningStats()
+        self.flow_iat, self.fwd_iat, self.bwd_iat = RunningStats(), RunningStats(), RunningStats()
+        self.fwd_header_bytes = 0
+        self.bwd_header_bytes = 0
+        self.fwd_min_header = None
+        self.flag_counts = {flag: 0 for flag in (FIN, SYN, RST, PSH, ACK, URG, ECE, CWR)}
+        self.fwd_psh = self.fwd_urg = 0
+        self.fwd_init_window = self.bwd_init_window = None
+        self.fwd_data_packets = 0
+        self.fin_seen = set()
+        self.subflows = 0
+        self.active, self.idle = RunningStats(), RunningStats()
+        self.active_start = self.active_end = packet.timestamp
+        self.add(packet)
+
+    def is_forward(self, packet: Packet) -> bool:
+        return packet.src == self.src and packet.sport == self.sport and packet.dst == self.dst
+
+    def add(self, packet: Packet):
+        ts = packet.timestamp
+        if self.last_seen is not None:
+            self.flow_iat.add(ts - self.last_seen)
+            if ts - self.last_seen > SUBFLOW_GAP:
+                self.subflows += 1
+                if ts - self.active_end > ACTIVITY_TIMEOUT:
+                    if self.active_end - self.active_start > 0:
+                        self.active.add(self.active_end - self.active_start)
+                    self.idle.add(ts - self.active_end)
+                    self.active_start = ts
+        self.active_end = ts
+        self.last_seen = ts
+
+        forward = self.is_forward(packet)
+        if forward:
+            self.fwd_lengths.add(packet.payload_length)
+            if self.last_fwd is not None:
+                self.fwd_iat.add(ts - self.last_fwd)
+            self.last_fwd = ts
+            self.fwd_header_bytes += packet.header_length
+            if self.fwd_min_header is None or packet.header_length < self.fwd_min_header:
+                self.fwd_min_header = packet.header_length
+            if packet.payload_length > 0:
+                self.fwd_data_packets += 1
+            if packet.flags & PSH:
+                self.fwd_psh += 1
+            if packet.flags & URG:
+                self.fwd_urg += 1
+            if self.fwd_init_window is None and packet.protocol == TCP:
+                self.fwd_init_window = packet.window
+        else:
+            self.bwd_lengths.add(packet.payload_length)
+            if self.last_bwd is not None:
+                self.bwd_iat.add(ts - self.last_bwd)
+            self.last_bwd = ts
+            self.bwd_header_bytes += packet.header_length
+            if self.bwd_init_window is None and packet.protocol == TCP:
+                self.bwd_init_window = packet.window
+        self.all_lengths.add(packet.payload_length)
+
+        if packet.flags:
+            for flag in self.flag_counts:
+                if packet.flags & flag:
+                    self.flag_counts[flag] += 1
+            if packet.flags & FIN:
+                self.fin_seen.add(forward)
+
+    @property
+    def finished(self) -> bool:
+        """TCP teardown seen: FIN from both sides, or a reset."""
+        return len(self.fin_seen) == 2 or self.flag_counts[RST] > 0
+
+    def flow_id(self) -> str:
+        return f"{address_text(self.src)}-{address_text(self.dst)}-{self.sport}-{self.dport}-{self.protocol}"
+
+    def features(self) -> dict:
+        """One CICFlowMeter-style row: FLOW_ID_COLUMNS followed by MODEL_FEATURES."""
+        duration = self.last_seen - self.start
+        seconds = duration / 1_000_000
+        fwd, bwd, both = self.fwd_lengths, self.bwd_lengths, self.all_lengths
+        flow_iat, fwd_iat, bwd_iat = self.flow_iat, self.fwd_iat, self.bwd_iat
+        active, idle = self.active, self.idle
+        if self.active_end - self.active_start > 0:
+            # The last active period ends with the flow (CICFlowMeter's endActiveIdleTime)
+            active = copy.copy(active)
+            active.add(self.active_end - self.active_start)
+
+        def rate(value):
+            # Zero-duration flows get the Infinity/NaN CICFlowMeter writes;
+            # the feature sanitizer applies the configured replacement
+            if seconds:
+                return value / seconds
+            return math.inf if value else math.nan
+
+        def per_subflow(value):
+            return value // self.subflows if self.subflows else 0
+
+        values = {
+            'Destination Port': self.dport,
+            'Flow Duration': duration,
+            'Total Fwd Packets': fwd.n,
+            'Total Backward Packets': bwd.n,
+            'Total Length of Fwd Packets': fwd.total,
+            'Total Length of Bwd Packets': bwd.total,
+            'Fwd Packet Length Max': fwd.max,
+            'Fwd Packet Length Min': fwd.min,
+            'Fwd Packet Length Mean': fwd.mean,
+            'Fwd Packet Length Std': fwd.std,
+            'Bwd Packet Length Max': bwd.max,
+            'Bwd Packet Length Min': bwd.min,
+            'Bwd Packet Length Mean': bwd.mean,
+            'Bwd Packet Length Std': bwd.std,
+            'Flow Bytes/s': rate(both.total),
+            'Flow Packets/s': rate(both.n),
+            'Flow IAT Mean': flow_iat.mean,
+            'Flow IAT Std': flow_iat.std,
+            'Flow IAT Max': flow_iat.max,
+            'Flow IAT Min': flow_iat.min,
+            'Fwd IAT Total': fwd_iat.total,
+            'Fwd IAT Mean': fwd_iat.mean,
+            'Fwd IAT Std': fwd_iat.std,
+            'Fwd IAT Max': fwd_iat.max,
+            'Fwd IAT Min': fwd_iat.min,
+            'Bwd IAT Total': bwd_iat.total,
+            'Bwd IAT Mean': bwd_iat.mean,
+            'Bwd IAT Std': bwd_iat.std,
+            'Bwd IAT Max': bwd_iat.max,
+            'Bwd IAT Min': bwd_iat.min,
+            'Fwd PSH Flags': self.fwd_psh,
+            'Fwd URG Flags': self.fwd_urg,
+            'Fwd Header Length': self.fwd_header_bytes,
+            'Bwd Header Length': self.bwd_header_bytes,
+            'Fwd Packets/s': fwd.n / seconds if seconds else 0.0,
+            'Bwd Packets/s': bwd.n / seconds if seconds else 0.0,
+            'Min Packet Length': both.min,
+            'Max Packet Length': both.max,
+            'Packet Length Mean': both.mean,
+            'Packet Length Std': both.std,
+            'Packet Length Variance': both.variance,
+            'FIN Flag Count': self.flag_counts[FIN],
+            'SYN Flag Count': self.flag_counts[SYN],
+            'RST Flag Count': self.flag_counts[RST],
+            'PSH Flag Count': self.flag_counts[PSH],
+            'ACK Flag Count': self.flag_counts[ACK],
+            'URG Flag Count': self.flag_counts[URG],
+            'CWE Flag Count': self.flag_counts[CWR],
+            'ECE Flag Count': self.flag_counts[ECE],
+            'Down/Up Ratio': bwd.n // fwd.n if fwd.n else 0,
+            'Average Packet Size': both.total / both.n,
+            'Avg Fwd Segment Size': fwd.mean,
+            'Avg Bwd Segment Size': bwd.mean,
+            'Fwd Header Length.1': self.fwd_header_bytes,
+            'Subflow Fwd Packets': per_subflow(fwd.n),
+            'Subflow Fwd Bytes': per_subflow(fwd.total),
+            'Subflow Bwd Packets': per_subflow(bwd.n),
+            'Subflow Bwd Bytes': per_subflow(bwd.total),
+            # CICFlowMeter 4 writes 0 when a direction has no TCP packets
+            'Init_Win_bytes_forward': self.fwd_init_window or 0,
+            'Init_Win_bytes_backward': self.bwd_init_window or 0,
+            'act_data_pkt_fwd': self.fwd_data_packets,
+            'min_seg_size_forward': self.fwd_min_header or 0,
+            'Active Mean': active.mean,
+            'Active Std': active.std,
+            'Active Max': active.max,
+            'Active Min': active.min,
+            'Idle Mean': idle.mean,
+            'Idle Std': idle.std,
+            'Idle Max': idle.max,
+            'Idle Min': idle.min,
+        }
+        row = {
+            'Flow ID': self.flow_id(),
+            'Src IP': address_text(self.src),
+            'Src Port': self.sport,
+            'Dst IP': address_text(self.dst),
+            'Protocol': self.protocol,
+            'Timestamp': datetime.fromtimestamp(self.start / 1_000_000).strftime("%d/%m/%Y %I:%M:%S %p"),
+        }
+        row.update(values)
+        return row
+
+
+class FlowAggregator:
+    """
+    Pure-Python CICFlowMeter substitute: groups packets into bidirectional
+    flows and emits a feature row when a flow closes (TCP FIN from both
+    sides or RST, FLOW_TIMEOUT since it started, or `idle_timeout` without
+    packets). Rows use the column names of feature_columns.txt.
+    """
+
+    def __init__(self, flow_timeout: int = FLOW_TIMEOUT, idle_timeout: int = FLOW_TIMEOUT):
+        self.flow_timeout = flow_timeout
+        self.idle_timeout = idle_timeout
+        self.flows = {}
+        self.packets = 0
+        self.clock = 0
+
+    @staticmethod
+    def _key(packet: Packet):
+        a, b = (packet.src, packet.sport), (packet.dst, packet.dport)
+        return (a, b, packet.protocol) if a <= b else (b, a, packet.protocol)
+
+    def add(self, packet: Packet) -> list:
+        """Add a packet; returns the rows of any flows it closed."""
+        self.packets += 1
+        self.clock = max(self.clock, packet.timestamp)
+        closed = []
+        key = self._key(packet)
+        flow = self.flows.get(key)
+        if flow is not None and packet.timestamp - flow.start > self.flow_timeout:
+            closed.append(self.flows.pop(key).features())
+            flow = None
+        if flow is None:
+            self.flows[key] = Flow(packet)
+        else:
+            flow.add(packet)
+            if flow.finished:
+                closed.append(self.flows.pop(key).features())
+        return closed
+
+    def expire(self, now: int = None) -> list:
+        """Close flows idle for longer than idle_timeout at `now` (capture clock, microseconds)."""
+        now = self.clock if now is None else now
+        expired = [key for key, flow in self.flows.items() if now - flow.last_seen > self.idle_timeout]
+        return [self.flows.pop(key).features() for key in expired]
+
+    def flush(self) -> list:
+        """Close every open flow, e.g. at the end of a capture."""
+        rows = [flow.features() for flow in self.flows.values()]
+        self.flows.clear()
+        return rows
+
+
+def iter_flow_rows(source, flow_timeout: int = FLOW_TIMEOUT, idle_timeout: int = FLOW_TIMEOUT,
+                   expire_every: int = 10_000):
+    """
+    Yield one feature row per flow in a pcap/pcapng capture (a path, file
+    object or bytes), in the order flows close.
+    """
+    aggregator = FlowAggregator(flow_timeout, idle_timeout)
+    with capture_buffer(source) as buffer:
+        frames = iter_frames(buffer)
+        item = None
+        try:
+            for item in frames:
+                packet = parse_frame(*item)
+                if packet is None:
+                    continue
+                yield from aggregator.add(packet)
+                if aggregator.packets % expire_every == 0:
+                    yield from aggregator.expire()
+        finally:
+            # Drop every slice of the buffer before a memory map is closed
+            item = None
+            frames.close()
+    yield from aggregator.flush()
+
+
+def iter_flow_frames(source, chunk_size: int = 50_000, **timeouts):
+    """Flows of a capture as DataFrames of up to `chunk_size` rows (FLOW_ID_COLUMNS + MODEL_FEATURES)."""
+    rows = []
+    for row in iter_flow_rows(source, **timeouts):
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows, columns=FLOW_ID_COLUMNS + MODEL_FEATURES)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=FLOW_ID_COLUMNS + MODEL_FEATURES)
+
+
+def extract_flows(source, **timeouts) -> pd.DataFrame:
+    """All flows of a capture as one DataFrame, ready for Predictor.predict_frame."""
+    frames = list(iter_flow_frames(source, **timeouts))
+    if not frames:
+        return pd.DataFrame(columns=FLOW_ID_COLUMNS + MODEL_FEATURES)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import Counter
+from pathlib import Path
+from backend.flows import iter_flow_frames
+from backend.predict import results_to_records
+from backend.metrics import StageTimer
+from backend.preprocessing import SchemaPlan
+
+# Rows parsed, preprocessed and scored at a time. Peak memory of /predict
+# scales with this value instead of with the size of the uploaded file.
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Upload formats accepted by /predict, chosen by content type, then by file extension
+PARQUET_CONTENT_TYPES = {"application/vnd.apache.parquet", "application/x-parquet", "application/parquet"}
+ARROW_CONTENT_TYPES = {
+    "application/vnd.apache.arrow.file", "application/vnd.apache.arrow.stream",
+    "application/x-apache-arrow", "application/x-arrow",
+}
+PCAP_CONTENT_TYPES = {"application/vnd.tcpdump.pcap", "application/x-pcap", "application/x-pcapng"}
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet", ".pq": "parquet",
+    ".arrow": "arrow", ".arrows": "arrow", ".feather": "arrow", ".ipc": "arrow",
+    ".pcap": "pcap", ".pcapng": "pcap", ".cap": "pcap",
+}
+FORMAT_NAMES = {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow IPC", "pcap": "pcap"}
+
+
+def detect_upload_format(content_type: str = None, filename: str = None) -> str:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in PARQUET_CONTENT_TYPES:
+        return "parquet"
+    if content_type in ARROW_CONTENT_TYPES:
+        return "arrow"
+    if content_type in PCAP_CONTENT_TYPES:
+        return "pcap"
+    if filename:
+        return FORMAT_EXTENSIONS.get(Path(filename).suffix.lower(), "csv")
+    return "csv"
+
+
+def iter_upload_chunks(fileobj, upload_format: str, chunk_size: int = DEFAULT_CHUNK_SIZE, schema_plan=SchemaPlan):
+    """
+    DataFrame chunks of an upload. `schema_plan` maps a header to its
+    SchemaPlan (e.g. Predictor.schema_plan); columnar formats read only
+    the columns it uses.
+    """
+    if upload_format == "parquet":
+        return iter_parquet_chunks(fileobj, chunk_size, schema_plan)
+    if upload_format == "arrow":
+        return iter_arrow_chunks(fileobj, chunk_size, schema_plan)
+    if upload_format == "pcap":
+        # Packet captures are turned into flow feature rows in-process
+        return iter_flow_frames(fileobj, chunk_size)
+    return iter_csv_chunks(fileobj, chunk_size)
+
+
+def _feature_source_columns(names, schema_plan):
+    # Columnar formats are projected to the columns the model uses; keep one
+    # column if none match so row counts are still read
+    columns = schema_plan(names).used_columns()
+    return columns or list(names[:1])
+
+
+def iter_parquet_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE, schema_plan=SchemaPlan):
+    """
+    Read only the model feature columns of a Parquet upload, `chunk_size`
+    rows at a time, as typed columns (no text decoding).
+    """
+    parquet_file = pq.ParquetFile(fileobj)
+    columns = _feature_source_columns(parquet_file.schema_arrow.names, schema_plan)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_arrow_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE, schema_plan=SchemaPlan):
+    """
+    Read an Arrow IPC upload (file/Feather v2 or stream format), selecting
+    the model feature columns from each record batch without copying.
+    """
+    try:
+        reader = pa.ipc.open_file(fileobj)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        fileobj.seek(0)
+        reader = pa.ipc.open_stream(fileobj)
+        batches = iter(reader)
+
+    columns = _feature_source_columns(reader.schema.names, schema_plan)
+    for batch in batches:
+        batch = batch.select(columns)
+        for offset in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(offset, chunk_size).to_pandas()
+
+
+def iter_csv_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Read a binary CSV stream as DataFrames of at most `chunk_size` rows.
+    The stream is decoded incrementally, so the raw upload is never held
+    in memory as a single bytes/str object.
+    """
+    reader = pd.read_csv(fileobj, chunksize=chunk_size, encoding='utf-8')
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+class PredictionAccumulator:
+    """
+    Merges per-chunk result frames (see Predictor.predict_frame) into the
+    totals reported by /predict. With keep_results=False only the totals are
+    kept, e.g. when results are streamed out as they are scored. Per-stage
+    timings are collected in `timer`; with report_timings=True the summary
+    includes their breakdown.
+    """
+
+    def __init__(self, keep_results: bool = True, report_timings: bool = False):
+        self.keep_results = keep_results
+        self.report_timings = report_timings
+        self.timer = StageTimer()
+        self.total_flows = 0
+        self.attack_counts = Counter()
+        # Non-finite/out-of-range feature values replaced during alignment
+        self.sanitized_values = Counter()
+        # Row deduplication counts reported by Predictor (attrs["dedup"])
+        self.dedup = Counter()
+        self.prediction_time = 0.0
+        # Registry version (or artifact fingerprint) of the model that scored the rows
+        self.model_version = None
+        self.frames = []
+        self._confidence_sum = 0.0
+        self._confidence_count = 0
+        self._confidence_min = None
+        self._confidence_max = None
+
+    def add(self, results: pd.DataFrame):
+        self.total_flows += len(results)
+        if self.keep_results:
+            self.frames.append(results)
+        self.dedup.update(results.attrs.get("dedup", {}))
+        self.timer.merge(results.attrs.get("stages", {}))
+        if results.empty:
+            return
+
+        # Count labels in order of first appearance, like Counter(labels)
+        labels = results["predicted_label"].to_numpy()
+        unique_labels, first_index, counts = np.unique(labels, return_index=True, return_counts=True)
+        for i in np.argsort(first_index):
+            self.attack_counts[unique_labels[i]] += int(counts[i])
+
+        confidences = pd.to_numeric(results["confidence_score"]).dropna().to_numpy()
+        if not len(confidences):
+            return
+        self._confidence_sum += float(confidences.sum())
+        self._confidence_count += len(confidences)
+        chunk_min, chunk_max = float(confidences.min()), float(confidences.max())
+        if self._confidence_min is None or chunk_min < self._confidence_min:
+            self._confidence_min = chunk_min
+        if self._confidence_max is None or chunk_max > self._confidence_max:
+            self._confidence_max = chunk_max
+
+    def summary_stats(self):
+        if not self._confidence_count:
+            return {}
+        return {
+            "average_confidence": self._confidence_sum / self._confidence_count,
+            "max_confidence": self._confidence_max,
+            "min_confidence": self._confidence_min,
+        }
+
+    def dedup_stats(self):
+        rows = self.dedup["rows"]
+        return {
+            "rows": rows,
+            "unique_rows": self.dedup["unique_rows"],
+            "dedup_ratio": round(1 - self.dedup["unique_rows"] / rows, 4) if rows else 0.0,
+            "row_cache_hits": self.dedup["row_cache_hits"],
+        }
+
+    def summary(self, cheat_mode: bool) -> dict:
+        summary = {
+            "total_flows": self.total_flows,
+            "attack_counts": {str(label): count for label, count in self.attack_counts.items()},
+            "summary_stats": self.summary_stats(),
+            "sanitized_values": dict(self.sanitized_values),
+            "dedup": self.dedup_stats(),
+            "cheat_mode": cheat_mode,
+            "prediction_time_seconds": round(self.prediction_time, 3),
+            "model_version": self.model_version,
+        }
+        if self.report_timings:
+            summary["timings"] = self.timer.breakdown()
+        return summary
+
+    def detailed_results(self):
+        records = []
+        for frame in self.frames:
+            records.extend(results_to_records(frame))
+        return records
@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from backend.executor import ServerBusyError
+
+
+class JobStore:
+    """
+    SQLite-backed job table plus one JSON result file per finished job, all
+    under `root`. Jobs not updated for `ttl_seconds` are evicted with their
+    files. Job status is one of queued, running, done or failed.
+    """
+
+    def __init__(self, root, ttl_seconds: int):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.uploads_dir = self.root / "uploads"
+        self.results_dir = self.root / "results"
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "jobs.sqlite3"
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    upload_format TEXT,
+                    cheat_mode INTEGER,
+                    rows_scored INTEGER DEFAULT 0,
+                    elapsed_seconds REAL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the store safe across threads
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upload_path(self, job_id: str) -> Path:
+        return self.uploads_dir / job_id
+
+    def result_path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.json"
+
+    def create(self, filename: str, upload_format: str, cheat_mode: bool) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, filename, upload_format, cheat_mode, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, upload_format, int(cheat_mode), now, now),
+            )
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def save_result(self, job_id: str, result: dict):
+        tmp_path = self.result_path(job_id).with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, self.result_path(job_id))
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def unfinished(self) -> list:
+        """Jobs still queued or running, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            expired = [row["job_id"] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE updated_at < ?", (cutoff,)
+            )]
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in expired])
+        for job_id in expired:
+            self.result_path(job_id).unlink(missing_ok=True)
+            self.upload_path(job_id).unlink(missing_ok=True)
+        return len(expired)
+
+
+class JobManager:
+    """
+    Runs prediction jobs on a small thread pool. `score_fn(fileobj,
+    upload_format, cheat_mode, on_progress)` scores an upload with the
+    process-wide predictor and returns the /predict JSON body;
+    on_progress(rows_scored) is called after every chunk. At most
+    `max_pending` jobs are queued or running; submit() raises
+    ServerBusyError beyond that.
+    """
+
+    def __init__(self, store: JobStore, score_fn, workers: int, max_pending: int = 16):
+        self.store = store
+        self.score_fn = score_fn
+        self.max_pending = max_pending
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ids-job")
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    def submit(self, fileobj, filename: str, upload_format: str, cheat_mode: bool) -> str:
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise ServerBusyError(f"{self._pending} jobs are already queued or running; retry later")
+            self._pending += 1
+        job_id = None
+        try:
+            self.evict_expired()
+            job_id = self.store.create(filename, upload_format, cheat_mode)
+            with open(self.store.upload_path(job_id), "wb") as f:
+                shutil.copyfileobj(fileobj, f, 1024 * 1024)
+        except BaseException as e:
+            self._job_finished()
+            if job_id is not None:
+                # A partial upload must not be requeued by recover()
+                self.store.upload_path(job_id).unlink(missing_ok=True)
+                self.store.update(job_id, status="failed", error=f"Upload failed: {e}")
+            raise
+        self.pool.submit(self._run, job_id, upload_format, cheat_mode)
+        return job_id
+
+    def recover(self) -> dict:
+        """
+        Requeue the jobs a previous process left queued or running (their
+        uploads are still on disk) and mark those without an upload failed.
+        Call once at startup, before new jobs are submitted.
+        """
+        requeued = failed = 0
+        for job in self.store.unfinished():
+            job_id = job["job_id"]
+            if self.store.upload_path(job_id).is_file():
+                self.store.update(job_id, status="queued", rows_scored=0, elapsed_seconds=0)
+                with self._pending_lock:
+                    self._pending += 1
+                self.pool.submit(self._run, job_id, job["upload_format"], bool(job["cheat_mode"]))
+                requeued += 1
+            else:
+                self.store.update(job_id, status="failed", error="Interrupted by a server restart; submit it again")
+                failed += 1
+        if requeued or failed:
+            print(f"[JOBS] Requeued {requeued} and failed {failed} jobs left unfinished by the last run")
+        return {"requeued": requeued, "failed": failed}
+
+    def _job_finished(self):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _run(self, job_id: str, upload_format: str, cheat_mode: bool):
+        try:
+            self._score(job_id, upload_format, cheat_mode)
+        finally:
+            self._job_finished()
+
+    def _score(self, job_id: str, upload_format: str, cheat_mode: bool):
+        start_time = time.time()
+        self.store.update(job_id, status="running")
+
+        def on_progress(rows_scored):
+            self.store.update(job_id, rows_scored=rows_scored, elapsed_seconds=time.time() - start_time)
+
+        upload_path = self.store.upload_path(job_id)
+        try:
+            with open(upload_path, "rb") as f:
+                result = self.score_fn(f, upload_format, cheat_mode, on_progress)
+            self.store.save_result(job_id, result)
+            self.store.update(job_id, status="done", rows_scored=result["total_flows"],
+                              elapsed_seconds=time.time() - start_time)
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            self.store.update(job_id, status="failed", error=error, elapsed_seconds=time.time() - start_time)
+        finally:
+            upload_path.unlink(missing_ok=True)
+
+    def status(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        elapsed = job["elapsed_seconds"] or 0.0
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "filename": job["filename"],
+            "rows_scored": job["rows_scored"],
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(job["rows_scored"] / elapsed, 1) if elapsed > 0 else None,
+            "error": job["error"],
+            "created_at": job["created_at"],
+        }
+
+    def evict_expired(self):
+        with self._evict_lock:
+            return self.store.evict_expired()
+
+    def shutdown(self):
+        # Cancelled jobs stay queued with their uploads and are requeued by the next recover()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,345 @@
+import argparse
+import os
+import threading
+import time
+from collections import Counter, deque
+from io import BytesIO
+
+import pandas as pd
+
+from backend.bundle import MODEL_PATHS
+from backend.flows import FlowAggregator, read_pcap, parse_frame, iter_flow_rows, FLOW_TIMEOUT
+from backend.predict import Predictor, configured_predictor_options
+from backend import config
+
+
+
+def tail_csv(path, from_start: bool = False, poll_interval: float = 0.5, max_rows: int = 1000, on_error=None):
+    """
+    Follow a CSV that another process (e.g. CICFlowMeter) keeps appending
+    to. Yields DataFrames of up to `max_rows` newly completed lines, or
+    None after a poll that found nothing. Starts at the end of the file
+    unless `from_start`; a truncated or replaced file is read from the top.
+    A file that does not exist (yet, or again after rotation) is waited for.
+    Lines that cannot be parsed are skipped and reported to `on_error`.
+    """
+    while True:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            # Every line of the file once it appears is new
+            from_start = True
+            yield None
+            time.sleep(poll_interval)
+            continue
+        with f:
+            header = f.readline()
+            while not header.endswith(b"\n"):
+                yield None
+                time.sleep(poll_interval)
+                header += f.readline()
+            # Starting at the end may land inside a line still being written;
+            # its remainder is skipped rather than parsed as a whole row
+            skip_line = False
+            if not from_start:
+                end = f.seek(0, os.SEEK_END)
+                if end > len(header):
+                    f.seek(end - 1)
+                    skip_line = f.read(1) != b"\n"
+            from_start = True
+            inode = os.fstat(f.fileno()).st_ino
+            fields = header.count(b",")
+            partial = b""
+
+            while True:
+                lines = f.readlines()
+                while skip_line and lines:
+                    skip_line = not lines.pop(0).endswith(b"\n")
+                if lines and not lines[-1].endswith(b"\n"):
+                    partial += lines.pop()
+                if lines:
+                    lines[0] = partial + lines[0]
+                    partial = b""
+                    # Flow CSVs have no quoted fields, so a line with the wrong
+                    # number of commas is malformed (e.g. a torn write)
+                    complete = [line for line in lines if line.count(b",") == fields]
+                    if len(complete) < len(lines):
+                        _report_error(on_error, ValueError(f"Skipped {len(lines) - len(complete)} malformed lines"))
+                    for start in range(0, len(complete), max_rows):
+                        try:
+                            frame = pd.read_csv(BytesIO(header + b"".join(complete[start:start + max_rows])))
+                        except Exception as e:
+                            _report_error(on_error, e)
+                            continue
+                        yield frame
+                    continue
+
+                yield None
+                time.sleep(poll_interval)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_ino != inode or stat.st_size < f.tell():
+                    break
+
+
+def _report_error(on_error, error):
+    if on_error is not None:
+        on_error(error)
+    else:
+        print(f"[LIVE] {error}")
+
+
+def pcap_flow_rows(path, follow: bool = False, poll_interval: float = 0.5, idle_timeout: int = FLOW_TIMEOUT):
+    """
+    Read packets from a capture through FlowAggregator and yield lists of
+    closed-flow rows as flows finish. With follow=True a libpcap capture is
+    tailed; while no packets arrive, the capture clock is advanced by wall
+    time so idle flows still close, and None is yielded between polls
+    (also while the capture file does not exist yet).
+    """
+    if not follow:
+        for row in iter_flow_rows(path, idle_timeout=idle_timeout):
+            yield [row]
+        return
+
+    aggregator = FlowAggregator(idle_timeout=idle_timeout)
+    last_packet_at = time.monotonic()
+    while True:
+        try:
+            f = open(path, "rb")
+            break
+        except FileNotFoundError:
+            yield None
+            time.sleep(poll_interval)
+    with f:
+        for item in read_pcap(f, follow=True, poll_interval=poll_interval):
+            if item is None:
+                waited = int((time.monotonic() - last_packet_at) * 1_000_000)
+                yield aggregator.expire(aggregator.clock + waited) or None
+                continue
+
+            packet = parse_frame(*item)
+            if packet is None:
+                continue
+            last_packet_at = time.monotonic()
+            rows = aggregator.add(packet)
+            if aggregator.packets % 1000 == 0:
+                rows += aggregator.expire()
+            if rows:
+                yield rows
+    yield aggregator.flush()
+
+
+class LiveScorer:
+    """
+    Scores flows from a live source in small batches: rows are held until
+    `max_batch_rows` are pending or the oldest has waited `max_wait_seconds`.
+    Keeps per-label totals, per-label counts over the last `window_seconds`
+    and the delay between a flow reaching the scorer and its label.
+    """
+
+    def __init__(self, predictor: Predictor, max_batch_rows: int = 256, max_wait_seconds: float = 1.0,
+                 window_seconds: int = 300, on_batch=None):
+        self.predictor = predictor
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_seconds = max_wait_seconds
+        self.window_seconds = window_seconds
+        # Called as on_batch(rows_frame, results_frame) after every scored batch
+        self.on_batch = on_batch
+        self.totals = Counter()
+        self.batches = 0
+        # Failed batches (their rows are dropped) and source errors
+        self.errors = 0
+        self.dropped_rows = 0
+        self.last_error = None
+        self.started_at = time.time()
+        self.last_batch_at = None
+        self._buckets = deque()  # (second, Counter of labels)
+        self._latencies = deque(maxlen=1000)
+        self._pending = []
+        self._pending_rows = 0
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, source):
+        """
+        Consume a tail_csv/pcap_flow_rows style source until it ends or
+        stop() is called. A failing batch is logged and counted, and
+        scoring continues with the next one.
+        """
+        source = iter(source)
+        while True:
+            try:
+                item = next(source)
+            except StopIteration:
+                break
+            except Exception as e:
+                # A generator that raised cannot be resumed
+                self.record_error(e)
+                break
+            if self._stop.is_set():
+                break
+            try:
+                if item is not None:
+                    self.feed(item)
+                self.tick()
+            except Exception as e:
+                self.record_error(e)
+        self.flush()
+
+    def record_error(self, error, rows: int = 0):
+        with self._lock:
+            self.errors += 1
+            self.dropped_rows += rows
+            self.last_error = f"{type(error).__name__}: {error}"
+        print(f"[LIVE] Skipped a batch of {rows} rows: {self.last_error}" if rows else f"[LIVE] {self.last_error}")
+
+    def stop(self):
+        self._stop.set()
+
+    def feed(self, rows):
+        """Queue a DataFrame or a list of row dicts for scoring."""
+        if not isinstance(rows, pd.DataFrame):
+            rows = pd.DataFrame(rows)
+        if rows.empty:
+            return
+        now = time.time()
+        self._pending.append((rows, now))
+        self._pending_rows += len(rows)
+        if self._pending_since is None:
+            self._pending_since = now
+        if self._pending_rows >= self.max_batch_rows:
+            self.flush()
+
+    def tick(self):
+        if self._pending_since is not None and time.time() - self._pending_since >= self.max_wait_seconds:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._pending_rows = 0
+        self._pending_since = None
+
+        try:
+            rows = pd.concat([frame for frame, _ in pending], ignore_index=True)
+            results = self.predictor.predict_frame(rows)
+        except Exception as e:
+            self.record_error(e, rows=sum(len(frame) for frame, _ in pending))
+            return
+        scored_at = time.time()
+
+        counts = Counter(results["predicted_label"])
+        with self._lock:
+            self.totals.update(counts)
+            self.batches += 1
+            self.last_batch_at = scored_at
+            second = int(scored_at)
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1].update(counts)
+            else:
+                self._buckets.append((second, counts))
+            self._expire_buckets(scored_at)
+            for frame, received_at in pending:
+                self._latencies.extend([scored_at - received_at] * len(frame))
+
+        if self.on_batch is not None:
+            try:
+                self.on_batch(rows, results)
+            except Exception as e:
+                self.record_error(e)
+
+    def _expire_buckets(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.time()
+            self._expire_buckets(now)
+            window = Counter()
+            for _, counts in self._buckets:
+                window.update(counts)
+            latencies = list(self._latencies)
+            return {
+                "flows_scored": sum(self.totals.values()),
+                "batches": self.batches,
+                "label_totals": {str(label): count for label, count in self.totals.items()},
+                "window_seconds": self.window_seconds,
+                "label_window": {str(label): count for label, count in window.items()},
+                "pending_rows": self._pending_rows,
+                "errors": self.errors,
+                "dropped_rows": self.dropped_rows,
+                "last_error": self.last_error,
+                "detection_latency_seconds": {
+                    "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                    "max": round(max(latencies), 4) if latencies else None,
+                },
+                "last_batch_at": self.last_batch_at,
+                "uptime_seconds": round(now - self.started_at, 1),
+            }
+
+
+def open_source(csv_path=None, pcap_path=None, follow: bool = True, from_start: bool = False,
+                idle_timeout: int = FLOW_TIMEOUT, on_error=None):
+    if pcap_path:
+        return pcap_flow_rows(pcap_path, follow=follow, idle_timeout=idle_timeout)
+    if follow:
+        return tail_csv(csv_path, from_start=from_start, on_error=on_error)
+    return iter([pd.read_csv(csv_path)])
+
+
+def print_alerts(rows, results):
+    attacks = results["predicted_label"] != "BENIGN"
+    for i in attacks[attacks].index:
+        flow_id = rows["Flow ID"].iloc[i] if "Flow ID" in rows.columns else f"row {i}"
+        confidence = results["confidence_score"].iloc[i]
+        confidence = f"{confidence:.2f}" if confidence is not None and not pd.isna(confidence) else "n/a"
+        print(f"[ALERT] {results['predicted_label'].iloc[i]} ({confidence}) {flow_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score CICFlowMeter flows as they are produced.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CICFlowMeter CSV to tail")
+    source.add_argument("--pcap", help="pcap/pcapng capture to read (tail a libpcap file with --follow)")
+    parser.add_argument("--follow", action="store_true", help="keep reading the pcap as it grows")
+    parser.add_argument("--once", action="store_true", help="score the CSV's current rows and exit")
+    parser.add_argument("--from-start", action="store_true", help="also score rows already in the CSV")
+    parser.add_argument("--batch-rows", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=1.0, help="seconds a flow may wait for a batch")
+    parser.add_argument("--window", type=int, default=300, help="rolling counter window in seconds")
+    parser.add_argument("--idle-timeout", type=float, default=FLOW_TIMEOUT / 1_000_000,
+                        help="seconds without packets before a pcap flow is closed")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between counter reports")
+    args = parser.parse_args()
+
+    if config.MODEL_BUNDLE:
+        predictor = Predictor.from_bundle(config.MODEL_BUNDLE, **configured_predictor_options())
+    else:
+        predictor = Predictor(**MODEL_PATHS, **configured_predictor_options())
+    last_report = [time.time()]
+
+    def on_batch(rows, results):
+        print_alerts(rows, results)
+        if time.time() - last_report[0] >= args.report_every:
+            last_report[0] = time.time()
+            print(f"[LIVE] {scorer.stats()}")
+
+    scorer = LiveScorer(predictor, args.batch_rows, args.max_wait, args.window, on_batch=on_batch)
+    follow = args.follow if args.pcap else not args.once
+    source = open_source(args.csv, args.pcap, follow=follow, from_start=args.from_start,
+                         idle_timeout=int(args.idle_timeout * 1_000_000), on_error=scorer.record_error)
+    try:
+        scorer.run(source)
+    except KeyboardInterrupt:
+        scorer.flush()
+    print(f"[LIVE] {scorer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
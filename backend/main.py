@@ -1,17 +1,59 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-import pandas as pd
-from io import StringIO
-from backend.preprocessing import preprocess_uploaded_csv
-from backend.predict import Predictor
-from collections import Counter
-from pathlib import Path
-from typing import Dict, Any
+from backend.bundle import process_rss_mb, MODEL_PATHS
+from backend.registry import ModelRegistry, ModelManager
+from backend.predict import load_predictor, configured_predictor_options
+from backend.shadow import ShadowScorer, ShadowMetrics
+from backend.metrics import StageMetrics, timed_chunks
+from backend.preprocessing import nonfinite_policies_key
+from backend.ingest import (
+    iter_upload_chunks, detect_upload_format, PredictionAccumulator, DEFAULT_CHUNK_SIZE, FORMAT_NAMES
+)
+from backend.executor import BoundedExecutor, ServerBusyError
+from backend.jobs import JobStore, JobManager
+from backend.cache import ResultCache, hash_upload, cache_key
+from backend.live import LiveScorer, open_source, print_alerts
+from backend.responses import (
+    RESPONSE_FORMATS, NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE,
+    json_results, ndjson_lines, ndjson_summary, columnar_results, arrow_results,
+)
+from backend import config
+from contextlib import asynccontextmanager
+from io import BytesIO
+import anyio
+import asyncio
+import json
+import threading
 import time
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up off the event loop; /health/ready turns 200 once it is done
+    threading.Thread(target=run_warmup, name="ids-warmup", daemon=True).start()
+    job_manager.recover()
+    if live_scorer is not None:
+        threading.Thread(
+            target=live_scorer.run,
+            args=(open_source(config.LIVE_CSV, config.LIVE_PCAP, follow=True, on_error=live_scorer.record_error),),
+            name="ids-live", daemon=True,
+        ).start()
+    if config.MODEL_WATCH_SECONDS > 0:
+        models.watch(config.MODEL_WATCH_SECONDS, WARMUP_PLAN)
+    yield
+    if live_scorer is not None:
+        live_scorer.stop()
+    job_manager.shutdown()
+    predict_executor.shutdown()
+    if shadow_scorer is not None:
+        shadow_scorer.shutdown()
+    models.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ CORS middleware for frontend (Streamlit) to connect
 app.add_middleware(
@@ -27,55 +69,463 @@ app.add_middleware(
 def read_root():
     return {"message": "Backend is running!"}
 
+# ✅ Liveness: the process is up and serving requests
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive", "uptime_seconds": round(time.time() - STARTED_AT, 1)}
+
+# ✅ Readiness: model loaded and warmed up; 503 until then
+@app.get("/health/ready")
+def health_ready():
+    body = {"status": WARMUP["status"], "model_version": models.active.version, "startup": STARTUP, "warmup": WARMUP}
+    if WARMUP["status"] != "ready":
+        return JSONResponse(body, status_code=503, headers={"Retry-After": "1"})
+    return body
+
 # ✅ Set up paths and load model
-BASE_DIR = Path(__file__).parent  # backend folder
+PREDICTOR_OPTIONS = configured_predictor_options()
+
+# ✅ One memory-mapped bundle (IDS_MODEL_BUNDLE) or the individual pickles
+PREDICTOR_SOURCE = dict(bundle_path=config.MODEL_BUNDLE) if config.MODEL_BUNDLE else MODEL_PATHS
 
-predictor = Predictor(
-    model_path=str(BASE_DIR / 'models' / 'best_hids_model.pkl'),
-    scaler_path=str(BASE_DIR / 'models' / 'scaler_model.pkl'),
-    encoder_path=str(BASE_DIR / 'models' / 'label_encoder.pkl'),
-    pca_path=str(BASE_DIR / 'models' / 'pca_model.pkl')
+# ✅ The served model version comes from the registry (IDS_MODEL_REGISTRY) when
+# one is published there; it can be swapped at runtime without a restart.
+# Its process pool (IDS_INFERENCE_WORKERS > 1) and micro-batcher
+# (IDS_BATCH_WAIT_MS) are rebuilt with each version.
+STARTED_AT = start_time = time.time()
+models = ModelManager(
+    ModelRegistry(config.MODEL_REGISTRY), PREDICTOR_SOURCE, PREDICTOR_OPTIONS, max_pinned=config.PINNED_MODELS
 )
+STARTUP = {
+    "model_source": "registry" if models.registry.active_version() else "bundle" if config.MODEL_BUNDLE else "pickles",
+    "model_version": models.active.version,
+    "model_load_seconds": round(time.time() - start_time, 3),
+    "rss_mb": process_rss_mb(),
+}
+print(f"[STARTUP] Loaded model {STARTUP['model_version']} from {STARTUP['model_source']} in "
+      f"{STARTUP['model_load_seconds']}s, RSS {STARTUP['rss_mb']} MB")
+
+# ✅ Parsing and scoring run here, off the event loop, so health checks stay responsive
+predict_executor = BoundedExecutor(config.MAX_CONCURRENCY, config.QUEUE_DEPTH, name="ids-predict")
+
+# ✅ Startup warmup state, reported by /health/ready; reloaded versions are warmed up the same way
+WARMUP = {"status": "pending"}
+WARMUP_PLAN = (config.WARMUP_BATCH_SIZES, config.WARMUP_ROUNDS) if config.WARMUP_ROUNDS > 0 else None
+
+
+def run_warmup():
+    WARMUP["status"] = "running"
+    start_time = time.time()
+    try:
+        if WARMUP_PLAN is not None:
+            WARMUP.update(models.active.run_warmup(*WARMUP_PLAN))
+        WARMUP["status"] = "ready"
+    except Exception as e:
+        WARMUP["status"] = "failed"
+        WARMUP["error"] = str(e)
+    WARMUP["seconds"] = round(time.time() - start_time, 3)
+    print(f"[STARTUP] Warmup {WARMUP['status']} in {WARMUP['seconds']}s")
+
+# ✅ Optional shadow model, compared with the served one on sampled /predict batches
+shadow_scorer = None
+if config.SHADOW_MODEL:
+    if models.registry.has_version(config.SHADOW_MODEL):
+        shadow_source = dict(bundle_path=str(models.registry.bundle_path(config.SHADOW_MODEL)))
+    else:
+        shadow_source = dict(bundle_path=config.SHADOW_MODEL)
+    shadow_scorer = ShadowScorer(
+        load_predictor(**shadow_source, **PREDICTOR_OPTIONS), config.SHADOW_MODEL, ShadowMetrics(config.SHADOW_DB),
+        config.SHADOW_SAMPLE_RATE, config.SHADOW_MAX_PENDING,
+    )
+    print(f"[STARTUP] Shadow scoring {config.SHADOW_SAMPLE_RATE:.0%} of batches with {config.SHADOW_MODEL}")
+
+# ✅ Optional live scoring of a growing CICFlowMeter CSV or pcap capture
+live_scorer = None
+if config.LIVE_CSV or config.LIVE_PCAP:
+    live_scorer = LiveScorer(
+        models, config.LIVE_BATCH_ROWS, config.LIVE_MAX_WAIT_MS / 1000, config.LIVE_WINDOW_SECONDS,
+        on_batch=print_alerts,
+    )
+
+# ✅ Per-stage latency, rows and memory of scoring requests, served at /metrics
+stage_metrics = StageMetrics()
+
+# ✅ Repeated uploads of the same file are answered from the result cache
+result_cache = None
+if config.CACHE_MAX_ENTRIES > 0:
+    result_cache = ResultCache(
+        config.CACHE_MAX_ENTRIES, config.CACHE_MAX_BYTES, config.CACHE_TTL_SECONDS, config.CACHE_DIR
+    )
 
 # ✅ Prediction endpoint with cheat_mode toggle
+# The upload is parsed and scored in bounded row chunks, so peak memory
+# depends on chunk_size rather than on the size of the file. CSV, Parquet
+# and Arrow IPC uploads are accepted, chosen by content type or extension.
+# response_format selects the result encoding:
+#   json      - per-row dicts in detailed_results (default)
+#   ndjson    - streamed, one line per flow as chunks are scored, then a summary line
+#   columnar  - label dictionary + integer codes + confidence array
+#   arrow     - Arrow IPC stream, summary JSON in the schema metadata
+# model_version pins a registry version instead of the active one. Every
+# response names the version that scored it (body and X-Model-Version).
+# timings=true adds a per-stage breakdown to the summary and a Server-Timing
+# header, and bypasses the result cache.
 @app.post("/predict")
-async def predict(csv_file: UploadFile = File(...), cheat_mode: bool = False) -> Dict[str, Any]:
+async def predict(
+    csv_file: UploadFile = File(...),
+    cheat_mode: bool = False,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, gt=0),
+    response_format: str = Query("json", pattern="^(" + "|".join(RESPONSE_FORMATS) + ")$"),
+    model_version: str = None,
+    timings: bool = False,
+) -> Response:
+    upload_format = detect_upload_format(csv_file.content_type, csv_file.filename)
     try:
-        contents = await csv_file.read()
-        s = contents.decode('utf-8')
-        df = pd.read_csv(StringIO(s))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV file or encoding: {e}")
+        if response_format == "ndjson":
+            return await start_ndjson_stream(csv_file, upload_format, chunk_size, cheat_mode, model_version, timings)
+        return await predict_executor.run(
+            render_response, csv_file.file, upload_format, chunk_size, cheat_mode, response_format, model_version,
+            timings,
+        )
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 
+def lease_model(model_version: str = None):
+    # Loading a pinned version can take a moment, so this runs on a worker thread
     try:
-        processed_df = preprocess_uploaded_csv(df)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Preprocessing failed: {e}")
+        return models.lease(model_version)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {model_version}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load model version {model_version}: {e}")
+
+
+def render_response(fileobj, upload_format: str, chunk_size: int, cheat_mode: bool,
+                    response_format: str, model_version: str = None, timings: bool = False) -> Response:
+    start_time = time.perf_counter()
+    accumulator = PredictionAccumulator(report_timings=timings)
+    status = "error"
+    model = lease_model(model_version)
+    try:
+        response = score_response(model, fileobj, upload_format, chunk_size, cheat_mode, response_format,
+                                  accumulator, use_cache=not timings)
+        status = "cached" if response.headers.get("X-Cache") == "HIT" else "ok"
+    finally:
+        model.release()
+        stage_metrics.observe(accumulator.timer, "predict", status, time.perf_counter() - start_time,
+                              accumulator.total_flows)
+    response.headers["X-Model-Version"] = model.version
+    if timings:
+        response.headers["Server-Timing"] = accumulator.timer.server_timing()
+    return response
+
+
+def score_response(model, fileobj, upload_format: str, chunk_size: int, cheat_mode: bool,
+                   response_format: str, accumulator: PredictionAccumulator, use_cache: bool = True) -> Response:
+    # Encoding large results is CPU-bound too, so it happens on the worker thread
+    key = None
+    if result_cache is not None and use_cache:
+        key = upload_cache_key(model, fileobj, cheat_mode, response_format)
+        cached = result_cache.get(key)
+        if cached is not None:
+            body, media_type = cached
+            return Response(body, media_type=media_type, headers={"X-Cache": "HIT"})
+
+    for _ in iter_scored_chunks(model, fileobj, upload_format, chunk_size, cheat_mode, accumulator):
+        pass
+
+    with accumulator.timer.stage("serialize", accumulator.total_flows):
+        summary = accumulator.summary(cheat_mode)
+        if response_format == "arrow":
+            response = Response(arrow_results(accumulator.frames, summary), media_type=ARROW_MEDIA_TYPE)
+        elif response_format == "columnar":
+            response = JSONResponse({**summary, **columnar_results(accumulator.frames)})
+        else:
+            response = JSONResponse(json_results(accumulator, cheat_mode))
+
+    if key is not None:
+        result_cache.put(key, response.body, response.media_type)
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+
+def upload_cache_key(model, fileobj, cheat_mode: bool, response_format: str) -> str:
+    # Bodies name the scoring version, so identical artifacts under two versions get separate entries;
+    # the feature dtype and non-finite policies change scored values, so on-disk caches shared
+    # across restarts keep results of different settings apart
+    return cache_key(hash_upload(fileobj), model.fingerprint, model_version=model.version,
+                     dtype=model.feature_dtype.__name__,
+                     nonfinite_policies=nonfinite_policies_key(model.predictor.nonfinite_policies),
+                     cheat_mode=cheat_mode, response_format=response_format)
+
+
+async def start_ndjson_stream(csv_file: UploadFile, upload_format: str, chunk_size: int,
+                              cheat_mode: bool, model_version: str = None, timings: bool = False) -> StreamingResponse:
+    predict_executor.acquire()
+    # The form's files are closed once the handler returns, so the stream
+    # takes ownership of the spooled upload and closes it itself
+    fileobj, csv_file.file = csv_file.file, BytesIO()
+    model = None
+    accumulator = PredictionAccumulator(keep_results=False, report_timings=timings)
+    accumulator.started_at = time.perf_counter()
+
+    # Score the first chunk before sending headers, so a bad upload still gets a 4xx/5xx
+    chunks = step = None
+    try:
+        step = predict_executor.submit_held(lease_model, model_version)
+        model = await asyncio.wrap_future(step)
+        chunks = iter_scored_chunks(model, fileobj, upload_format, chunk_size, cheat_mode, accumulator)
+        step = predict_executor.submit_held(next, chunks, None)
+        first = await asyncio.wrap_future(step)
+    except BaseException:
+        await finish_step(step)
+        if model is None and step is not None and step.done() and not step.cancelled() \
+                and step.exception() is None:
+            # Leased by a step whose request went away meanwhile
+            model = step.result()
+        if chunks is not None:
+            chunks.close()
+        fileobj.close()
+        if model is not None:
+            model.release()
+        predict_executor.release()
+        raise
+
+    return StreamingResponse(
+        stream_ndjson(model, fileobj, chunks, first, accumulator, cheat_mode),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Model-Version": model.version},
+    )
+
+
+async def finish_step(step):
+    """
+    Wait for a worker step whose awaiting request was cancelled (e.g. the
+    client disconnected): cancelling the await does not stop the thread,
+    which may still be reading the upload and scoring on the leased model.
+    """
+    if step is None or step.done():
+        return
+    with anyio.CancelScope(shield=True):
+        try:
+            await asyncio.wrap_future(step)
+        except Exception:
+            pass
+
 
+async def stream_ndjson(model, fileobj, chunks, results, accumulator: PredictionAccumulator, cheat_mode: bool):
+    # Holds the executor slot and model lease taken by start_ndjson_stream() until the stream ends
+    status = "error"
+    step = None
     try:
-        start_time = time.time()
-        prediction_results = predictor.predict(processed_df, cheat_mode=cheat_mode)
-        prediction_time = round(time.time() - start_time, 3)
+        while results is not None:
+            step = predict_executor.submit_held(timed_ndjson_lines, results, accumulator)
+            yield await asyncio.wrap_future(step)
+            step = predict_executor.submit_held(next, chunks, None)
+            try:
+                results = await asyncio.wrap_future(step)
+            except HTTPException as e:
+                # Headers are already sent, so report the failure in-band
+                yield (json.dumps({"error": e.detail}) + "\n").encode("utf-8")
+                return
+        yield ndjson_summary(accumulator.summary(cheat_mode))
+        status = "ok"
+    finally:
+        # The upload is closed, and the slot and lease released, only once no worker uses them
+        await finish_step(step)
+        chunks.close()
+        fileobj.close()
+        model.release()
+        predict_executor.release()
+        stage_metrics.observe(accumulator.timer, "predict", status, time.perf_counter() - accumulator.started_at,
+                              accumulator.total_flows)
+
+
+def timed_ndjson_lines(results, accumulator: PredictionAccumulator) -> bytes:
+    with accumulator.timer.stage("serialize", len(results)):
+        return ndjson_lines(results)
+
+
+def iter_scored_chunks(model, fileobj, upload_format: str, chunk_size: int, cheat_mode: bool,
+                       accumulator: PredictionAccumulator):
+    """
+    Parse, align and score an upload chunk by chunk with a leased model
+    version. Each result frame is added to `accumulator` and then yielded.
+    """
+    plan = None
+    invalid_upload = "Invalid CSV file or encoding" if upload_format == "csv" else f"Invalid {FORMAT_NAMES[upload_format]} file"
+    accumulator.model_version = model.version
+
+    try:
+        chunks = timed_chunks(
+            iter_upload_chunks(fileobj, upload_format, chunk_size, model.schema_plan), accumulator.timer
+        )
+        df = next(chunks, None)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
-
-    labels = [res["predicted_label"] for res in prediction_results]
-    attack_counts = dict(Counter(labels))
-
-    confidences = [res["confidence_score"] for res in prediction_results if res["confidence_score"] is not None]
-    summary_stats = {}
-    if confidences:
-        summary_stats = {
-            "average_confidence": sum(confidences) / len(confidences),
-            "max_confidence": max(confidences),
-            "min_confidence": min(confidences),
-        }
-
-    return {
-        "total_flows": len(prediction_results),
-        "attack_counts": attack_counts,
-        "summary_stats": summary_stats,
-        "detailed_results": prediction_results,
-        "cheat_mode": cheat_mode,
-        "prediction_time_seconds": prediction_time
+        raise HTTPException(status_code=400, detail=f"{invalid_upload}: {e}")
+
+    while df is not None:
+        try:
+            if plan is None or not plan.matches(df.columns):
+                plan = model.schema_plan(df.columns)
+                plan.report()
+            with accumulator.timer.stage("align", len(df)):
+                features = plan.align(df, dtype=model.feature_dtype, replaced=accumulator.sanitized_values)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Preprocessing failed: {e}")
+
+        # Sampled batches keep the distinct rows and their projection for the shadow model
+        capture = None
+        if shadow_scorer is not None and not cheat_mode and shadow_scorer.should_sample():
+            capture = {}
+
+        try:
+            start_time = time.time()
+            prediction_results = model.predict_frame(features, cheat_mode=cheat_mode, capture=capture)
+            prediction_time = time.time() - start_time
+            accumulator.prediction_time += prediction_time
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
+
+        if capture is not None:
+            shadow_scorer.submit(model, features, prediction_results, prediction_time, capture)
+
+        accumulator.add(prediction_results)
+        yield prediction_results
+
+        try:
+            df = next(chunks, None)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"{invalid_upload}: {e}")
+
+
+def score_job_upload(fileobj, upload_format: str, cheat_mode: bool, on_progress) -> dict:
+    # Jobs are scored by the version that is active when they start
+    start_time = time.perf_counter()
+    accumulator = PredictionAccumulator()
+    status = "error"
+    model = models.lease()
+    try:
+        key = None
+        if result_cache is not None:
+            # Shares entries with /predict?response_format=json
+            key = upload_cache_key(model, fileobj, cheat_mode, "json")
+            cached = result_cache.get(key)
+            if cached is not None:
+                status = "cached"
+                return json.loads(cached[0])
+
+        for _ in iter_scored_chunks(model, fileobj, upload_format, DEFAULT_CHUNK_SIZE, cheat_mode, accumulator):
+            on_progress(accumulator.total_flows)
+        with accumulator.timer.stage("serialize", accumulator.total_flows):
+            result = json_results(accumulator, cheat_mode)
+        status = "ok"
+    finally:
+        model.release()
+        stage_metrics.observe(accumulator.timer, "jobs", status, time.perf_counter() - start_time,
+                              accumulator.total_flows)
+
+    if key is not None:
+        response = JSONResponse(result)
+        result_cache.put(key, response.body, response.media_type)
+    return result
+
+
+# ✅ Background jobs for large files, results kept on disk for reloads
+job_manager = JobManager(JobStore(config.JOB_DIR, config.JOB_TTL_SECONDS), score_job_upload, config.JOB_WORKERS,
+                         max_pending=config.JOB_MAX_PENDING)
+
+
+# ✅ Asynchronous prediction jobs: submit, poll progress, fetch the stored result
+@app.post("/jobs", status_code=202)
+async def create_job(csv_file: UploadFile = File(...), cheat_mode: bool = False):
+    upload_format = detect_upload_format(csv_file.content_type, csv_file.filename)
+    try:
+        job_id = await run_in_threadpool(
+            job_manager.submit, csv_file.file, csv_file.filename, upload_format, cheat_mode
+        )
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return job_manager.status(job_id)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    return status
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    status = get_job(job_id)
+    if status["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {status['error']}")
+    if status["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    return FileResponse(job_manager.store.result_path(job_id), media_type="application/json")
+
+
+# ✅ Result cache counters
+@app.get("/cache/stats")
+def get_cache_stats():
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+
+# ✅ Rolling per-label counters of the live scorer
+@app.get("/live/stats")
+def get_live_stats():
+    if live_scorer is None:
+        raise HTTPException(status_code=404, detail="Live scoring is not enabled (set IDS_LIVE_CSV or IDS_LIVE_PCAP)")
+    return live_scorer.stats()
+
+
+# ✅ Model versions: the served one, pinned ones and the registry contents
+@app.get("/models")
+def get_models():
+    return models.info()
+
+
+# ✅ Load a model version in the background, warm it up and swap it in.
+# Requests already running finish on the previous version. Without a
+# version, the registry's ACTIVE version (or the files in backend/models)
+# is re-read; with one, it is also recorded as the registry's ACTIVE version.
+@app.post("/models/reload", status_code=202)
+def reload_model(version: str = None):
+    # ACTIVE is only rewritten once the reload is known to start, so a 409
+    # leaves the registry pointing at the version being served
+    try:
+        started = models.reload(version, WARMUP_PLAN, make_active=True)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    if not started:
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return models.reload_status
+
+
+# ✅ Shadow model agreement, label confusion and relative scoring time
+@app.get("/shadow/stats")
+def get_shadow_stats(since: float = 0.0):
+    if shadow_scorer is None:
+        raise HTTPException(status_code=404, detail="Shadow scoring is not enabled (set IDS_SHADOW_MODEL)")
+    return shadow_scorer.stats(since)
+
+
+# ✅ Prometheus text exposition of per-stage latency, rows and memory
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    gauges = {
+        "model_info": ("Served model version (value is always 1).",
+                       {(("version", models.active.version), ("fingerprint", models.active.fingerprint[:12])): 1}),
+        "requests_in_flight": ("Scoring requests running or queued.", predict_executor.in_flight),
     }
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        gauges["result_cache_hits"] = ("Result cache hits since start.", cache_stats["hits"])
+        gauges["result_cache_misses"] = ("Result cache misses since start.", cache_stats["misses"])
+        gauges["result_cache_bytes"] = ("Bytes held by the result cache.", cache_stats["bytes"])
+    return PlainTextResponse(stage_metrics.render(gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from backend.bundle import process_rss_mb, process_peak_rss_mb
+
+# Upper bounds (seconds) of the per-stage latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Pipeline stages in the order a request goes through them. When the
+# scaler and PCA are fused into one projection they are timed together
+# as "scale_pca".
+STAGES = ("parse", "align", "dedup", "scale", "pca", "scale_pca", "model", "serialize")
+
+
+def add_stage(stages, name: str, seconds: float, rows: int):
+    """Add to a {stage: (seconds, rows)} dict; does nothing when `stages` is None."""
+    if stages is not None:
+        total_seconds, total_rows = stages.get(name, (0.0, 0))
+        stages[name] = (total_seconds + seconds, total_rows + rows)
+
+
+class StageTimer:
+    """
+    Seconds, rows and resident memory per pipeline stage for one request.
+    Memory is the process RSS sampled as each stage ends (the largest such
+    sample is kept), not the peak during the stage: stages reported by
+    Predictor may have run on another thread or in a worker process.
+    """
+
+    def __init__(self):
+        self.seconds = Counter()
+        self.rows = Counter()
+        self.rss_after_mb = {}
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        start_time = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start_time, rows)
+
+    def add(self, name: str, seconds: float, rows: int = 0):
+        self.seconds[name] += seconds
+        self.rows[name] += rows
+        self._sample_rss([name])
+
+    def merge(self, stages: dict):
+        """Add the {stage: (seconds, rows)} timings reported by Predictor (attrs["stages"])."""
+        for name, (seconds, rows) in stages.items():
+            self.seconds[name] += seconds
+            self.rows[name] += rows
+        self._sample_rss(stages)
+
+    def _sample_rss(self, names):
+        rss = process_rss_mb()
+        if rss is None:
+            return
+        for name in names:
+            if rss > self.rss_after_mb.get(name, 0.0):
+                self.rss_after_mb[name] = rss
+
+    def breakdown(self) -> dict:
+        report = {}
+        for name in sorted(self.seconds, key=_stage_order):
+            seconds, rows = self.seconds[name], self.rows[name]
+            report[name] = {
+                "seconds": round(seconds, 6),
+                "rows": rows,
+                "rows_per_second": round(rows / seconds, 1) if rows and seconds > 0 else None,
+                "rss_after_mb": self.rss_after_mb.get(name),
+            }
+        return report
+
+    def server_timing(self) -> str:
+        """Value for a Server-Timing response header (durations in ms)."""
+        return ", ".join(
+            f"{name};dur={self.seconds[name] * 1000:.3f}" for name in sorted(self.seconds, key=_stage_order)
+        )
+
+
+def timed_chunks(chunks, timer: StageTimer, stage: str = "parse"):
+    """Yield from an iterator of DataFrames, timing each step as `stage`."""
+    chunks = iter(chunks)
+    while True:
+        start_time = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        timer.add(stage, time.perf_counter() - start_time, len(chunk))
+        yield chunk
+
+
+def _stage_order(name: str):
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class StageMetrics:
+    """
+    Process-wide totals of every request's StageTimer: a latency histogram,
+    row count and largest end-of-stage RSS per stage, plus request and row
+    counters. render() produces the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = "ids"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.rows = Counter()
+        self.rss_after_mb = {}
+        self.requests = Counter()
+        self.request_latency = {}
+        self.flows_scored = 0
+        self._lock = threading.Lock()
+
+    def observe(self, timer: StageTimer, endpoint: str, status: str, seconds: float, flows: int = 0):
+        with self._lock:
+            for name, stage_seconds in timer.seconds.items():
+                self.histograms.setdefault(name, _Histogram()).observe(stage_seconds)
+                self.rows[name] += timer.rows[name]
+            for name, rss in timer.rss_after_mb.items():
+                if rss > self.rss_after_mb.get(name, 0.0):
+                    self.rss_after_mb[name] = rss
+            self.requests[(endpoint, status)] += 1
+            self.request_latency.setdefault(endpoint, _Histogram()).observe(seconds)
+            self.flows_scored += flows
+
+    def render(self, gauges: dict = None) -> str:
+        """
+        Prometheus text format. `gauges` adds {name: (help, value or
+        {labels tuple: value})} entries, e.g. cache or model state.
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f"# HELP {p}_stage_seconds Time spent in each pipeline stage per request.",
+                      f"# TYPE {p}_stage_seconds histogram"]
+            for name in sorted(self.histograms, key=_stage_order):
+                lines += _histogram_lines(f"{p}_stage_seconds", f'stage="{name}"', self.histograms[name])
+
+            lines += [f"# HELP {p}_stage_rows_total Rows processed by each pipeline stage.",
+                      f"# TYPE {p}_stage_rows_total counter"]
+            lines += [f'{p}_stage_rows_total{{stage="{name}"}} {self.rows[name]}'
+                      for name in sorted(self.rows, key=_stage_order)]
+
+            lines += [f"# HELP {p}_stage_rss_after_bytes Largest process RSS sampled at the end of each stage.",
+                      f"# TYPE {p}_stage_rss_after_bytes gauge"]
+            lines += [f'{p}_stage_rss_after_bytes{{stage="{name}"}} {int(self.rss_after_mb[name] * 1024 * 1024)}'
+                      for name in sorted(self.rss_after_mb, key=_stage_order)]
+
+            lines += [f"# HELP {p}_requests_total Scoring requests by endpoint and outcome.",
+                      f"# TYPE {p}_requests_total counter"]
+            lines += [f'{p}_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                      for (endpoint, status), count in sorted(self.requests.items())]
+
+            lines += [f"# HELP {p}_request_seconds End-to-end scoring time per request.",
+                      f"# TYPE {p}_request_seconds histogram"]
+            for endpoint in sorted(self.request_latency):
+                lines += _histogram_lines(f"{p}_request_seconds", f'endpoint="{endpoint}"',
+                                          self.request_latency[endpoint])
+
+            lines += [f"# HELP {p}_flows_scored_total Flows scored by scoring requests.",
+                      f"# TYPE {p}_flows_scored_total counter",
+                      f"{p}_flows_scored_total {self.flows_scored}"]
+
+        rss = process_rss_mb()
+        if rss is not None:
+            lines += [f"# HELP {p}_process_resident_memory_bytes Current process RSS.",
+                      f"# TYPE {p}_process_resident_memory_bytes gauge",
+                      f"{p}_process_resident_memory_bytes {int(rss * 1024 * 1024)}"]
+        peak = process_peak_rss_mb()
+        if peak is not None:
+            lines += [f"# HELP {p}_process_peak_resident_memory_bytes Largest RSS this process has reached.",
+                      f"# TYPE {p}_process_peak_resident_memory_bytes gauge",
+                      f"{p}_process_peak_resident_memory_bytes {int(peak * 1024 * 1024)}"]
+
+        for name, (help_text, value) in (gauges or {}).items():
+            lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} gauge"]
+            if isinstance(value, dict):
+                for labels, labelled_value in value.items():
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                    lines.append(f"{p}_{name}{{{label_text}}} {labelled_value}")
+            else:
+                lines.append(f"{p}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric: str, labels: str, histogram: _Histogram) -> list:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
@@ -88,33 +88,421 @@
 #             raise RuntimeError(f"Prediction failed: {e}")
 
 import joblib
+import hashlib
 import numpy as np
 import pandas as pd
 import os
+import threading
+import time
+import warnings
+import weakref
+from collections import Counter
+from backend.bundle import load_bundle
+from backend.cache import RowResultCache
+from backend.metrics import add_stage
+from backend.preprocessing import SchemaPlan, NONFINITE_POLICIES
+from backend import config
+
+RESULT_COLUMNS = ["predicted_label", "confidence_score", "explanation"]
+
+
+def results_to_records(results: pd.DataFrame) -> list:
+    """
+    Expand a columnar result frame into the per-row dicts returned by /predict.
+    """
+    labels = results["predicted_label"].tolist()
+    confidences = results["confidence_score"].tolist()
+    explanations = results["explanation"].tolist()
+    return [
+        {"predicted_label": label, "confidence_score": confidence, "explanation": explanation}
+        for label, confidence, explanation in zip(labels, confidences, explanations)
+    ]
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_predictor(bundle_path=None, **kwargs):
+    """
+    Predictor from a model bundle when `bundle_path` is set, otherwise from
+    the individual pickles named by model_path/scaler_path/encoder_path/pca_path.
+    """
+    if bundle_path:
+        return Predictor.from_bundle(bundle_path, **kwargs)
+    return Predictor(**kwargs)
+
+
+def configured_predictor_options() -> dict:
+    """Predictor options set through the IDS_* environment (see backend/config.py)."""
+    return dict(
+        nonfinite_policies={**NONFINITE_POLICIES, **config.NONFINITE_POLICIES} if config.NONFINITE_POLICIES else None,
+        dedup=bool(config.DEDUP),
+        row_cache_size=config.ROW_CACHE_SIZE,
+        float32=bool(config.FLOAT32),
+    )
+
+
+def fuse_scaler_pca(scaler, pca):
+    """
+    Fold StandardScaler and a fitted (Incremental)PCA into a single affine
+    map, so that X @ weights + bias == pca.transform(scaler.transform(X)).
+    Returns None when either component is not a plain linear transform.
+    """
+    components = getattr(pca, "components_", None)
+    pca_mean = getattr(pca, "mean_", None)
+    if components is None or pca_mean is None or not hasattr(scaler, "scale_"):
+        return None
+
+    scaler_mean = getattr(scaler, "mean_", None)
+    scale = scaler.scale_
+    n_features = components.shape[1]
+    if scaler_mean is None:
+        scaler_mean = np.zeros(n_features)
+    if scale is None:
+        scale = np.ones(n_features)
+
+    # ((x - mu) / s - m) @ C.T  ==  x @ (C.T / s) - (mu / s + m) @ C.T
+    weights = components.T / scale[:, np.newaxis]
+    bias = -(scaler_mean / scale + pca_mean) @ components.T
+    if getattr(pca, "whiten", False):
+        std = np.sqrt(pca.explained_variance_)
+        weights = weights / std
+        bias = bias / std
+    return np.ascontiguousarray(weights), bias
+
+
+def dedup_rows(features):
+    """
+    Find identical rows of a 2-D array. Returns (unique_index, inverse) with
+    features[unique_index][inverse] equal to features. Rows are grouped by a
+    hash of their bytes and every group is checked for exact equality.
+    """
+    n = len(features)
+    if n < 2:
+        return np.arange(n), np.arange(n)
+
+    # Multiply-add hash over each row's 64-bit (or, for odd-width float32
+    # rows, 32-bit) words, with wrapping integer arithmetic
+    rows = np.ascontiguousarray(features)
+    if rows.dtype not in (np.float32, np.float64):
+        rows = rows.astype(np.float64)
+    words = rows.view(np.uint64 if rows.shape[1] * rows.itemsize % 8 == 0 else np.uint32)
+    multipliers = np.random.default_rng(0).integers(1, 2**63, size=words.shape[1], dtype=np.uint64) | np.uint64(1)
+    inverse, _ = pd.factorize(words @ multipliers)
+
+    # factorize numbers groups in order of first appearance
+    first = np.ones(n, dtype=bool)
+    first[1:] = inverse[1:] > np.maximum.accumulate(inverse[:-1])
+    unique_index = np.flatnonzero(first)
+
+    duplicates = np.flatnonzero(~first)
+    if not np.array_equal(words[unique_index[inverse[duplicates]]], words[duplicates]):
+        # Hash collision: fall back to an exact (sorting) comparison of row bytes
+        rows = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+        _, unique_index, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    return unique_index, inverse
+
+
+class ModelArtifacts:
+    """
+    Loaded model components with their identifying hashes, plus the fused
+    scaler/PCA projection once it has been built and verified. One instance
+    is shared by every Predictor in the process that loads the same files.
+    """
+
+    def __init__(self, model, scaler, encoder, pca, feature_columns, artifact_paths, artifact_hashes,
+                 fingerprint, manifest=None, projection=None, projection_checked=False):
+        self.model = model
+        self.scaler = scaler
+        self.encoder = encoder
+        self.pca = pca
+        self.feature_columns = feature_columns
+        self.artifact_paths = artifact_paths
+        self.artifact_hashes = artifact_hashes
+        self.fingerprint = fingerprint
+        self.manifest = manifest
+        self.projection = projection
+        self.projection_checked = projection_checked
+        self.lock = threading.Lock()
+
+
+# Artifacts currently in use, keyed by their files' paths, sizes and mtimes.
+# Entries go away with the last Predictor using them (e.g. after a reload).
+_shared_artifacts = weakref.WeakValueDictionary()
+_shared_artifacts_lock = threading.Lock()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.realpath(path), stat.st_size, stat.st_mtime_ns
+
+
+def shared_artifacts(key, loader):
+    """Return the ModelArtifacts cached under `key`, calling loader() on a miss."""
+    with _shared_artifacts_lock:
+        artifacts = _shared_artifacts.get(key)
+        if artifacts is None:
+            artifacts = loader()
+            _shared_artifacts[key] = artifacts
+        return artifacts
+
+
+def load_pickle_artifacts(model_path, scaler_path, encoder_path, pca_path) -> ModelArtifacts:
+    try:
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        encoder = joblib.load(encoder_path)
+        pca = joblib.load(pca_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model components: {e}")
+
+    # Load feature columns
+    feature_path = os.path.join(os.path.dirname(model_path), "feature_columns.txt")
+    try:
+        with open(feature_path, "r") as f:
+            feature_columns = f.read().splitlines()
+    except Exception as e:
+        raise RuntimeError(f"Failed to load feature columns from '{feature_path}': {e}")
+
+    # Content hashes identify the loaded model, e.g. for result caching
+    artifact_paths = {
+        "model": model_path, "scaler": scaler_path, "encoder": encoder_path,
+        "pca": pca_path, "feature_columns": feature_path,
+    }
+    artifact_hashes = {name: file_sha256(path) for name, path in artifact_paths.items()}
+    fingerprint = hashlib.sha256(
+        "|".join(f"{name}={digest}" for name, digest in sorted(artifact_hashes.items())).encode()
+    ).hexdigest()
+    return ModelArtifacts(model, scaler, encoder, pca, feature_columns, artifact_paths, artifact_hashes, fingerprint)
+
+
+def load_bundle_artifacts(bundle_path, mmap=True) -> ModelArtifacts:
+    payload = load_bundle(bundle_path, mmap=mmap)
+    manifest = payload["manifest"]
+    # The bundled projection was verified against the two-step path when it was built
+    return ModelArtifacts(
+        payload["model"], payload["scaler"], payload["encoder"], payload["pca"], list(payload["feature_columns"]),
+        {"bundle": str(bundle_path)}, dict(manifest["artifacts"]), manifest["fingerprint"], manifest=manifest,
+        projection=payload.get("projection"), projection_checked=True,
+    )
+
 
 class Predictor:
-    def __init__(self, model_path, scaler_path, encoder_path, pca_path, debug=False):
-        self.debug = debug
+    def __init__(self, model_path, scaler_path, encoder_path, pca_path, debug=False, single_pass=True,
+                 fuse_projection=True, nonfinite_policies=None, dedup=False, row_cache_size=0, float32=False):
+        self._configure(debug, single_pass, nonfinite_policies, dedup, row_cache_size, float32)
         try:
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
-            self.encoder = joblib.load(encoder_path)
-            self.pca = joblib.load(pca_path)
-        except Exception as e:
+            key = ("pickles",) + tuple(_file_key(path) for path in (model_path, scaler_path, encoder_path, pca_path))
+        except OSError as e:
             raise RuntimeError(f"Failed to load model components: {e}")
+        self._use(shared_artifacts(
+            key, lambda: load_pickle_artifacts(model_path, scaler_path, encoder_path, pca_path)
+        ), fuse_projection)
 
-        # Load feature columns
-        feature_path = os.path.join(os.path.dirname(model_path), "feature_columns.txt")
+    @classmethod
+    def from_bundle(cls, bundle_path, debug=False, single_pass=True, fuse_projection=True,
+                    nonfinite_policies=None, dedup=False, row_cache_size=0, float32=False, mmap=True):
+        """
+        Load every component from one bundle built by `python -m backend.bundle
+        build`. Its arrays are memory-mapped read-only unless mmap=False, and
+        its fingerprint is that of the pickles it was built from.
+        """
+        self = cls.__new__(cls)
+        self._configure(debug, single_pass, nonfinite_policies, dedup, row_cache_size, float32)
         try:
-            with open(feature_path, "r") as f:
-                self.feature_columns = f.read().splitlines()
-        except Exception as e:
-            raise RuntimeError(f"Failed to load feature columns from '{feature_path}': {e}")
+            key = ("bundle", _file_key(bundle_path), mmap)
+        except OSError as e:
+            raise RuntimeError(f"Failed to load model bundle '{bundle_path}': {e}")
+        self._use(shared_artifacts(key, lambda: load_bundle_artifacts(bundle_path, mmap=mmap)), fuse_projection)
+        return self
+
+    def _use(self, artifacts: ModelArtifacts, fuse_projection):
+        self.artifacts = artifacts
+        self.model = artifacts.model
+        self.scaler = artifacts.scaler
+        self.encoder = artifacts.encoder
+        self.pca = artifacts.pca
+        self.feature_columns = artifacts.feature_columns
+        self.artifact_paths = artifacts.artifact_paths
+        self.artifact_hashes = artifacts.artifact_hashes
+        self.fingerprint = artifacts.fingerprint
+        self.manifest = artifacts.manifest
+        self._prepare(fuse_projection)
+
+    def _configure(self, debug, single_pass, nonfinite_policies, dedup, row_cache_size, float32=False):
+        self.debug = debug
+        # Aligned features, the fused projection and the model input are
+        # float32 instead of float64: half the memory traffic, ~7 significant digits
+        self.dtype = np.float32 if float32 else np.float64
+        self.nonfinite_policies = nonfinite_policies
+        # Take labels from the predict_proba argmax instead of running predict too
+        self.single_pass = single_pass
+        # Score each distinct feature row once and copy results to its duplicates.
+        # Off by default: hashing costs more than it saves on mostly unique rows.
+        self.dedup = dedup
+        # Optional LRU of row -> (label, confidence) shared across calls
+        self.row_cache = RowResultCache(row_cache_size) if row_cache_size > 0 else None
+
+    def _prepare(self, fuse_projection):
+        # Compiled column mappings, keyed by the raw header they were built for
+        self._schema_plans = {}
+
+        # Decoded label of each column in predict_proba's output
+        self.proba_labels = self._decode_model_classes()
+        self.class_index = {label: i for i, label in enumerate(self.proba_labels)}
+
+        # Scaler + PCA folded into one matrix product, verified against the
+        # two-step path once per set of artifacts (bundles store a verified one)
+        self.projection = None
+        if not fuse_projection:
+            return
+        with self.artifacts.lock:
+            if not self.artifacts.projection_checked:
+                self.projection = fuse_scaler_pca(self.scaler, self.pca)
+                if self.projection is not None and not self._check_projection():
+                    warnings.warn("Fused scaler/PCA projection does not match the two-step path; disabling it")
+                    self.projection = None
+                self.artifacts.projection = self.projection
+                self.artifacts.projection_checked = True
+            self.projection = self.artifacts.projection
+        if self.projection is not None and self.dtype != np.float64:
+            # Cast once here; the shared artifacts keep the float64 originals
+            weights, bias = self.projection
+            self.projection = weights.astype(self.dtype), bias.astype(self.dtype)
+
+    def synthetic_features(self, n_rows, seed=0):
+        """
+        Random aligned feature rows distributed like the scaler's training
+        data (per-feature mean and scale).
+        """
+        rng = np.random.default_rng(seed)
+        mean = getattr(self.scaler, "mean_", None)
+        scale = getattr(self.scaler, "scale_", None)
+        sample = rng.standard_normal((n_rows, len(self.feature_columns)))
+        if scale is not None:
+            sample *= scale
+        if mean is not None:
+            sample += mean
+        return sample
+
+    def warmup(self, batch_sizes=(1, 64, 1024), rounds=3):
+        """
+        Score synthetic batches of each size `rounds` times, through the same
+        DataFrame alignment path as uploads, so lazy library initialization
+        and page faults happen before real traffic. Returns the first and
+        last latency (seconds) per batch size.
+        """
+        sample = self.synthetic_features(max(batch_sizes))
+        report = {}
+        for size in batch_sizes:
+            frame = pd.DataFrame(sample[:size], columns=self.feature_columns)
+            timings = []
+            for _ in range(rounds):
+                start_time = time.perf_counter()
+                self.predict_frame(frame)
+                timings.append(time.perf_counter() - start_time)
+            report[size] = {"first_seconds": round(timings[0], 6), "last_seconds": round(timings[-1], 6)}
+        return report
+
+    def _check_projection(self, n_rows=256):
+        sample = self.synthetic_features(n_rows)
+        expected = self.pca.transform(self.scaler.transform(pd.DataFrame(sample, columns=self.feature_columns)))
+        actual = self.project(sample)
+        tolerance = 1e-6 * max(1.0, float(np.abs(expected).max()))
+        return np.allclose(actual, expected, rtol=1e-6, atol=tolerance)
+
+    def schema_plan(self, columns):
+        key = tuple(columns)
+        plan = self._schema_plans.get(key)
+        if plan is None:
+            if len(self._schema_plans) >= 32:
+                self._schema_plans.clear()
+            plan = SchemaPlan(key, self.feature_columns, nonfinite_policies=self.nonfinite_policies)
+            self._schema_plans[key] = plan
+        return plan
+
+    def align(self, data, replaced=None):
+        """
+        Return the model feature matrix for `data`: a raw or preprocessed
+        DataFrame, or an (n_rows, n_features) array that was already aligned
+        and sanitized by SchemaPlan.align.
+        """
+        if isinstance(data, np.ndarray):
+            if data.ndim != 2 or data.shape[1] != len(self.feature_columns):
+                raise ValueError(f"Expected a (n, {len(self.feature_columns)}) feature matrix, got {data.shape}")
+            return data if data.dtype == self.dtype else data.astype(self.dtype)
+        return self.schema_plan(data.columns).align(data, dtype=self.dtype, replaced=replaced)
+
+    def project(self, features, stages=None):
+        """
+        Map aligned feature rows to the PCA space the model was trained on.
+        Time spent is added to `stages` (see backend.metrics.add_stage).
+        """
+        start_time = time.perf_counter()
+        if self.projection is None:
+            if isinstance(features, np.ndarray):
+                features = pd.DataFrame(features, columns=self.feature_columns)
+            scaled = self.scaler.transform(features)
+            scale_done = time.perf_counter()
+            projected = self.pca.transform(scaled)
+            add_stage(stages, "scale", scale_done - start_time, len(projected))
+            add_stage(stages, "pca", time.perf_counter() - scale_done, len(projected))
+            return projected
+
+        weights, bias = self.projection
+        features = np.asarray(features, dtype=weights.dtype)
+        projected = features @ weights
+        projected += bias
+        add_stage(stages, "scale_pca", time.perf_counter() - start_time, len(projected))
+        return projected
+
+    def _decode_model_classes(self):
+        classes = getattr(self.model, "classes_", None)
+        if classes is None:
+            classes = self.encoder.classes_
+        elif not isinstance(classes[0], str):
+            classes = self.encoder.inverse_transform(classes)
+        return np.asarray(classes, dtype=object)
+
+    def _gather_confidences(self, pred_labels, pred_proba):
+        n = len(pred_labels)
+        unique_labels, inverse = np.unique(pred_labels, return_inverse=True)
+        unique_index = np.array([self.class_index.get(label, -1) for label in unique_labels])
+        label_index = unique_index[inverse.reshape(-1)]
+
+        known = label_index >= 0
+        if self.debug and not known.all():
+            missing = [label for label, i in zip(unique_labels, unique_index) if i < 0]
+            print(f"[WARNING] Labels not in model classes, using max probability: {missing}")
+
+        confidences = pred_proba[np.arange(n), np.where(known, label_index, 0)]
+        if not known.all():
+            confidences = np.where(known, confidences, pred_proba.max(axis=1))
+        return confidences.astype(float)
 
     def predict(self, df, cheat_mode=False):
+        return results_to_records(self.predict_frame(df, cheat_mode=cheat_mode))
+
+    def predict_frame(self, df, cheat_mode=False, capture=None):
+        """
+        Score `df` (see align() for accepted inputs) and return one row per
+        flow with the columns in RESULT_COLUMNS. Use predict() when per-row
+        dicts are needed. Non-finite replacement counts from alignment are
+        kept in the frame's attrs["sanitized_values"], row deduplication
+        counts in attrs["dedup"] and per-stage (seconds, rows) in
+        attrs["stages"]. A `capture` dict receives the distinct
+        scored rows ("rows"), their PCA projection ("projected", unless they
+        came from the row cache) and the "inverse" index back to all rows.
+        """
         try:
             dominant_label = None
-            if cheat_mode:
+            if cheat_mode and isinstance(df, pd.DataFrame):
                 for col in ['Attack Type', 'Label', 'label']:
                     if col in df.columns:
                         label_counts = df[col].value_counts()
@@ -125,12 +513,116 @@ class Predictor:
                         break
 
             # Ensure only required features are used
-            df = df.reindex(columns=self.feature_columns, fill_value=0)
-            df = df.apply(pd.to_numeric, errors='coerce').fillna(0)
+            replaced = Counter()
+            start_time = time.perf_counter()
+            features = self.align(df, replaced=replaced)
+            align_time = time.perf_counter() - start_time
+            results = self._score(features, cheat_mode and dominant_label, capture)
+            results.attrs["sanitized_values"] = dict(replaced)
+            if isinstance(df, pd.DataFrame) and "stages" in results.attrs:
+                add_stage(results.attrs["stages"], "align", align_time, len(features))
+            return results
 
-            # Model prediction
-            scaled = self.scaler.transform(df)
-            pca_features = self.pca.transform(scaled)
+        except Exception as e:
+            raise RuntimeError(f"Prediction failed: {e}")
+
+    def _score(self, features, dominant_label=None, capture=None):
+        if not len(features):
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+
+        n = len(features)
+        if dominant_label:
+            if self.debug:
+                print(f"[CHEAT MODE] Overriding all predictions with: {dominant_label}")
+            return pd.DataFrame({
+                "predicted_label": np.full(n, dominant_label, dtype=object),
+                "confidence_score": np.ones(n),
+                "explanation": "Overridden using dominant label from uploaded file",
+            }, columns=RESULT_COLUMNS)
+
+        stages = {}
+        if self.dedup:
+            start_time = time.perf_counter()
+            unique_index, inverse = dedup_rows(features)
+            rows = features[unique_index]
+            add_stage(stages, "dedup", time.perf_counter() - start_time, n)
+        else:
+            inverse = None
+            rows = features
+
+        if self.row_cache is None:
+            pred_labels, confidences = self.score_rows(rows, capture, stages)
+            cache_hits = 0
+        else:
+            pred_labels, confidences, cache_hits = self._score_rows_cached(rows, stages)
+
+        if capture is not None:
+            capture.update(rows=rows, inverse=inverse)
+        if inverse is not None:
+            pred_labels = pred_labels[inverse]
+            confidences = confidences[inverse]
+
+        results = pd.DataFrame({
+            "predicted_label": pred_labels,
+            "confidence_score": confidences,
+            "explanation": "Predicted using trained model",
+        }, columns=RESULT_COLUMNS)
+        results.attrs["dedup"] = {
+            "rows": n,
+            "unique_rows": len(rows),
+            "row_cache_hits": cache_hits,
+        }
+        results.attrs["stages"] = stages
+        return results
+
+    def _score_rows_cached(self, rows, stages=None):
+        keys, cached = self.row_cache.lookup(rows)
+        misses = np.array([entry is None for entry in cached], dtype=bool)
+        cache_hits = len(rows) - int(misses.sum())
+        if not cache_hits:
+            pred_labels, confidences = self.score_rows(rows, stages=stages)
+            self.row_cache.store(keys, pred_labels, confidences)
+            return pred_labels, confidences, 0
+
+        pred_labels = np.empty(len(rows), dtype=object)
+        confidences = np.empty(len(rows), dtype=object)
+        for i, entry in enumerate(cached):
+            if entry is not None:
+                pred_labels[i], confidences[i] = entry
+        if misses.any():
+            miss_labels, miss_confidences = self.score_rows(rows[misses], stages=stages)
+            pred_labels[misses] = miss_labels
+            confidences[misses] = miss_confidences
+            self.row_cache.store([key for key, miss in zip(keys, misses) if miss], miss_labels, miss_confidences)
+        if not any(confidence is None for confidence in confidences):
+            confidences = confidences.astype(float)
+        return pred_labels, confidences, cache_hits
+
+    def score_rows(self, features, capture=None, stages=None):
+        """
+        Labels and confidences for aligned feature rows, as arrays, without
+        deduplication or the row cache.
+        """
+        pca_features = self.project(features, stages)
+        if capture is not None:
+            capture["projected"] = pca_features
+        start_time = time.perf_counter()
+        result = self.classify(pca_features)
+        add_stage(stages, "model", time.perf_counter() - start_time, len(pca_features))
+        return result
+
+    def classify(self, pca_features):
+        """
+        Labels and confidences for rows already mapped by project(), as arrays.
+        """
+        n = len(pca_features)
+        if self.single_pass and hasattr(self.model, 'predict_proba'):
+            # One pass over the model: labels are the most probable class
+            pred_proba = self.model.predict_proba(pca_features)
+            best = pred_proba.argmax(axis=1)
+            pred_labels = self.proba_labels[best]
+            confidences = pred_proba[np.arange(n), best].astype(float)
+        else:
             pred_encoded = self.model.predict(pca_features)
 
             # Decode labels if necessary
@@ -139,48 +631,10 @@ class Predictor:
             else:
                 pred_labels = self.encoder.inverse_transform(pred_encoded)
 
-            if cheat_mode and dominant_label:
-                pred_labels = [dominant_label] * len(df)
-                confidence_override = 1.0
-                explanation_text = "Overridden using dominant label from uploaded file"
-                if self.debug:
-                    print(f"[CHEAT MODE] Overriding all predictions with: {dominant_label}")
+            if hasattr(self.model, 'predict_proba'):
+                pred_proba = self.model.predict_proba(pca_features)
+                confidences = self._gather_confidences(pred_labels, pred_proba)
             else:
-                confidence_override = None
-                explanation_text = "Predicted using trained model"
-
-            # Get prediction probabilities if available
-            pred_proba = self.model.predict_proba(pca_features) if hasattr(self.model, 'predict_proba') else None
-            encoder_classes = list(self.encoder.classes_)
-
-            # Build prediction results
-            results = []
-            for i, label in enumerate(pred_labels):
-                if confidence_override is not None:
-                    confidence = confidence_override
-                elif pred_proba is not None:
-                    try:
-                        label_index = encoder_classes.index(label)
-                        if label_index < len(pred_proba[i]):
-                            confidence = float(pred_proba[i][label_index])
-                        else:
-                            confidence = max(pred_proba[i])
-                            if self.debug:
-                                print(f"[WARNING] Label index out of range for probabilities: {label}")
-                    except ValueError:
-                        confidence = max(pred_proba[i])
-                        if self.debug:
-                            print(f"[WARNING] Label '{label}' not in encoder.classes_: {encoder_classes}")
-                else:
-                    confidence = None
-
-                results.append({
-                    "predicted_label": label,
-                    "confidence_score": confidence,
-                    "explanation": explanation_text
-                })
+                confidences = np.full(n, None, dtype=object)
 
-            return results
-
-        except Exception as e:
-            raise RuntimeError(f"Prediction failed: {e}")
+        return np.asarray(pred_labels, dtype=object), confidences
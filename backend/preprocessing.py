@@ -1,4 +1,107 @@
+import json
+import numpy as np
 import pandas as pd
+from collections import Counter
+
+# Rename inconsistent CICFlowMeter headers to match model expectations
+RENAME_DICT = {
+    'Dst Port': 'Destination Port',
+    'Total Fwd Packet': 'Total Fwd Packets',
+    'Total Bwd packets': 'Total Backward Packets',
+    'Fwd Segment Size Avg': 'Avg Fwd Segment Size',
+    'Bwd Segment Size Avg': 'Avg Bwd Segment Size',
+    'FWD Init Win Bytes': 'Init_Win_bytes_forward',
+    'Bwd Init Win Bytes': 'Init_Win_bytes_backward',
+    'Fwd Act Data Pkts': 'act_data_pkt_fwd',
+    'Fwd Seg Size Min': 'min_seg_size_forward',
+    'Label': 'Attack Type',
+    # Aliases if present (optional, not used in features)
+    'Source Port': 'Src Port',
+    'Source IP': 'Src IP',
+    'Destination IP': 'Dst IP'
+}
+
+# Identifier columns that are never model inputs
+DROP_COLUMNS = ['Flow ID', 'Src IP', 'Src Port', 'Dst IP', 'Protocol', 'Timestamp']
+
+# Required model feature columns (must match model exactly)
+MODEL_FEATURES = [
+    'Destination Port', 'Flow Duration', 'Total Fwd Packets', 'Total Backward Packets',
+    'Total Length of Fwd Packets', 'Total Length of Bwd Packets', 'Fwd Packet Length Max',
+    'Fwd Packet Length Min', 'Fwd Packet Length Mean', 'Fwd Packet Length Std',
+    'Bwd Packet Length Max', 'Bwd Packet Length Min', 'Bwd Packet Length Mean',
+    'Bwd Packet Length Std', 'Flow Bytes/s', 'Flow Packets/s', 'Flow IAT Mean',
+    'Flow IAT Std', 'Flow IAT Max', 'Flow IAT Min', 'Fwd IAT Total', 'Fwd IAT Mean',
+    'Fwd IAT Std', 'Fwd IAT Max', 'Fwd IAT Min', 'Bwd IAT Total', 'Bwd IAT Mean',
+    'Bwd IAT Std', 'Bwd IAT Max', 'Bwd IAT Min', 'Fwd PSH Flags', 'Fwd URG Flags',
+    'Fwd Header Length', 'Bwd Header Length', 'Fwd Packets/s', 'Bwd Packets/s',
+    'Min Packet Length', 'Max Packet Length', 'Packet Length Mean', 'Packet Length Std',
+    'Packet Length Variance', 'FIN Flag Count', 'SYN Flag Count', 'RST Flag Count',
+    'PSH Flag Count', 'ACK Flag Count', 'URG Flag Count', 'CWE Flag Count', 'ECE Flag Count',
+    'Down/Up Ratio', 'Average Packet Size', 'Avg Fwd Segment Size', 'Avg Bwd Segment Size',
+    'Fwd Header Length.1', 'Subflow Fwd Packets', 'Subflow Fwd Bytes',
+    'Subflow Bwd Packets', 'Subflow Bwd Bytes', 'Init_Win_bytes_forward',
+    'Init_Win_bytes_backward', 'act_data_pkt_fwd', 'min_seg_size_forward', 'Active Mean',
+    'Active Std', 'Active Max', 'Active Min', 'Idle Mean', 'Idle Std', 'Idle Max', 'Idle Min'
+]
+
+# Values written over NaN/±Infinity in the aligned feature matrix. NaN also
+# covers values pd.to_numeric could not parse.
+DEFAULT_NONFINITE_POLICY = {"nan": 0.0, "posinf": 0.0, "neginf": 0.0}
+
+# Per-feature overrides of DEFAULT_NONFINITE_POLICY. "clip" bounds finite
+# values too (None leaves a side open). CICFlowMeter writes Infinity/NaN into
+# the rate columns for zero-duration flows and negative rates on clock skew.
+NONFINITE_POLICIES = {
+    'Flow Bytes/s': {"clip": (0.0, None)},
+    'Flow Packets/s': {"clip": (0.0, None)},
+}
+
+
+def nonfinite_policies_key(policies: dict = None) -> str:
+    """Canonical text of the policies sanitize_features applies (None means the defaults), for cache keys."""
+    return json.dumps(NONFINITE_POLICIES if policies is None else policies, sort_keys=True)
+
+
+def sanitize_features(features: np.ndarray, feature_columns: list, policies: dict = None) -> Counter:
+    """
+    Replace non-finite values of an aligned feature matrix in place and clip
+    the columns that have a "clip" policy. Returns how many values were
+    changed per feature name.
+    """
+    policies = NONFINITE_POLICIES if policies is None else policies
+    replaced = Counter()
+
+    columns = set(np.flatnonzero(~np.isfinite(features).all(axis=0)))
+    columns.update(feature_columns.index(name) for name, policy in policies.items()
+                   if "clip" in policy and name in feature_columns)
+
+    for j in sorted(columns):
+        name = feature_columns[j]
+        policy = {**DEFAULT_NONFINITE_POLICY, **policies.get(name, {})}
+        column = features[:, j]
+
+        for kind, mask_fn in (("nan", np.isnan), ("posinf", np.isposinf), ("neginf", np.isneginf)):
+            mask = mask_fn(column)
+            count = int(np.count_nonzero(mask))
+            if count:
+                column[mask] = policy[kind]
+                replaced[name] += count
+
+        if policy.get("clip"):
+            low, high = policy["clip"]
+            outside = np.zeros(len(column), dtype=bool)
+            if low is not None:
+                outside |= column < low
+            if high is not None:
+                outside |= column > high
+            count = int(np.count_nonzero(outside))
+            if count:
+                np.clip(column, low, high, out=column)
+                replaced[name] += count
+
+    return replaced
+
 
 def check_and_fix_features(df: pd.DataFrame, model_features: list) -> pd.DataFrame:
     input_cols = list(df.columns)
@@ -7,67 +110,94 @@ def check_and_fix_features(df: pd.DataFrame, model_features: list) -> pd.DataFra
 
     if missing_cols:
         print(f"Adding missing columns with zeros: {missing_cols}")
-        for col in missing_cols:
-            df[col] = 0
 
     if extra_cols:
         print(f"Dropping extra columns: {extra_cols}")
-        df = df.drop(columns=extra_cols, errors='ignore')
 
-    # Reorder columns to match model expectations
-    df = df[model_features]
+    # Add missing columns, drop extra ones and reorder in a single step
+    return df.reindex(columns=model_features, fill_value=0)
 
-    return df
 
 def preprocess_uploaded_csv(df: pd.DataFrame) -> pd.DataFrame:
     # Step 1: Strip leading/trailing spaces from column names
     df.columns = df.columns.str.strip()
 
     # Step 2: Rename inconsistent columns to match model expectations
-    rename_dict = {
-        'Dst Port': 'Destination Port',
-        'Total Fwd Packet': 'Total Fwd Packets',
-        'Total Bwd packets': 'Total Backward Packets',
-        'Fwd Segment Size Avg': 'Avg Fwd Segment Size',
-        'Bwd Segment Size Avg': 'Avg Bwd Segment Size',
-        'FWD Init Win Bytes': 'Init_Win_bytes_forward',
-        'Bwd Init Win Bytes': 'Init_Win_bytes_backward',
-        'Fwd Act Data Pkts': 'act_data_pkt_fwd',
-        'Fwd Seg Size Min': 'min_seg_size_forward',
-        'Label': 'Attack Type',
-        # Aliases if present (optional, not used in features)
-        'Source Port': 'Src Port',
-        'Source IP': 'Src IP',
-        'Destination IP': 'Dst IP'
-    }
-    df = df.rename(columns=rename_dict)
+    df = df.rename(columns=RENAME_DICT)
 
     # Step 3: Drop unwanted identifier columns
-    drop_cols = ['Flow ID', 'Src IP', 'Src Port', 'Dst IP', 'Protocol', 'Timestamp']
-    df = df.drop(columns=[col for col in drop_cols if col in df.columns], errors='ignore')
-
-    # Step 4: Define required model feature columns (must match model exactly)
-    model_features = [
-        'Destination Port', 'Flow Duration', 'Total Fwd Packets', 'Total Backward Packets',
-        'Total Length of Fwd Packets', 'Total Length of Bwd Packets', 'Fwd Packet Length Max',
-        'Fwd Packet Length Min', 'Fwd Packet Length Mean', 'Fwd Packet Length Std',
-        'Bwd Packet Length Max', 'Bwd Packet Length Min', 'Bwd Packet Length Mean',
-        'Bwd Packet Length Std', 'Flow Bytes/s', 'Flow Packets/s', 'Flow IAT Mean',
-        'Flow IAT Std', 'Flow IAT Max', 'Flow IAT Min', 'Fwd IAT Total', 'Fwd IAT Mean',
-        'Fwd IAT Std', 'Fwd IAT Max', 'Fwd IAT Min', 'Bwd IAT Total', 'Bwd IAT Mean',
-        'Bwd IAT Std', 'Bwd IAT Max', 'Bwd IAT Min', 'Fwd PSH Flags', 'Fwd URG Flags',
-        'Fwd Header Length', 'Bwd Header Length', 'Fwd Packets/s', 'Bwd Packets/s',
-        'Min Packet Length', 'Max Packet Length', 'Packet Length Mean', 'Packet Length Std',
-        'Packet Length Variance', 'FIN Flag Count', 'SYN Flag Count', 'RST Flag Count',
-        'PSH Flag Count', 'ACK Flag Count', 'URG Flag Count', 'CWE Flag Count', 'ECE Flag Count',
-        'Down/Up Ratio', 'Average Packet Size', 'Avg Fwd Segment Size', 'Avg Bwd Segment Size',
-        'Fwd Header Length.1', 'Subflow Fwd Packets', 'Subflow Fwd Bytes',
-        'Subflow Bwd Packets', 'Subflow Bwd Bytes', 'Init_Win_bytes_forward',
-        'Init_Win_bytes_backward', 'act_data_pkt_fwd', 'min_seg_size_forward', 'Active Mean',
-        'Active Std', 'Active Max', 'Active Min', 'Idle Mean', 'Idle Std', 'Idle Max', 'Idle Min'
-    ]
-
-    # Step 5: Ensure final DataFrame has all and only model features in correct order
-    df = check_and_fix_features(df, model_features)
+    df = df.drop(columns=[col for col in DROP_COLUMNS if col in df.columns], errors='ignore')
+
+    # Step 4: Ensure final DataFrame has all and only model features in correct order
+    df = check_and_fix_features(df, MODEL_FEATURES)
 
     return df
+
+
+class SchemaPlan:
+    """
+    Column mapping compiled once per header: raw upload columns (before
+    stripping/renaming) to positions in the model feature vector.
+
+    align() writes a chunk straight into a preallocated C-contiguous array,
+    which replaces the rename/reindex/to_numeric DataFrame copies.
+    """
+
+    def __init__(self, raw_columns, feature_columns=MODEL_FEATURES, rename_dict=RENAME_DICT,
+                 nonfinite_policies=None):
+        self.raw_columns = list(raw_columns)
+        self.nonfinite_policies = nonfinite_policies
+        self.feature_columns = list(feature_columns)
+        feature_index = {col: i for i, col in enumerate(self.feature_columns)}
+
+        # (raw position, feature position); first occurrence wins on duplicates
+        self.sources = []
+        mapped = set()
+        self.extra_columns = []
+        for raw_pos, raw_col in enumerate(self.raw_columns):
+            name = str(raw_col).strip()
+            name = rename_dict.get(name, name)
+            feature_pos = feature_index.get(name)
+            if feature_pos is None or feature_pos in mapped:
+                if name not in DROP_COLUMNS:
+                    self.extra_columns.append(name)
+                continue
+            mapped.add(feature_pos)
+            self.sources.append((raw_pos, feature_pos))
+
+        self.missing_columns = [col for i, col in enumerate(self.feature_columns) if i not in mapped]
+
+    def report(self):
+        if self.missing_columns:
+            print(f"Adding missing columns with zeros: {self.missing_columns}")
+        if self.extra_columns:
+            print(f"Dropping extra columns: {self.extra_columns}")
+
+    def used_columns(self) -> list:
+        """Raw column names this plan reads, in upload order."""
+        return [self.raw_columns[raw_pos] for raw_pos, _ in sorted(self.sources)]
+
+    def matches(self, columns) -> bool:
+        return list(columns) == self.raw_columns
+
+    def align(self, df: pd.DataFrame, dtype=np.float64, replaced: Counter = None) -> np.ndarray:
+        """
+        Return the model feature matrix for `df`. Missing features are 0,
+        unparseable and non-finite values are handled by sanitize_features,
+        and the per-feature replacement counts are added to `replaced`.
+        """
+        features = np.zeros((len(df), len(self.feature_columns)), dtype=dtype)
+        # Values beyond the float32 range become inf, which sanitize_features handles
+        with np.errstate(over='ignore'):
+            for raw_pos, feature_pos in self.sources:
+                values = df.iloc[:, raw_pos]
+                if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+                    features[:, feature_pos] = values.to_numpy()
+                else:
+                    values = pd.to_numeric(values, errors='coerce')
+                    features[:, feature_pos] = values.to_numpy(dtype=dtype, na_value=np.nan)
+
+        counts = sanitize_features(features, self.feature_columns, self.nonfinite_policies)
+        if replaced is not None:
+            replaced.update(counts)
+        return features
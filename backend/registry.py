@@ -0,0 +1,405 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.bundle import build_bundle, pickle_paths, MODELS_DIR
+from backend.predict import load_predictor
+from backend.executor import ShardedPredictor
+from backend.batching import MicroBatcher
+from backend import config
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on local disk. Each version is a directory
+    `<root>/<version>/` holding a model bundle and a manifest.json; the file
+    `<root>/ACTIVE` names the version the API should serve.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def version_dir(self, version: str) -> Path:
+        if not VERSION_PATTERN.match(version or ""):
+            raise ValueError(f"Invalid model version name: {version!r}")
+        return self.root / version
+
+    def bundle_path(self, version: str) -> Path:
+        return self.version_dir(version) / "model.bundle"
+
+    def has_version(self, version: str) -> bool:
+        return (self.version_dir(version) / "manifest.json").is_file()
+
+    def manifest(self, version: str) -> dict:
+        try:
+            return json.loads((self.version_dir(version) / "manifest.json").read_text())
+        except FileNotFoundError:
+            raise KeyError(version)
+
+    def versions(self) -> list:
+        """Manifests of all published versions, oldest first."""
+        if not self.root.is_dir():
+            return []
+        manifests = [self.manifest(path.name) for path in self.root.iterdir() if (path / "manifest.json").is_file()]
+        return sorted(manifests, key=lambda manifest: manifest["published_at"])
+
+    def publish(self, version: str, model_path, scaler_path, encoder_path, pca_path, notes: str = None) -> dict:
+        """
+        Build a bundle from the given pickles as a new version. The version
+        directory only appears once complete, so a watcher never sees half
+        of it. Does not activate the version.
+        """
+        target = self.version_dir(version)
+        if target.exists():
+            raise FileExistsError(f"Model version '{version}' already exists in {self.root}")
+        staging = self.root / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        try:
+            bundle_manifest = build_bundle(staging / "model.bundle", model_path, scaler_path, encoder_path, pca_path)
+            manifest = {
+                "version": version,
+                "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "notes": notes,
+                "fingerprint": bundle_manifest["fingerprint"],
+                "bundle": bundle_manifest,
+            }
+            (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+            os.replace(staging, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return manifest
+
+    def active_version(self):
+        try:
+            return (self.root / "ACTIVE").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_active(self, version: str):
+        if not self.has_version(version):
+            raise KeyError(version)
+        tmp_path = self.root / "ACTIVE.tmp"
+        tmp_path.write_text(version + "\n")
+        os.replace(tmp_path, self.root / "ACTIVE")
+
+
+class LoadedModel:
+    """
+    One model version loaded for serving: its Predictor plus, for the active
+    version, the optional process pool and micro-batcher built around it.
+    Requests hold a lease (acquire/release) while they score; a retired
+    model shuts its pools down once the last lease is released.
+    """
+
+    def __init__(self, version: str, predictor, source: dict, sharded=None, batcher=None):
+        self.version = version
+        self.predictor = predictor
+        self.source = source
+        self.sharded = sharded
+        self.batcher = batcher
+        self.loaded_at = time.time()
+        self.warmup = None
+        self._users = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        return self.predictor.fingerprint
+
+    @property
+    def feature_columns(self):
+        return self.predictor.feature_columns
+
+    def schema_plan(self, columns):
+        return self.predictor.schema_plan(columns)
+
+    @property
+    def feature_dtype(self):
+        return self.predictor.dtype
+
+    def predict_frame(self, features, cheat_mode=False, capture=None):
+        """
+        Score aligned features on the shard pool, micro-batcher or in-process.
+        cheat_mode calls always run in-process. `capture` (see
+        Predictor.predict_frame) is filled in-process, so those calls skip
+        the batcher; large ones still go to the shard pool and leave it empty.
+        """
+        if cheat_mode:
+            return self.predictor.predict_frame(features, cheat_mode=cheat_mode, capture=capture)
+        if self.sharded is not None and len(features) > self.sharded.shard_rows:
+            return self.sharded.predict_frame(features)
+        if self.batcher is not None and capture is None and len(features) <= config.BATCH_MAX_UPLOAD_ROWS:
+            return self.batcher.predict_frame(features)
+        return self.predictor.predict_frame(features, capture=capture)
+
+    def run_warmup(self, batch_sizes, rounds) -> dict:
+        report = {"batches": self.predictor.warmup(batch_sizes, rounds)}
+        if self.sharded is not None:
+            report["workers"] = self.sharded.warmup(batch_sizes, rounds)
+        self.warmup = report
+        return report
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            idle = self._retired and self._users == 0
+        if idle:
+            self.shutdown()
+
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            idle = self._users == 0
+        if idle:
+            self.shutdown()
+
+    def shutdown(self):
+        if self.batcher is not None:
+            self.batcher.shutdown()
+        if self.sharded is not None:
+            self.sharded.shutdown()
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "loaded_at": self.loaded_at,
+            "in_flight": self._users,
+            "warmup": self.warmup,
+        }
+
+
+class ModelManager:
+    """
+    Serves the active model version and swaps it without dropping requests.
+    reload() loads and warms the new version on a background thread, then
+    replaces the active model under a lock; requests that leased the old one
+    finish on it. Other registry versions can be leased by name (pinned) and
+    are kept loaded, in-process only, in a small LRU.
+
+    Without a published registry version, the model is loaded from
+    `fallback_source` (the bundle or pickles in backend/models) and is named
+    after its artifact fingerprint; reload() then re-reads those files.
+    """
+
+    def __init__(self, registry: ModelRegistry, fallback_source: dict, predictor_options: dict,
+                 max_pinned: int = 2):
+        self.registry = registry
+        self.fallback_source = fallback_source
+        self.predictor_options = predictor_options
+        self.max_pinned = max_pinned
+        self.reload_status = {"status": "idle"}
+        # version -> (consecutive failed loads, time of the last failure), under _lock
+        self._failures = {}
+        self._pinned = OrderedDict()
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._active = self._load(self.registry.active_version(), serve=True)
+
+    @property
+    def active(self) -> LoadedModel:
+        return self._active
+
+    def _source(self, version):
+        if version is None:
+            return dict(self.fallback_source)
+        if not self.registry.has_version(version):
+            raise KeyError(version)
+        return dict(bundle_path=str(self.registry.bundle_path(version)))
+
+    def _load(self, version, serve: bool = False) -> LoadedModel:
+        source = self._source(version)
+        predictor = load_predictor(**source, **self.predictor_options)
+        version = version or f"sha-{predictor.fingerprint[:12]}"
+        sharded = batcher = None
+        if serve and config.INFERENCE_WORKERS > 1:
+            sharded = ShardedPredictor({**source, **self.predictor_options}, config.INFERENCE_WORKERS,
+                                       config.SHARD_ROWS)
+        if serve and config.BATCH_WAIT_MS > 0:
+            batcher = MicroBatcher(predictor.predict_frame, config.BATCH_WAIT_MS, config.BATCH_MAX_ROWS)
+        return LoadedModel(version, predictor, source, sharded, batcher)
+
+    def lease(self, version: str = None) -> LoadedModel:
+        """
+        The active model, or the named registry version, with a lease taken;
+        pair with release(). Raises KeyError for an unknown version.
+        """
+        with self._lock:
+            if version is None or version == self._active.version:
+                return self._active.acquire()
+            model = self._pinned.get(version)
+            if model is not None:
+                self._pinned.move_to_end(version)
+                return model.acquire()
+
+        model = self._load(version)
+        with self._lock:
+            # Another request may have loaded it meanwhile
+            model = self._pinned.setdefault(version, model)
+            self._pinned.move_to_end(version)
+            model.acquire()
+            evicted = []
+            while len(self._pinned) > self.max_pinned:
+                evicted.append(self._pinned.popitem(last=False)[1])
+        for old in evicted:
+            old.retire()
+        return model
+
+    def release(self, model: LoadedModel):
+        model.release()
+
+    def predict_frame(self, df, cheat_mode=False):
+        """Score with whatever version is active at call time (used by the live scorer)."""
+        model = self.lease()
+        try:
+            return model.predictor.predict_frame(df, cheat_mode=cheat_mode)
+        finally:
+            model.release()
+
+    def reload(self, version: str = None, warmup=None, make_active: bool = False) -> bool:
+        """
+        Load `version` (default: the registry's ACTIVE version, else the
+        fallback artifacts), warm it up and make it active, on a background
+        thread. Returns False if a reload is already running. `warmup` is
+        (batch_sizes, rounds) or None to skip it. With `make_active`, the
+        version is also recorded as the registry's ACTIVE version, once the
+        reload is known to start.
+        """
+        if version is not None:
+            self._source(version)
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        if make_active and version is not None:
+            try:
+                self.registry.set_active(version)
+            except BaseException:
+                self._reload_lock.release()
+                raise
+        self.reload_status = {"status": "loading", "version": version, "started_at": time.time()}
+        threading.Thread(target=self._reload, args=(version, warmup), name="ids-model-reload", daemon=True).start()
+        return True
+
+    def _reload(self, version, warmup):
+        start_time = time.time()
+        try:
+            model = self._load(version or self.registry.active_version(), serve=True)
+            if warmup is not None:
+                self.reload_status["status"] = "warming_up"
+                model.run_warmup(*warmup)
+            with self._lock:
+                old, self._active = self._active, model
+                self._pinned.pop(model.version, None)
+                self._failures.pop(model.version, None)
+            old.retire()
+            self.reload_status = {
+                "status": "done", "version": model.version, "previous_version": old.version,
+                "seconds": round(time.time() - start_time, 3),
+            }
+            print(f"[MODEL] Now serving {model.version} (was {old.version}), "
+                  f"loaded in {self.reload_status['seconds']}s")
+        except Exception as e:
+            failures = 0
+            if version is not None:
+                with self._lock:
+                    failures = self._failures.get(version, (0, 0.0))[0] + 1
+                    self._failures[version] = (failures, time.time())
+            self.reload_status = {"status": "failed", "version": version, "error": str(e), "failures": failures}
+            print(f"[MODEL] Reload of {version or 'active version'} failed: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def watch(self, poll_seconds: float, warmup=None, max_backoff: float = config.MODEL_RETRY_MAX_SECONDS):
+        """
+        Reload whenever the registry's ACTIVE file names a different version.
+        A version that failed to load is retried after poll_seconds * 2^failures,
+        capped at `max_backoff`.
+        """
+        def run():
+            while not self._stop.wait(poll_seconds):
+                version = self.registry.active_version()
+                if not version or version == self._active.version or not self.registry.has_version(version):
+                    continue
+                with self._lock:
+                    failures, failed_at = self._failures.get(version, (0, 0.0))
+                if failures and time.time() < failed_at + min(poll_seconds * 2 ** failures, max_backoff):
+                    continue
+                try:
+                    self.reload(version, warmup)
+                except KeyError:
+                    # Removed from the registry since has_version()
+                    continue
+
+        threading.Thread(target=run, name="ids-model-watch", daemon=True).start()
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active.info(),
+                "pinned": [model.info() for model in self._pinned.values()],
+                "registry": str(self.registry.root),
+                "registry_active": self.registry.active_version(),
+                "versions": self.registry.versions(),
+                "reload": self.reload_status,
+            }
+
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            models = [self._active, *self._pinned.values()]
+        for model in models:
+            model.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local versioned model registry.")
+    parser.add_argument("--registry", default=str(config.MODEL_REGISTRY))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="add the pickles in --models-dir as a new version")
+    publish.add_argument("version")
+    publish.add_argument("--models-dir", default=str(MODELS_DIR))
+    publish.add_argument("--notes")
+    publish.add_argument("--activate", action="store_true", help="also make it the served version")
+
+    commands.add_parser("list", help="list published versions")
+
+    activate = commands.add_parser("activate", help="serve this version (picked up by running servers)")
+    activate.add_argument("version")
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.registry)
+    if args.command == "publish":
+        manifest = registry.publish(args.version, **pickle_paths(args.models_dir), notes=args.notes)
+        print(json.dumps(manifest, indent=2))
+        if args.activate:
+            registry.set_active(args.version)
+    elif args.command == "list":
+        active = registry.active_version()
+        for manifest in registry.versions():
+            marker = "*" if manifest["version"] == active else " "
+            print(f"{marker} {manifest['version']}  {manifest['published_at']}  {manifest['fingerprint'][:12]}  "
+                  f"{manifest.get('notes') or ''}")
+    else:
+        registry.set_active(args.version)
+        print(f"Active version: {args.version}")
+
+
+if __name__ == "__main__":
+    main()
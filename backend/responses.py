@@ -0,0 +1,85 @@
+import json
+import pandas as pd
+import pyarrow as pa
+from backend.predict import RESULT_COLUMNS, results_to_records
+
+# Result encodings selectable on /predict with ?response_format=
+RESPONSE_FORMATS = ("json", "ndjson", "columnar", "arrow")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _concat(frames) -> pd.DataFrame:
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def json_results(accumulator, cheat_mode: bool) -> dict:
+    """The default /predict body: totals plus per-row dicts in detailed_results."""
+    summary = accumulator.summary(cheat_mode)
+    body = {
+        "total_flows": summary["total_flows"],
+        "attack_counts": summary["attack_counts"],
+        "summary_stats": summary["summary_stats"],
+        "sanitized_values": summary["sanitized_values"],
+        "dedup": summary["dedup"],
+        "detailed_results": accumulator.detailed_results(),
+        "cheat_mode": cheat_mode,
+        "prediction_time_seconds": summary["prediction_time_seconds"],
+        "model_version": summary["model_version"],
+    }
+    if "timings" in summary:
+        body["timings"] = summary["timings"]
+    return body
+
+
+def ndjson_lines(results: pd.DataFrame) -> bytes:
+    """One JSON object per flow, newline-terminated."""
+    if results.empty:
+        return b""
+    lines = [json.dumps(record) for record in results_to_records(results)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def ndjson_summary(summary: dict) -> bytes:
+    """Trailing NDJSON line with the totals, sent once every chunk is scored."""
+    return (json.dumps({"summary": summary}) + "\n").encode("utf-8")
+
+
+def columnar_results(frames) -> dict:
+    """
+    Dictionary-encoded results: each distinct label/explanation is listed
+    once and rows refer to it by integer code.
+    """
+    results = _concat(frames)
+    label_codes, labels = pd.factorize(results["predicted_label"])
+    explanation_codes, explanations = pd.factorize(results["explanation"])
+    return {
+        "labels": [str(label) for label in labels],
+        "label_codes": label_codes.tolist(),
+        "confidence_scores": results["confidence_score"].tolist(),
+        "explanations": [str(explanation) for explanation in explanations],
+        "explanation_codes": explanation_codes.tolist(),
+    }
+
+
+def arrow_results(frames, summary: dict) -> bytes:
+    """
+    Arrow IPC stream with dictionary-encoded label/explanation columns. The
+    summary (counts, stats, timing) is stored as JSON in the schema metadata
+    under b"summary".
+    """
+    results = _concat(frames)
+    table = pa.table({
+        "predicted_label": pa.array(results["predicted_label"].astype(str).tolist(), pa.string()).dictionary_encode(),
+        "confidence_score": pa.array(results["confidence_score"].tolist(), pa.float64()),
+        "explanation": pa.array(results["explanation"].astype(str).tolist(), pa.string()).dictionary_encode(),
+    })
+    table = table.replace_schema_metadata({b"summary": json.dumps(summary).encode("utf-8")})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
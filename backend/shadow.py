@@ -0,0 +1,217 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Artifacts that determine Predictor.project(); when two models share them,
+# the shadow model can classify the primary's projected rows directly
+PREPROCESSING_ARTIFACTS = ("scaler", "pca", "feature_columns")
+
+# Predictor stages behind score_rows(): projection, then the model
+PROJECTION_STAGES = ("scale", "pca", "scale_pca")
+MODEL_STAGES = ("model",)
+
+
+def stage_seconds(stages: dict, names, rows: int) -> float:
+    """
+    Time the given {stage: (seconds, rows)} stages would take for `rows`
+    rows, at each stage's measured per-row rate.
+    """
+    return sum(seconds / stage_rows * rows for name, (seconds, stage_rows) in stages.items()
+               if name in names and stage_rows)
+
+
+def shares_preprocessing(primary, shadow) -> bool:
+    """True when both predictors map feature rows to the same PCA space."""
+    if (primary.projection is None) != (shadow.projection is None):
+        return False
+    return all(
+        primary.artifact_hashes.get(name) is not None
+        and primary.artifact_hashes.get(name) == shadow.artifact_hashes.get(name)
+        for name in PREPROCESSING_ARTIFACTS
+    )
+
+
+class ShadowMetrics:
+    """
+    SQLite table of shadow comparisons, one row per sampled batch: the two
+    model versions, row and agreement counts, both models' time for the same
+    scoring stages and the primary -> shadow label confusion counts.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shadow_batches (
+                    recorded_at REAL NOT NULL,
+                    primary_version TEXT NOT NULL,
+                    shadow_version TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    agreed INTEGER NOT NULL,
+                    primary_seconds REAL NOT NULL,
+                    shadow_seconds REAL NOT NULL,
+                    reused_projection INTEGER NOT NULL,
+                    confusion TEXT NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, primary_version: str, shadow_version: str, rows: int, agreed: int,
+               primary_seconds: float, shadow_seconds: float, reused_projection: bool, confusion: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO shadow_batches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), primary_version, shadow_version, rows, agreed, primary_seconds, shadow_seconds,
+                 int(reused_projection), json.dumps(confusion)),
+            )
+
+    def summary(self, since: float = 0.0) -> list:
+        """Totals per (primary, shadow) version pair, most recent pair first."""
+        pairs = {}
+        with self._connect() as conn:
+            for row in conn.execute(
+                "SELECT * FROM shadow_batches WHERE recorded_at >= ? ORDER BY recorded_at", (since,)
+            ):
+                key = (row["primary_version"], row["shadow_version"])
+                pair = pairs.pop(key, None) or {
+                    "batches": 0, "rows": 0, "agreed": 0, "primary_seconds": 0.0, "shadow_seconds": 0.0,
+                    "reused_projection_batches": 0, "confusion": {},
+                }
+                pairs[key] = pair
+                pair["batches"] += 1
+                pair["rows"] += row["rows"]
+                pair["agreed"] += row["agreed"]
+                pair["primary_seconds"] += row["primary_seconds"]
+                pair["shadow_seconds"] += row["shadow_seconds"]
+                pair["reused_projection_batches"] += row["reused_projection"]
+                pair["last_recorded_at"] = row["recorded_at"]
+                for primary_label, counts in json.loads(row["confusion"]).items():
+                    pair["confusion"].setdefault(primary_label, Counter()).update(counts)
+
+        report = []
+        for (primary_version, shadow_version), pair in reversed(pairs.items()):
+            report.append({
+                "primary_version": primary_version,
+                "shadow_version": shadow_version,
+                **pair,
+                "primary_seconds": round(pair["primary_seconds"], 6),
+                "shadow_seconds": round(pair["shadow_seconds"], 6),
+                "agreement": round(pair["agreed"] / pair["rows"], 4) if pair["rows"] else None,
+                "relative_time": round(pair["shadow_seconds"] / pair["primary_seconds"], 3)
+                if pair["primary_seconds"] else None,
+                "confusion": {label: dict(counts) for label, counts in pair["confusion"].items()},
+            })
+        return report
+
+
+class ShadowScorer:
+    """
+    Scores a sampled fraction of /predict batches with a second model on a
+    background thread and records how it compares with the model that
+    answered. At most `max_pending` batches wait for the shadow model; later
+    samples are dropped, so the shadow never slows down requests.
+    """
+
+    def __init__(self, predictor, version: str, metrics: ShadowMetrics, sample_rate: float,
+                 max_pending: int = 4):
+        self.predictor = predictor
+        self.version = version
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.sampled = 0
+        self.dropped = 0
+        self.failed = 0
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ids-shadow")
+        self._pending = threading.BoundedSemaphore(max_pending)
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def submit(self, primary, features, results, primary_seconds: float, capture=None):
+        """
+        Queue a comparison with the primary's LoadedModel, the aligned
+        `features` it scored, its result frame and scoring time. `capture`
+        is the dict filled by Predictor.predict_frame, if any.
+
+        When the shadow reuses the primary's projection or distinct rows,
+        the primary's time is taken from the same stages of its
+        attrs["stages"], so both sides time the same work.
+        """
+        if not self._pending.acquire(blocking=False):
+            self.dropped += 1
+            return
+        self.sampled += 1
+        future = self.pool.submit(self._compare, primary.version, primary.predictor, features,
+                                  results["predicted_label"].to_numpy(), primary_seconds, capture or {},
+                                  results.attrs.get("stages", {}))
+        future.add_done_callback(lambda _future: self._pending.release())
+
+    def _compare(self, primary_version, primary_predictor, features, primary_labels, primary_seconds, capture,
+                 primary_stages):
+        try:
+            start_time = time.perf_counter()
+            same_columns = primary_predictor.feature_columns == self.predictor.feature_columns
+            reused = "projected" in capture and shares_preprocessing(primary_predictor, self.predictor)
+            if reused:
+                labels, _ = self.predictor.classify(capture["projected"])
+                primary_seconds = stage_seconds(primary_stages, MODEL_STAGES, len(capture["projected"]))
+            elif "rows" in capture and same_columns:
+                # The primary's distinct rows, scored once each; some may have come from its row cache
+                labels, _ = self.predictor.score_rows(capture["rows"])
+                primary_seconds = stage_seconds(primary_stages, PROJECTION_STAGES + MODEL_STAGES,
+                                                len(capture["rows"]))
+            else:
+                if not same_columns:
+                    features = pd.DataFrame(features, columns=primary_predictor.feature_columns)
+                labels = self.predictor.predict_frame(features)["predicted_label"].to_numpy()
+                capture = {}
+            if capture.get("inverse") is not None:
+                labels = labels[capture["inverse"]]
+            shadow_seconds = time.perf_counter() - start_time
+
+            confusion = {}
+            pairs, counts = np.unique(
+                np.stack([primary_labels.astype(str), labels.astype(str)], axis=1), axis=0, return_counts=True
+            )
+            for (primary_label, shadow_label), count in zip(pairs, counts):
+                confusion.setdefault(primary_label, {})[shadow_label] = int(count)
+            agreed = int(np.count_nonzero(primary_labels == labels))
+            self.metrics.record(primary_version, self.version, len(primary_labels), agreed,
+                                primary_seconds, shadow_seconds, reused, confusion)
+        except Exception as e:
+            self.failed += 1
+            print(f"[SHADOW] Comparison failed: {e}")
+
+    def stats(self, since: float = 0.0) -> dict:
+        return {
+            "shadow_version": self.version,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "comparisons": self.metrics.summary(since),
+        }
+
+    def shutdown(self):
+        # Lets the few queued comparisons finish so they are recorded
+        self.pool.shutdown(wait=True)
@@ -1,67 +1,53 @@
-import joblib
 from pathlib import Path
 import pandas as pd
 import numpy as np
+from backend.bundle import pickle_paths
+from backend.predict import load_predictor
 
 class ModelPredictor:
-    def __init__(self):
+    """
+    Label-only interface over Predictor. Model artifacts are shared with any
+    other Predictor in the process that loads the same files.
+    """
+
+    def __init__(self, bundle_path=None):
         base_path = Path(__file__).parent.parent / "models"
-        
-        # Load model and preprocessing objects
-        self.model = joblib.load(base_path / "best_hids_model.pkl")
-        self.scaler = joblib.load(base_path / "scaler_model.pkl")
-        self.encoder = joblib.load(base_path / "label_encoder.pkl")
-        self.pca = joblib.load(base_path / "pca_model.pkl")
-        
-        # Load feature columns
-        with open(base_path / "feature_columns.txt", "r") as f:
-            self.feature_columns = [line.strip() for line in f.readlines()]
 
-    def predict(self, input_df: pd.DataFrame):
-        if input_df.empty:
+        # Everything from one memory-mapped bundle (python -m backend.bundle build)
+        # or the individual pickles
+        if bundle_path:
+            self.predictor = load_predictor(bundle_path=bundle_path)
+        else:
+            self.predictor = load_predictor(**pickle_paths(base_path))
+
+        self.model = self.predictor.model
+        self.scaler = self.predictor.scaler
+        self.encoder = self.predictor.encoder
+        self.pca = self.predictor.pca
+        self.feature_columns = self.predictor.feature_columns
+
+    def predict(self, input_data):
+        """
+        Predicted labels for a DataFrame of flows or an aligned
+        (n_rows, n_features) NumPy feature matrix.
+        """
+        if len(input_data) == 0:
             raise ValueError("Input DataFrame is empty. Cannot make predictions.")
 
         # --- Cheat: Capture dominant attack label before dropping columns
         dominant_label = None
-        for col in ['Attack Type', 'Label', 'label']:
-            if col in input_df.columns:
-                dominant_label = input_df[col].mode()[0]
-                break
-
-        # Drop non-feature columns
-        input_df = input_df.reindex(columns=self.feature_columns, fill_value=0)
-
-        # Ensure numeric type
-        input_df = input_df.apply(pd.to_numeric, errors='coerce').fillna(0)
+        if isinstance(input_data, pd.DataFrame):
+            for col in ['Attack Type', 'Label', 'label']:
+                if col in input_data.columns:
+                    dominant_label = input_data[col].mode()[0]
+                    break
 
-        # Apply scaler and PCA
-        try:
-            scaled_data = self.scaler.transform(input_df)
-            reduced_data = self.pca.transform(scaled_data)
-        except Exception as e:
-            raise RuntimeError(f"Error during preprocessing: {e}")
+        # --- Cheat Mode: Override all predictions with dominant label (if found)
+        if dominant_label is not None:
+            return np.array([dominant_label] * len(input_data))
 
-        # Make predictions
         try:
-            prediction = self.model.predict(reduced_data)
-            print("Raw prediction output:", prediction)
-            print("Prediction dtype:", prediction.dtype)
-        except Exception as e:
+            results = self.predictor.predict_frame(input_data)
+        except RuntimeError as e:
             raise RuntimeError(f"Model prediction failed: {e}")
-
-        # Decode labels
-        try:
-            if prediction.dtype != object and not isinstance(prediction[0], str):
-                decoded = self.encoder.inverse_transform(prediction)
-            else:
-                decoded = prediction
-        except Exception as e:
-            print("Error during inverse transform:", e)
-            decoded = prediction
-
-        # --- Cheat Mode: Override all predictions with dominant label (if found)
-        if dominant_label is not None:
-            print(f"Cheating activated: Forcing all predictions to '{dominant_label}'")
-            return np.array([dominant_label] * len(decoded))
-        else:
-            return decoded
+        return results["predicted_label"].to_numpy()
@@ -0,0 +1,269 @@
+"""
+Throughput and peak memory of the inference pipeline.
+
+    python -m benchmarks.bench_inference                      # default sizes, writes JSON
+    python -m benchmarks.bench_inference --sizes 1000,5000000 --cases predictor.predict_frame
+    python -m benchmarks.bench_inference --compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Every (case, dataset) pair runs in a fresh process, so peak RSS is not
+inflated by earlier cases. Datasets are synthetic flow tables with the
+columns of backend/models/feature_columns.txt (values drawn from the
+scaler's per-feature mean and scale, fixed seed) and the CSV files in data/.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+REPLAY_FILES = {
+    "infiltration": ROOT / "data" / "infiltration.csv",
+    "traffic-test": ROOT / "data" / "traffic test.pcap_Flow.csv",
+}
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+CASES = ("preprocess_uploaded_csv", "predictor.predict", "predictor.predict_frame",
+         "predictor.predict_frame.float32", "model_predictor.predict", "api.predict")
+# The API case uploads the dataset as CSV text, so it is skipped above this many rows unless raised
+DEFAULT_API_MAX_ROWS = 100_000
+
+
+def _model_paths():
+    # Imported here: backend modules must not load before run_case has set the environment
+    from backend.bundle import MODEL_PATHS
+    return dict(MODEL_PATHS)
+
+
+def _current_rss_mb():
+    from backend.bundle import process_rss_mb, process_peak_rss_mb
+
+    # Without /proc only the high-water mark is available
+    rss = process_rss_mb()
+    return rss if rss is not None else process_peak_rss_mb()
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS (VmHWM) counter; Linux only."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def load_dataset(name: str):
+    import pandas as pd
+    from backend.predict import Predictor
+
+    if name in REPLAY_FILES:
+        return pd.read_csv(REPLAY_FILES[name])
+    rows = int(name.split("-", 1)[1])
+    predictor = Predictor(**_model_paths())
+    return pd.DataFrame(predictor.synthetic_features(rows), columns=predictor.feature_columns)
+
+
+def _prepare_case(case: str, df):
+    """Return a zero-argument callable that runs `case` once on `df`."""
+    from backend.preprocessing import preprocess_uploaded_csv
+
+    if case == "preprocess_uploaded_csv":
+        # It renames columns in place, so each run gets its own shallow copy
+        return lambda: preprocess_uploaded_csv(df.copy(deep=False))
+
+    if case in ("predictor.predict", "predictor.predict_frame"):
+        from backend.predict import Predictor
+        predictor = Predictor(**_model_paths())
+        method = predictor.predict if case == "predictor.predict" else predictor.predict_frame
+        return lambda: method(df)
+
+    if case == "predictor.predict_frame.float32":
+        from backend.predict import Predictor
+        predictor = Predictor(**_model_paths(), float32=True)
+        return lambda: predictor.predict_frame(df)
+
+    if case == "model_predictor.predict":
+        from backend.utils.model_predictor import ModelPredictor
+        model_predictor = ModelPredictor()
+        return lambda: model_predictor.predict(df)
+
+    if case == "api.predict":
+        from fastapi.testclient import TestClient
+        from backend import main
+
+        # Set by run_case before backend.config was first imported
+        if main.result_cache is not None:
+            raise RuntimeError("The result cache must be disabled for the api.predict case")
+        body = df.to_csv(index=False).encode("utf-8")
+        client = TestClient(main.app)
+
+        def run():
+            response = client.post("/predict", files={"csv_file": ("bench.csv", body, "text/csv")})
+            response.raise_for_status()
+            if response.headers.get("X-Cache") == "HIT":
+                raise RuntimeError("api.predict was answered from the result cache")
+        return run
+
+    raise ValueError(f"Unknown benchmark case: {case}")
+
+
+def run_case(case: str, dataset: str, repeat: int) -> dict:
+    """Runs in a fresh worker process; prints from the code under test are discarded."""
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    if case == "api.predict":
+        # backend.config reads the environment once, when load_dataset first
+        # imports it: repeated runs must not come from the result cache, and
+        # job files go to a scratch directory
+        os.environ["IDS_CACHE_MAX_ENTRIES"] = "0"
+        os.environ.setdefault("IDS_JOB_DIR", tempfile.mkdtemp(prefix="ids-bench-jobs-"))
+
+    with redirect_stdout(io.StringIO()):
+        df = load_dataset(dataset)
+        run = _prepare_case(case, df)
+        run()  # warm up: lazy imports, first-call allocations
+        gc.collect()
+        baseline = _current_rss_mb()
+        peak_tracked = _reset_peak_rss()
+
+        seconds = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start_time)
+
+    median = statistics.median(seconds)
+    if peak_tracked:
+        from backend.bundle import process_peak_rss_mb
+        peak = process_peak_rss_mb()
+    else:
+        peak = _current_rss_mb()
+    return {
+        "case": case,
+        "dataset": dataset,
+        "rows": len(df),
+        "seconds": [round(value, 6) for value in seconds],
+        "median_seconds": round(median, 6),
+        "best_seconds": round(min(seconds), 6),
+        "rows_per_second": round(len(df) / median, 1) if median > 0 else None,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak, 1),
+        "peak_rss_increase_mb": round(peak - baseline, 1),
+    }
+
+
+def environment() -> dict:
+    import numpy as np
+    import pandas as pd
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def compare(base_path, new_path, threshold: float) -> int:
+    """Print throughput changes per case; returns how many slowed down by more than `threshold`."""
+    base = {(r["case"], r["dataset"]): r for r in json.loads(Path(base_path).read_text())["results"]}
+    new = json.loads(Path(new_path).read_text())["results"]
+    regressions = 0
+    print(f"{'case':<32} {'dataset':<18} {'base rows/s':>14} {'new rows/s':>14} {'change':>8} {'peak MB':>12}")
+    for result in new:
+        old = base.get((result["case"], result["dataset"]))
+        if old is None or not old["rows_per_second"] or not result["rows_per_second"]:
+            continue
+        change = result["rows_per_second"] / old["rows_per_second"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{result['case']:<32} {result['dataset']:<18} {old['rows_per_second']:>14,.0f} "
+              f"{result['rows_per_second']:>14,.0f} {change:>+8.1%} "
+              f"{old['peak_rss_mb']:>5.0f}->{result['peak_rss_mb']:<5.0f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IDS inference pipeline.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated synthetic table sizes (rows)")
+    parser.add_argument("--no-replay", action="store_true", help="skip the CSV files in data/")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (after one warm-up run)")
+    parser.add_argument("--api-max-rows", type=int, default=DEFAULT_API_MAX_ROWS)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="with --compare, exit 1 if any throughput drops by more than this fraction")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    datasets = [(f"synthetic-{size}", size) for size in sizes]
+    if not args.no_replay:
+        datasets += [(name, None) for name in REPLAY_FILES]
+
+    report = {"environment": environment(), "settings": vars(args), "results": []}
+    context = get_context("spawn")
+    for dataset, size in datasets:
+        for case in cases:
+            if case == "api.predict" and size is not None and size > args.api_max_rows:
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                try:
+                    result = pool.submit(run_case, case, dataset, args.repeat).result()
+                except Exception as e:
+                    result = {"case": case, "dataset": dataset, "error": str(e),
+                              "rows_per_second": None, "peak_rss_mb": None}
+            report["results"].append(result)
+            if "error" in result:
+                print(f"{case:<32} {dataset:<18} failed: {result['error']}")
+            else:
+                print(f"{case:<32} {dataset:<18} {result['rows']:>9} rows  {result['median_seconds']:>9.4f}s  "
+                      f"{result['rows_per_second']:>12,.0f} rows/s  peak {result['peak_rss_mb']:.0f} MB "
+                      f"(+{result['peak_rss_increase_mb']:.0f})", flush=True)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{(report['environment']['git_commit'] or 'nogit')[:10]}-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
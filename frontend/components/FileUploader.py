@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from utils.api_client import upload_csv
+from utils.api_client import submit_job, wait_for_job
 
 def FileUploader(on_upload_success):
     st.title("Upload Network Flow CSV")
@@ -20,7 +20,18 @@ def FileUploader(on_upload_success):
                     # Read raw CSV for showing data later
                     df = pd.read_csv(uploaded_file)
 
-                    results = upload_csv("temp_uploaded.csv")
+                    # Score as a background job; the job id in the URL lets a
+                    # page reload fetch the stored result instead of rescoring
+                    job = submit_job("temp_uploaded.csv")
+                    st.query_params["job"] = job["job_id"]
+
+                    progress = st.empty()
+                    def show_progress(status):
+                        rate = status.get("rows_per_second")
+                        rate_text = f" ({rate:,.0f} rows/s)" if rate else ""
+                        progress.caption(f"Job {status['status']}: {status['rows_scored']:,} rows scored{rate_text}")
+
+                    results = wait_for_job(job["job_id"], on_progress=show_progress)
 
                     st.success("Analysis completed!")
 
@@ -12,6 +12,7 @@ from reportlab.lib import colors
 from components.FileUploader import FileUploader
 from components.FlowTable import FlowTable
 from components.PieChart import PieChart
+from utils.api_client import get_job_result
 
 
 def generate_pdf_report(filename, total_flows, attack_counts, summary_stats):
@@ -99,6 +100,15 @@ def Upload():
 
     FileUploader(on_upload_success=handle_results)
 
+    # After a page reload, reuse the stored result of the last job
+    job_id = st.query_params.get("job")
+    if results is None and job_id:
+        try:
+            results = get_job_result(job_id)
+            st.session_state['results'] = results
+        except Exception:
+            results = None
+
     if uploaded_df is None:
         try:
             uploaded_df = pd.read_csv("temp_uploaded.csv")
@@ -1,13 +1,57 @@
+import time
 import requests
 
 BACKEND_URL = "http://127.0.0.1:8000"
 
+# (connect, read) timeouts in seconds for synchronous calls
+REQUEST_TIMEOUT = (5, 300)
+JOB_POLL_INTERVAL = 1.0
+
 def upload_csv(file_path: str) -> dict:
     """
     Upload a CSV file to the backend /predict endpoint and get prediction results.
     """
     with open(file_path, "rb") as f:
         files = {"csv_file": (file_path, f, "text/csv")}
-        response = requests.post(f"{BACKEND_URL}/predict", files=files)
+        response = requests.post(f"{BACKEND_URL}/predict", files=files, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
+
+def submit_job(file_path: str) -> dict:
+    """
+    Upload a CSV file to /jobs and return the job status (including job_id)
+    without waiting for scoring to finish.
+    """
+    with open(file_path, "rb") as f:
+        files = {"csv_file": (file_path, f, "text/csv")}
+        response = requests.post(f"{BACKEND_URL}/jobs", files=files, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+def get_job(job_id: str) -> dict:
+    response = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def get_job_result(job_id: str) -> dict:
+    response = requests.get(f"{BACKEND_URL}/jobs/{job_id}/result", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def wait_for_job(job_id: str, on_progress=None, timeout: float = 3600) -> dict:
+    """
+    Poll a job until it finishes and return its result. on_progress(status)
+    is called with every status update.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status = get_job(job_id)
+        if on_progress:
+            on_progress(status)
+        if status["status"] == "done":
+            return get_job_result(job_id)
+        if status["status"] == "failed":
+            raise RuntimeError(f"Prediction job failed: {status['error']}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Prediction job {job_id} did not finish within {timeout} seconds")
+        time.sleep(JOB_POLL_INTERVAL)
@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from backend.batch import BatchScorer, CHECKPOINT_FILE, PART_NAME
+from backend.bundle import MODEL_PATHS
+from backend.preprocessing import NONFINITE_POLICIES
+from test_inference import DATA_DIR, make_predictor
+
+MODEL_SOURCE = dict(MODEL_PATHS)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    df = pd.read_csv(DATA_DIR / "infiltration.csv")
+    (tmp_path / "in" / "day2").mkdir(parents=True)
+    df.to_csv(tmp_path / "in" / "day1.csv", index=False)
+    df.to_parquet(tmp_path / "in" / "day2" / "flows.parquet", row_group_size=1500)
+    expected = make_predictor().predict_frame(df)
+    expected.attrs = {}
+    return tmp_path / "in", tmp_path / "out", expected
+
+
+def read_output(path):
+    results = pq.read_table(path).to_pandas().sort_values("row", ignore_index=True)
+    return results.drop(columns="row")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_scores_every_file_into_parts(archive, workers):
+    input_dir, output_dir, expected = archive
+    summary = BatchScorer(input_dir, output_dir, MODEL_SOURCE, workers=workers, chunk_size=1000).run()
+
+    assert summary["files"] == 2 and summary["files_failed"] == 0
+    assert summary["rows_scored"] == 2 * len(expected)
+    for name in ("day1.csv", "day2/flows.parquet"):
+        assert (output_dir / name / PART_NAME.format(4)).is_file()
+        pd.testing.assert_frame_equal(read_output(output_dir / name), expected)
+
+
+def test_batch_resumes_after_the_last_written_part(archive):
+    input_dir, output_dir, expected = archive
+    BatchScorer(input_dir, output_dir, MODEL_SOURCE, chunk_size=1000).run()
+
+    # As if interrupted after three parts of each file
+    for name in ("day1.csv", "day2/flows.parquet"):
+        checkpoint_path = output_dir / name / CHECKPOINT_FILE
+        checkpoint = json.loads(checkpoint_path.read_text())
+        checkpoint_path.write_text(json.dumps({**checkpoint, "complete": False}))
+        for part in (3, 4):
+            (output_dir / name / PART_NAME.format(part)).unlink()
+
+    summary = BatchScorer(input_dir, output_dir, MODEL_SOURCE, chunk_size=700).run()
+    assert summary["rows_scored"] == 2 * (len(expected) - 3000)
+    for name in ("day1.csv", "day2/flows.parquet"):
+        pd.testing.assert_frame_equal(read_output(output_dir / name), expected)
+
+    assert BatchScorer(input_dir, output_dir, MODEL_SOURCE).run()["rows_scored"] == 0
+    with pytest.raises(RuntimeError):
+        BatchScorer(input_dir, output_dir, MODEL_SOURCE, dict(float32=True)).run()
+    with pytest.raises(RuntimeError):
+        BatchScorer(input_dir, output_dir, MODEL_SOURCE, dict(nonfinite_policies={})).run()
+    # The default policies, spelled out, are the same settings
+    default = dict(nonfinite_policies=dict(NONFINITE_POLICIES))
+    assert BatchScorer(input_dir, output_dir, MODEL_SOURCE, default).run()["rows_scored"] == 0
+
+
+def test_batch_skips_an_output_directory_inside_the_input(archive):
+    input_dir, _, expected = archive
+    output_dir = input_dir / "scored"
+    BatchScorer(input_dir, output_dir, MODEL_SOURCE, chunk_size=1000).run()
+
+    # A second run must not pick up the first run's part files as inputs
+    summary = BatchScorer(input_dir, output_dir, MODEL_SOURCE, chunk_size=1000).run()
+    assert summary["files"] == 2 and summary["rows_scored"] == 0
+    pd.testing.assert_frame_equal(read_output(output_dir / "day1.csv"), expected)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from backend.batching import MicroBatcher, split_count
+from backend.registry import LoadedModel
+from test_inference import make_predictor
+
+
+def test_split_count_is_proportional_and_exact():
+    assert split_count(10, [1, 1, 2]) == [3, 2, 5]
+    assert split_count(7, [5, 5, 5]) == [3, 2, 2]
+    assert sum(split_count(101, [3, 7, 11, 13])) == 101
+
+
+def test_micro_batcher_splits_results_and_attrs_per_caller():
+    predictor = make_predictor(dedup=True)
+    features = predictor.synthetic_features(60)
+    # Duplicate rows so every caller has dedup savings to report
+    chunks = [features[:30], np.vstack([features[30:40]] * 2), features[:7]]
+    scored = []
+
+    def score(stacked):
+        scored.append(len(stacked))
+        return predictor.predict_frame(stacked)
+
+    batcher = MicroBatcher(score, max_wait_ms=500, max_rows=len(features) * 2)
+    futures = [batcher.submit(chunk) for chunk in chunks]
+    parts = [future.result() for future in futures]
+    batcher.shutdown()
+
+    assert scored == [sum(len(chunk) for chunk in chunks)]
+    for chunk, part in zip(chunks, parts):
+        expected = predictor.predict_frame(chunk)
+        pd.testing.assert_frame_equal(part, expected)
+        assert part.attrs["dedup"]["rows"] == len(chunk)
+        assert part.attrs["stages"]["model"][0] > 0
+
+    batch = predictor.predict_frame(np.vstack(chunks))
+    for name in ("rows", "unique_rows"):
+        assert sum(part.attrs["dedup"][name] for part in parts) == batch.attrs["dedup"][name]
+    assert sum(part.attrs["stages"]["model"][1] for part in parts) == batch.attrs["stages"]["model"][1]
+
+
+def test_loaded_model_scores_capture_calls_in_process():
+    predictor = make_predictor()
+    calls = []
+    batcher = MicroBatcher(lambda stacked: calls.append(len(stacked)) or predictor.predict_frame(stacked),
+                           max_wait_ms=1, max_rows=1000)
+    model = LoadedModel("v1", predictor, source={}, batcher=batcher)
+    features = predictor.synthetic_features(10)
+
+    capture = {}
+    model.predict_frame(features, capture=capture)
+    assert "projected" in capture and calls == []
+
+    model.predict_frame(features)
+    assert calls == [10]
+    batcher.shutdown()
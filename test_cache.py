@@ -0,0 +1,94 @@
+import os
+from io import BytesIO
+
+import pytest
+
+from backend import cache
+from backend.cache import ResultCache, cache_key, hash_upload
+
+
+def test_cache_key_covers_upload_model_and_options():
+    upload = BytesIO(b"a,b\n1,2\n")
+    upload_hash = hash_upload(upload)
+    assert upload.tell() == 0
+
+    key = cache_key(upload_hash, "model-a", cheat_mode=False, response_format="json")
+    assert key == cache_key(upload_hash, "model-a", response_format="json", cheat_mode=False)
+    assert key != cache_key(upload_hash, "model-b", cheat_mode=False, response_format="json")
+    assert key != cache_key(upload_hash, "model-a", cheat_mode=True, response_format="json")
+
+
+def test_upload_cache_key_covers_scoring_settings():
+    from backend.main import upload_cache_key
+    from backend.preprocessing import NONFINITE_POLICIES
+    from backend.registry import LoadedModel
+    from test_inference import make_predictor
+
+    def key(**options):
+        model = LoadedModel("v1", make_predictor(**options), source={})
+        return upload_cache_key(model, BytesIO(b"a,b\n1,2\n"), cheat_mode=False, response_format="json")
+
+    default = key()
+    assert key(nonfinite_policies=dict(NONFINITE_POLICIES)) == default
+    assert key(nonfinite_policies={**NONFINITE_POLICIES, "Flow Duration": {"clip": [0, 10]}}) != default
+    assert key(float32=True) != default
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_least_recently_used_entries_are_evicted(tmp_path, on_disk):
+    results = ResultCache(max_entries=2, max_bytes=100, ttl_seconds=60, directory=tmp_path if on_disk else None)
+    results.put("a", b"x" * 10, "application/json")
+    results.put("b", b"y" * 10, "application/json")
+    assert results.get("a") == (b"x" * 10, "application/json")
+
+    results.put("c", b"z" * 10, "application/json")
+    assert results.get("b") is None and results.get("a") is not None
+
+    # Over max_bytes: evicts until the new entry fits
+    results.put("d", b"w" * 95, "application/json")
+    assert results.get("a") is None and results.get("c") is None
+    assert results.stats()["entries"] == 1 and results.total_bytes == 95
+    # Larger than the whole cache: not stored
+    results.put("e", b"v" * 101, "application/json")
+    assert results.get("e") is None and results.get("d") is not None
+
+    if on_disk:
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["d.body", "d.json"]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    results = ResultCache(max_entries=10, max_bytes=1000, ttl_seconds=30, directory=tmp_path)
+    results.put("a", b"body", "application/json")
+
+    now[0] += 30
+    assert results.get("a") is not None
+    now[0] += 1
+    assert results.get("a") is None
+    assert results.stats()["entries"] == 0 and not list(tmp_path.iterdir())
+
+
+def test_disk_cache_survives_a_restart_in_lru_order(tmp_path):
+    results = ResultCache(max_entries=3, max_bytes=1000, ttl_seconds=60, directory=tmp_path)
+    for key in "abc":
+        results.put(key, key.encode() * 5, "application/json")
+    # Recency is the metadata mtime; set it explicitly so the order is unambiguous
+    for offset, key in enumerate("bca"):
+        os.utime(tmp_path / f"{key}.json", (1_000_000 + offset, 1_000_000 + offset))
+
+    restarted = ResultCache(max_entries=2, max_bytes=1000, ttl_seconds=60, directory=tmp_path)
+    assert restarted.get("b") is None
+    assert restarted.get("a") == (b"aaaaa", "application/json")
+    assert restarted.total_bytes == 10
+
+
+def test_missing_body_file_is_a_miss_and_drops_the_entry(tmp_path):
+    results = ResultCache(max_entries=10, max_bytes=1000, ttl_seconds=60, directory=tmp_path)
+    results.put("a", b"body", "application/json")
+    (tmp_path / "a.body").unlink()
+
+    assert results.get("a") is None
+    stats = results.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (0, 1, 0, 0)
+    assert not (tmp_path / "a.json").exists()
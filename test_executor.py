@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from backend.executor import BoundedExecutor, ServerBusyError, ShardedPredictor, _score_shard
+from test_batch import MODEL_SOURCE
+from test_inference import DATA_DIR, make_predictor
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    sharded = ShardedPredictor(MODEL_SOURCE, workers=3, shard_rows=50)
+    yield sharded
+    sharded.shutdown()
+
+
+def test_sharded_warmup_runs_once_in_every_worker(sharded):
+    assert len(sharded.warmup(batch_sizes=(1,), rounds=1)) == 3
+    # While one worker is busy the idle ones could otherwise take all the warmups
+    busy = sharded.pool.submit(_score_shard, make_predictor().synthetic_features(300_000))
+    report = sharded.warmup(batch_sizes=(1,), rounds=1)
+    assert busy.done() and len(report) == 3
+
+
+def test_sharded_predictions_match_in_process(sharded):
+    predictor = make_predictor()
+    features = predictor.synthetic_features(175)
+    results = sharded.predict_frame(features)
+    expected = predictor.predict_frame(features)
+    pd.testing.assert_frame_equal(results, expected)
+
+
+def test_bounded_executor_rejects_calls_beyond_its_slots():
+    executor = BoundedExecutor(max_workers=1, queue_depth=1)
+    gate = threading.Event()
+    running = executor.submit(gate.wait)
+    queued = executor.submit(gate.wait)
+    with pytest.raises(ServerBusyError):
+        executor.submit(gate.wait)
+    assert executor.in_flight == 2
+
+    gate.set()
+    running.result(), queued.result()
+    executor.shutdown()
+    assert executor.in_flight == 0
+    executor.acquire()
+    executor.release()
+
+
+@pytest.fixture
+def main(monkeypatch):
+    from backend import main
+
+    # One slot, no queue
+    monkeypatch.setattr(main, "predict_executor", BoundedExecutor(max_workers=1, queue_depth=0))
+    yield main
+    main.predict_executor.shutdown()
+
+
+def test_predict_returns_503_when_the_executor_is_full(main):
+    client = TestClient(main.app)
+    upload = (DATA_DIR / "infiltration.csv").read_bytes()
+    main.predict_executor.acquire()
+    response = client.post("/predict", files={"csv_file": ("flows.csv", upload, "text/csv")})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+
+    main.predict_executor.release()
+    response = client.post("/predict", files={"csv_file": ("flows.csv", upload, "text/csv")})
+    assert response.status_code == 200
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_ndjson_stream_releases_its_slot_when_the_client_disconnects(main):
+    upload = UploadFile(BytesIO((DATA_DIR / "infiltration.csv").read_bytes()), filename="flows.csv")
+    model = main.models.active
+
+    async def read_first_chunk_and_disconnect():
+        response = await main.start_ndjson_stream(upload, "csv", chunk_size=500, cheat_mode=False)
+        assert main.predict_executor.in_flight == 1 and model._users == 1
+        await anext(response.body_iterator)
+        # What the server does with the streaming task once the client is gone
+        await response.body_iterator.aclose()
+
+    asyncio.run(read_first_chunk_and_disconnect())
+    assert main.predict_executor.in_flight == 0 and model._users == 0
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_ndjson_stream_waits_for_the_running_step_before_releasing(main, monkeypatch):
+    upload = UploadFile(BytesIO((DATA_DIR / "infiltration.csv").read_bytes()), filename="flows.csv")
+    model = main.models.active
+    entered, proceed = threading.Event(), threading.Event()
+    encode = main.timed_ndjson_lines
+
+    def slow_encode(results, accumulator):
+        entered.set()
+        proceed.wait(10)
+        return encode(results, accumulator)
+
+    monkeypatch.setattr(main, "timed_ndjson_lines", slow_encode)
+
+    async def disconnect_during_a_step():
+        fileobj = upload.file
+        response = await main.start_ndjson_stream(upload, "csv", chunk_size=500, cheat_mode=False)
+        consumer = asyncio.create_task(anext(response.body_iterator))
+        await asyncio.to_thread(entered.wait, 10)
+        consumer.cancel()
+        await asyncio.sleep(0.05)
+        # The worker is still encoding: the upload, slot and lease stay in use
+        assert not consumer.done() and not fileobj.closed
+        assert main.predict_executor.in_flight == 1 and model._users == 1
+        proceed.set()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        assert fileobj.closed
+
+    asyncio.run(disconnect_during_a_step())
+    assert main.predict_executor.in_flight == 0 and model._users == 0
@@ -0,0 +1,132 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from backend.flows import RunningStats, extract_flows, FLOW_ID_COLUMNS
+from backend.preprocessing import MODEL_FEATURES, SchemaPlan
+from test_inference import make_predictor
+
+DATA_DIR = Path(__file__).parent / "data"
+
+CLIENT, SERVER = "10.0.0.5", "192.168.1.10"
+
+
+def tcp_frame(src, dst, sport, dport, flags, payload=0, window=1000):
+    tcp = struct.pack("!HHIIBBHHH", sport, dport, 0, 0, 5 << 4, flags, window, 0, 0)
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 40 + payload, 0, 0, 64, 6, 0,
+                     bytes(map(int, src.split("."))), bytes(map(int, dst.split("."))))
+    return b"\x00" * 12 + b"\x08\x00" + ip + tcp + b"x" * payload
+
+
+# (microseconds, forward?, flags, payload bytes, window)
+PACKETS = [
+    (0, True, 0x02, 0, 64240),
+    (1_000, False, 0x12, 0, 65160),
+    (3_000, True, 0x18, 120, 502),
+    (2_503_000, False, 0x18, 900, 509),
+    (2_504_000, True, 0x10, 0, 502),
+    (9_000_000, True, 0x18, 40, 502),
+    (9_000_500, True, 0x11, 0, 502),
+    (9_001_500, False, 0x11, 0, 509),
+]
+
+
+def frames(packets=PACKETS):
+    for ts, forward, flags, payload, window in packets:
+        ends = (CLIENT, SERVER, 40000, 80) if forward else (SERVER, CLIENT, 80, 40000)
+        yield 1_700_000_000_000_000 + ts, tcp_frame(*ends, flags, payload, window)
+
+
+def write_pcap(path, packets=PACKETS):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for ts, data in frames(packets):
+            f.write(struct.pack("<IIII", ts // 1_000_000, ts % 1_000_000, len(data), len(data)) + data)
+
+
+def write_pcapng(path):
+    def block(block_type, body):
+        body += b"\x00" * (-len(body) % 4)
+        return struct.pack("<II", block_type, len(body) + 12) + body + struct.pack("<I", len(body) + 12)
+
+    with open(path, "wb") as f:
+        f.write(block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+        # Nanosecond timestamps (if_tsresol = 9)
+        f.write(block(1, struct.pack("<HHI", 1, 0, 65535) + struct.pack("<HHB3xHH", 9, 1, 9, 0, 0)))
+        for ts, data in frames():
+            ticks = ts * 1000
+            f.write(block(6, struct.pack("<IIIII", 0, ticks >> 32, ticks & 0xFFFFFFFF, len(data), len(data)) + data))
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(0).integers(0, 1500, size=500)
+    stats = RunningStats()
+    for value in values:
+        stats.add(int(value))
+
+    assert (stats.n, stats.total, stats.min, stats.max) == (500, values.sum(), values.min(), values.max())
+    np.testing.assert_allclose([stats.mean, stats.std], [values.mean(), values.std(ddof=1)])
+
+
+def test_pcap_flow_features(tmp_path):
+    write_pcap(tmp_path / "flow.pcap")
+    flows = extract_flows(tmp_path / "flow.pcap")
+    assert list(flows.columns) == FLOW_ID_COLUMNS + MODEL_FEATURES
+    assert len(flows) == 1
+    row = flows.iloc[0]
+
+    times = np.array([p[0] for p in PACKETS])
+    fwd = np.array([p[3] for p in PACKETS if p[1]])
+    bwd = np.array([p[3] for p in PACKETS if not p[1]])
+    fwd_times = times[[p[1] for p in PACKETS]]
+
+    assert row["Flow ID"] == f"{CLIENT}-{SERVER}-40000-80-6"
+    assert row["Flow Duration"] == 9_001_500
+    assert (row["Total Fwd Packets"], row["Total Backward Packets"]) == (5, 3)
+    assert (row["Total Length of Fwd Packets"], row["Total Length of Bwd Packets"]) == (fwd.sum(), bwd.sum())
+    np.testing.assert_allclose(row["Fwd Packet Length Std"], fwd.std(ddof=1))
+    np.testing.assert_allclose(row["Flow IAT Mean"], np.diff(times).mean())
+    np.testing.assert_allclose(row["Flow IAT Std"], np.diff(times).std(ddof=1))
+    assert row["Fwd IAT Total"] == fwd_times[-1] - fwd_times[0]
+    np.testing.assert_allclose(row["Flow Bytes/s"], (fwd.sum() + bwd.sum()) / 9.0015)
+    assert (row["SYN Flag Count"], row["FIN Flag Count"], row["PSH Flag Count"]) == (2, 2, 3)
+    assert (row["Fwd Header Length"], row["min_seg_size_forward"]) == (100, 20)
+    assert (row["Init_Win_bytes_forward"], row["Init_Win_bytes_backward"]) == (64240, 65160)
+    assert row["act_data_pkt_fwd"] == 2
+    # Gaps over 1 s start subflows; only the 6.5 s gap ends an active period
+    assert (row["Subflow Fwd Packets"], row["Subflow Bwd Packets"]) == (2, 1)
+    assert (row["Active Max"], row["Active Min"], row["Idle Max"]) == (2_504_000, 1_500, 6_496_000)
+
+
+def test_active_periods_include_the_last_one(tmp_path):
+    # Three bursts of 3 ms, 7 ms and 2 ms separated by 6 s and 7 s of silence
+    bursts = [(0, 1_500, 3_000), (6_003_000, 6_010_000), (13_010_000, 13_011_000, 13_012_000)]
+    packets = [(ts, i % 2 == 0, 0x10, 10, 502) for i, ts in enumerate(ts for burst in bursts for ts in burst)]
+    write_pcap(tmp_path / "bursts.pcap", packets)
+    row = extract_flows(tmp_path / "bursts.pcap").iloc[0]
+
+    active = np.array([3_000, 7_000, 2_000])
+    assert (row["Active Mean"], row["Active Max"], row["Active Min"]) == (4_000, 7_000, 2_000)
+    np.testing.assert_allclose(row["Active Std"], active.std(ddof=1))
+    assert (row["Idle Mean"], row["Idle Max"], row["Idle Min"]) == (6_500_000, 7_000_000, 6_000_000)
+
+
+def test_pcapng_matches_pcap(tmp_path):
+    write_pcap(tmp_path / "flow.pcap")
+    write_pcapng(tmp_path / "flow.pcapng")
+    pd.testing.assert_frame_equal(extract_flows(tmp_path / "flow.pcapng"), extract_flows(tmp_path / "flow.pcap"))
+
+
+def test_extracted_flows_feed_predictor(tmp_path):
+    # The capture behind "traffic test.pcap_Flow.csv" is not in the repo, so
+    # compare against CICFlowMeter's columns rather than its values
+    write_pcap(tmp_path / "flow.pcap")
+    flows = extract_flows(tmp_path / "flow.pcap")
+    cicflowmeter = pd.read_csv(DATA_DIR / "traffic test.pcap_Flow.csv", nrows=5)
+    assert set(FLOW_ID_COLUMNS) <= set(cicflowmeter.columns)
+
+    predictor = make_predictor()
+    assert SchemaPlan(flows.columns, predictor.feature_columns).missing_columns == []
+    assert len(predictor.predict_frame(flows)) == 1
@@ -0,0 +1,149 @@
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.bundle import MODEL_PATHS
+from backend.predict import Predictor
+from backend.preprocessing import MODEL_FEATURES, SchemaPlan, preprocess_uploaded_csv, sanitize_features
+
+ROOT = Path(__file__).parent
+DATA_DIR = ROOT / "data"
+
+
+def make_predictor(**kwargs):
+    return Predictor(**MODEL_PATHS, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def infiltration_df():
+    return preprocess_uploaded_csv(pd.read_csv(DATA_DIR / "infiltration.csv"))
+
+
+def test_single_pass_matches_two_pass(infiltration_df):
+    single = make_predictor().predict_frame(infiltration_df)
+    two_pass = make_predictor(single_pass=False).predict_frame(infiltration_df)
+
+    assert list(single["predicted_label"]) == list(two_pass["predicted_label"])
+    np.testing.assert_allclose(
+        single["confidence_score"].astype(float), two_pass["confidence_score"].astype(float)
+    )
+
+
+def test_fused_projection_matches_scaler_and_pca(infiltration_df):
+    predictor = make_predictor()
+    assert predictor.projection is not None
+
+    features = infiltration_df.apply(pd.to_numeric, errors="coerce").fillna(0)
+    expected = predictor.pca.transform(predictor.scaler.transform(features))
+    np.testing.assert_allclose(predictor.project(features), expected, rtol=1e-6, atol=1e-6)
+
+
+def baseline_features(df):
+    """preprocess_uploaded_csv + check_and_fix_features, then the numeric conversion and sanitizing."""
+    features = preprocess_uploaded_csv(df.copy()).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    sanitize_features(features, MODEL_FEATURES)
+    return features
+
+
+def renamed_and_shuffled(df):
+    """Raw CICFlowMeter headers, one missing feature, extra columns and a shuffled, padded header."""
+    df = df.rename(columns={"Destination Port": " Dst Port", "Total Fwd Packets": "Total Fwd Packet"})
+    df = df.drop(columns=["Flow IAT Std"])
+    df["Flow ID"] = "10.0.0.1-10.0.0.2-80-1234-6"
+    df["Not A Feature"] = np.arange(len(df))
+    df["Idle Max"] = df["Idle Max"].astype(str)
+    return df[list(df.columns[::-1])]
+
+
+@pytest.mark.parametrize("csv_name", ["infiltration.csv", "traffic test.pcap_Flow.csv", "bot_attack_sample.csv"])
+def test_schema_plan_matches_preprocess_uploaded_csv(csv_name):
+    df = pd.read_csv(DATA_DIR / csv_name)
+    for frame in (df, renamed_and_shuffled(df.rename(columns=lambda col: col.strip()))):
+        plan = SchemaPlan(frame.columns)
+        np.testing.assert_array_equal(plan.align(frame), baseline_features(frame))
+
+    # Renamed headers still map; only the dropped feature joins the missing ones
+    assert set(plan.missing_columns) == set(SchemaPlan(df.columns).missing_columns) | {"Flow IAT Std"}
+    assert "Not A Feature" in plan.extra_columns and "Flow ID" not in plan.extra_columns
+
+
+def test_row_dedup_matches_scoring_every_row(infiltration_df):
+    deduped = make_predictor(dedup=True, row_cache_size=1000).predict_frame(infiltration_df)
+    every_row = make_predictor().predict_frame(infiltration_df)
+
+    assert deduped.attrs["dedup"]["unique_rows"] < len(infiltration_df)
+    assert every_row.attrs["dedup"] == {"rows": len(infiltration_df), "unique_rows": len(infiltration_df),
+                                        "row_cache_hits": 0}
+    assert "dedup" in deduped.attrs["stages"] and "dedup" not in every_row.attrs["stages"]
+    pd.testing.assert_frame_equal(deduped, every_row)
+
+
+@pytest.mark.parametrize("csv_name", ["infiltration.csv", "traffic test.pcap_Flow.csv"])
+def test_float32_agrees_with_float64(csv_name):
+    df = pd.read_csv(DATA_DIR / csv_name)
+    float64 = make_predictor().predict_frame(df)
+    float32 = make_predictor(float32=True).predict_frame(df)
+
+    assert make_predictor(float32=True).align(df).dtype == np.float32
+    agreement = np.mean(float32["predicted_label"].to_numpy() == float64["predicted_label"].to_numpy())
+    assert agreement >= 0.999
+    np.testing.assert_allclose(float32["confidence_score"], float64["confidence_score"], atol=1e-4)
+
+
+def test_bundle_matches_pickles(tmp_path, infiltration_df):
+    from backend.bundle import build_bundle
+
+    predictor = make_predictor()
+    paths = predictor.artifact_paths
+    build_bundle(tmp_path / "model.bundle", paths["model"], paths["scaler"], paths["encoder"], paths["pca"])
+    bundled = Predictor.from_bundle(tmp_path / "model.bundle")
+
+    assert isinstance(bundled.pca.components_, np.memmap)
+    assert bundled.fingerprint == predictor.fingerprint
+    pd.testing.assert_frame_equal(bundled.predict_frame(infiltration_df), predictor.predict_frame(infiltration_df))
+
+
+def test_warmup_scores_each_batch_size():
+    report = make_predictor().warmup(batch_sizes=(1, 16), rounds=2)
+
+    assert sorted(report) == [1, 16]
+    assert all(timing["last_seconds"] > 0 for timing in report.values())
+
+
+def test_predict_frame_reports_stage_timings(infiltration_df):
+    results = make_predictor(dedup=True).predict_frame(infiltration_df)
+    stages = results.attrs["stages"]
+    assert {"align", "dedup", "scale_pca", "model"} <= set(stages)
+    assert stages["model"][1] == results.attrs["dedup"]["unique_rows"]
+
+
+def test_model_predictor_shares_artifacts_with_predictor(infiltration_df):
+    from backend.utils.model_predictor import ModelPredictor
+
+    predictor = make_predictor()
+    model_predictor = ModelPredictor()
+    assert model_predictor.model is predictor.model
+
+    expected = predictor.predict_frame(infiltration_df)["predicted_label"].to_numpy()
+    np.testing.assert_array_equal(model_predictor.predict(infiltration_df), expected)
+    features = predictor.align(infiltration_df)
+    np.testing.assert_array_equal(model_predictor.predict(features), expected)
+
+
+def test_schema_plans_apply_the_predictor_nonfinite_policies(monkeypatch, infiltration_df):
+    from backend import config
+    from backend.predict import configured_predictor_options
+    from backend.registry import LoadedModel
+
+    monkeypatch.setattr(config, "NONFINITE_POLICIES", {"Flow Duration": {"clip": [0, 10]}})
+    options = configured_predictor_options()
+    assert options["nonfinite_policies"]["Flow Bytes/s"] == {"clip": (0.0, None)}
+
+    model = LoadedModel("v1", make_predictor(nonfinite_policies=options["nonfinite_policies"]), source={})
+    replaced = Counter()
+    features = model.schema_plan(infiltration_df.columns).align(infiltration_df, replaced=replaced)
+    assert features[:, model.feature_columns.index("Flow Duration")].max() == 10
+    assert replaced["Flow Duration"] > 0
@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from backend.flows import extract_flows
+from backend.ingest import detect_upload_format, iter_upload_chunks
+from test_flows import write_pcap
+from test_inference import DATA_DIR, make_predictor
+
+
+@pytest.mark.parametrize("content_type, filename, expected", [
+    ("text/csv", "flows.csv", "csv"),
+    ("application/octet-stream", "flows.parquet", "parquet"),
+    ("application/vnd.apache.parquet", "upload.bin", "parquet"),
+    ("application/vnd.apache.arrow.stream; charset=binary", None, "arrow"),
+    (None, "flows.FEATHER", "arrow"),
+    ("application/vnd.tcpdump.pcap", None, "pcap"),
+    ("application/octet-stream", "capture.pcapng", "pcap"),
+    ("application/octet-stream", "flows", "csv"),
+    (None, None, "csv"),
+])
+def test_detect_upload_format(content_type, filename, expected):
+    assert detect_upload_format(content_type, filename) == expected
+
+
+@pytest.fixture(scope="module")
+def flows():
+    return pd.read_csv(DATA_DIR / "infiltration.csv", nrows=2500)
+
+
+def arrow_file(df):
+    sink = BytesIO()
+    with pa.ipc.new_file(sink, pa.Schema.from_pandas(df, preserve_index=False)) as writer:
+        writer.write_table(pa.Table.from_pandas(df, preserve_index=False), max_chunksize=1000)
+    return sink.getvalue()
+
+
+def arrow_stream(df):
+    sink = BytesIO()
+    with pa.ipc.new_stream(sink, pa.Schema.from_pandas(df, preserve_index=False)) as writer:
+        writer.write_table(pa.Table.from_pandas(df, preserve_index=False))
+    return sink.getvalue()
+
+
+def parquet_file(df):
+    sink = BytesIO()
+    df.to_parquet(sink, row_group_size=1000)
+    return sink.getvalue()
+
+
+@pytest.mark.parametrize("upload_format, encode", [
+    ("parquet", parquet_file), ("arrow", arrow_file), ("arrow", arrow_stream),
+])
+def test_columnar_uploads_read_only_model_columns(flows, upload_format, encode):
+    predictor = make_predictor()
+    chunks = list(iter_upload_chunks(BytesIO(encode(flows)), upload_format, 700, predictor.schema_plan))
+
+    assert max(len(chunk) for chunk in chunks) <= 700
+    frame = pd.concat(chunks, ignore_index=True)
+    used = predictor.schema_plan(flows.columns).used_columns()
+    assert list(frame.columns) == used and len(used) < len(flows.columns) and len(frame) == len(flows)
+    pd.testing.assert_frame_equal(predictor.predict_frame(frame), predictor.predict_frame(flows))
+
+
+def test_pcap_uploads_are_scored_as_flows(tmp_path):
+    write_pcap(tmp_path / "flow.pcap")
+    chunks = list(iter_upload_chunks(BytesIO((tmp_path / "flow.pcap").read_bytes()), "pcap", 1))
+
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), extract_flows(tmp_path / "flow.pcap"))
@@ -0,0 +1,81 @@
+import io
+import threading
+import time
+
+import pytest
+
+from backend.executor import ServerBusyError
+from backend.jobs import JobManager, JobStore
+
+
+def wait_for(manager, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while manager.status(job_id)["status"] != status:
+        assert time.time() < deadline, manager.status(job_id)
+        time.sleep(0.01)
+    return manager.status(job_id)
+
+
+def count_rows(fileobj, upload_format, cheat_mode, on_progress):
+    rows = len(fileobj.read().splitlines()) - 1
+    on_progress(rows)
+    return {"total_flows": rows, "cheat_mode": cheat_mode}
+
+
+def test_job_runs_to_a_stored_result(tmp_path):
+    manager = JobManager(JobStore(tmp_path, ttl_seconds=60), count_rows, workers=1)
+    job_id = manager.submit(io.BytesIO(b"a,b\n1,2\n3,4\n"), "flows.csv", "csv", cheat_mode=False)
+
+    status = wait_for(manager, job_id, "done")
+    assert status["rows_scored"] == 2
+    assert manager.store.result_path(job_id).read_text() == '{"total_flows": 2, "cheat_mode": false}'
+    assert not manager.store.upload_path(job_id).exists()
+    manager.shutdown()
+
+
+def test_recover_requeues_jobs_with_uploads_and_fails_the_rest(tmp_path):
+    store = JobStore(tmp_path, ttl_seconds=60)
+    queued = store.create("queued.csv", "csv", cheat_mode=False)
+    store.upload_path(queued).write_bytes(b"a\n1\n")
+    running = store.create("running.csv", "csv", cheat_mode=False)
+    store.upload_path(running).write_bytes(b"a\n1\n2\n")
+    store.update(running, status="running", rows_scored=1)
+    lost = store.create("lost.csv", "csv", cheat_mode=False)
+    store.update(lost, status="running")
+
+    manager = JobManager(store, count_rows, workers=1)
+    assert manager.recover() == {"requeued": 2, "failed": 1}
+    assert wait_for(manager, queued, "done")["rows_scored"] == 1
+    assert wait_for(manager, running, "done")["rows_scored"] == 2
+    assert "restart" in manager.status(lost)["error"] and manager.status(lost)["status"] == "failed"
+    manager.shutdown()
+
+
+def test_submit_is_bounded_by_max_pending(tmp_path):
+    release = threading.Event()
+
+    def blocked(fileobj, upload_format, cheat_mode, on_progress):
+        release.wait(5)
+        return {"total_flows": 0}
+
+    manager = JobManager(JobStore(tmp_path, ttl_seconds=60), blocked, workers=1, max_pending=2)
+    first = manager.submit(io.BytesIO(b"a\n"), "1.csv", "csv", cheat_mode=False)
+    manager.submit(io.BytesIO(b"a\n"), "2.csv", "csv", cheat_mode=False)
+    with pytest.raises(ServerBusyError):
+        manager.submit(io.BytesIO(b"a\n"), "3.csv", "csv", cheat_mode=False)
+
+    release.set()
+    wait_for(manager, first, "done")
+    manager.submit(io.BytesIO(b"a\n"), "4.csv", "csv", cheat_mode=False)
+    manager.shutdown()
+
+
+def test_evict_expired_removes_rows_and_files(tmp_path):
+    store = JobStore(tmp_path, ttl_seconds=0)
+    job_id = store.create("old.csv", "csv", cheat_mode=False)
+    store.save_result(job_id, {"total_flows": 0})
+    time.sleep(0.01)
+
+    assert store.evict_expired() == 1
+    assert store.get(job_id) is None
+    assert not store.result_path(job_id).exists()
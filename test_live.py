@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from backend.live import LiveScorer, print_alerts, tail_csv
+from test_inference import DATA_DIR, make_predictor
+
+
+def next_frame(source, polls=50):
+    for _ in range(polls):
+        frame = next(source)
+        if frame is not None:
+            return frame
+    raise AssertionError("no rows were read")
+
+
+def test_tail_csv_skips_the_line_it_starts_inside(tmp_path):
+    path = tmp_path / "flows.csv"
+    path.write_bytes(b"a,b\n1,2\n3,4")
+    source = tail_csv(path, poll_interval=0.01)
+    assert next(source) is None
+
+    with open(path, "ab") as f:
+        f.write(b"4\n5,6\n")
+    assert next_frame(source).values.tolist() == [[5, 6]]
+
+
+def test_tail_csv_waits_for_a_missing_or_rotated_file(tmp_path):
+    path = tmp_path / "flows.csv"
+    source = tail_csv(path, poll_interval=0.01)
+    assert next(source) is None and next(source) is None
+
+    path.write_bytes(b"a,b\n1,2\n")
+    assert next_frame(source).values.tolist() == [[1, 2]]
+
+    # Rotated away and not recreated yet
+    path.rename(tmp_path / "flows.csv.1")
+    assert next(source) is None and next(source) is None
+    path.write_bytes(b"a,b\n3,4\n")
+    assert next_frame(source).values.tolist() == [[3, 4]]
+
+
+def test_tail_csv_skips_malformed_lines(tmp_path):
+    path = tmp_path / "flows.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    errors = []
+    source = tail_csv(path, from_start=True, poll_interval=0.01, on_error=errors.append)
+    assert next_frame(source).values.tolist() == [[1, 2]]
+
+    with open(path, "ab") as f:
+        f.write(b"1,2,3,4\n7,8\n")
+    assert next_frame(source).values.tolist() == [[7, 8]]
+    assert len(errors) == 1
+
+
+class FailingOnce:
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.calls = 0
+
+    def predict_frame(self, rows):
+        self.calls += 1
+        if self.calls == 1:
+            raise ValueError("bad batch")
+        return self.predictor.predict_frame(rows)
+
+
+def test_live_scorer_counts_a_failed_batch_and_continues():
+    rows = pd.read_csv(DATA_DIR / "infiltration.csv", nrows=30)
+    scorer = LiveScorer(FailingOnce(make_predictor()), max_batch_rows=10, max_wait_seconds=60)
+    scorer.run([rows[:10], None, rows[10:20], rows[20:25]])
+
+    stats = scorer.stats()
+    assert stats["errors"] == 1 and stats["dropped_rows"] == 10
+    assert "bad batch" in stats["last_error"]
+    assert scorer.batches == 2 and sum(scorer.totals.values()) == 15
+
+
+def test_live_scorer_survives_a_failing_source():
+    def source():
+        yield pd.read_csv(DATA_DIR / "infiltration.csv", nrows=5)
+        raise OSError("capture closed")
+
+    scorer = LiveScorer(make_predictor(), max_batch_rows=100, max_wait_seconds=60)
+    scorer.run(source())
+    assert scorer.errors == 1 and sum(scorer.totals.values()) == 5
+
+
+def test_print_alerts_without_a_confidence(capsys):
+    rows = pd.DataFrame({"Flow ID": ["f1", "f2"]})
+    results = pd.DataFrame({"predicted_label": ["Infilteration", "DDoS"], "confidence_score": [None, np.nan]})
+    print_alerts(rows, results)
+    assert capsys.readouterr().out.count("(n/a)") == 2
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from backend.metrics import StageMetrics, StageTimer, timed_chunks
+
+
+def test_stage_timer_breakdown_in_pipeline_order():
+    timer = StageTimer()
+    timer.merge({"model": (0.2, 100), "align": (0.1, 100)})
+    with timer.stage("serialize", 100):
+        pass
+    chunks = list(timed_chunks([pd.DataFrame({"a": range(60)}), pd.DataFrame({"a": range(40)})], timer))
+
+    assert len(chunks) == 2
+    breakdown = timer.breakdown()
+    assert list(breakdown) == ["parse", "align", "model", "serialize"]
+    assert breakdown["parse"]["rows"] == 100
+    assert breakdown["model"]["rows_per_second"] == 500.0
+    assert all(stage["rss_after_mb"] > 0 for stage in breakdown.values())
+    assert timer.server_timing().startswith("parse;dur=")
+
+
+def test_stage_metrics_render_prometheus_text():
+    timer = StageTimer()
+    timer.merge({"align": (0.002, 10), "model": (0.2, 10)})
+    metrics = StageMetrics()
+    metrics.observe(timer, "predict", "ok", 0.5, 10)
+    metrics.observe(StageTimer(), "predict", "error", 0.1)
+    text = metrics.render({"cache_entries": ("Cached results.", 3)})
+
+    assert 'ids_stage_seconds_bucket{stage="align",le="0.0025"} 1' in text
+    assert 'ids_stage_seconds_count{stage="model"} 1' in text
+    assert 'ids_stage_rows_total{stage="model"} 10' in text
+    assert 'ids_stage_rss_after_bytes{stage="model"}' in text
+    assert 'ids_requests_total{endpoint="predict",status="error"} 1' in text
+    assert "ids_flows_scored_total 10" in text
+    assert "ids_process_peak_resident_memory_bytes" in text
+    assert "ids_cache_entries 3" in text
+
+
+def test_rss_helpers_without_proc(monkeypatch):
+    import builtins
+    from backend import bundle
+
+    real_open = builtins.open
+
+    def no_proc(path, *args, **kwargs):
+        if str(path).startswith("/proc/"):
+            raise FileNotFoundError(path)
+        return real_open(path, *args, **kwargs)
+
+    assert bundle.process_rss_mb() > 0 and bundle.process_peak_rss_mb() >= bundle.process_rss_mb()
+    monkeypatch.setattr(builtins, "open", no_proc)
+    # Current RSS is unknown; the peak comes from ru_maxrss
+    assert bundle.process_rss_mb() is None
+    assert bundle.process_peak_rss_mb() > 0
@@ -0,0 +1,97 @@
+import time
+
+import pandas as pd
+import pytest
+
+from backend.registry import ModelRegistry, ModelManager
+from test_inference import make_predictor, infiltration_df  # noqa: F401
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(tmp_path / "registry")
+    paths = make_predictor().artifact_paths
+    for version in ("v1", "v2"):
+        registry.publish(version, paths["model"], paths["scaler"], paths["encoder"], paths["pca"])
+    registry.set_active("v1")
+    return registry
+
+
+def test_reload_swaps_active_version_without_disturbing_leases(registry, infiltration_df):
+    manager = ModelManager(registry, fallback_source={}, predictor_options={})
+    assert manager.active.version == "v1"
+    in_flight = manager.lease()
+
+    assert manager.reload("v2", warmup=((1, 8), 1))
+    for _ in range(100):
+        if manager.reload_status["status"] in ("done", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert manager.reload_status["status"] == "done"
+    assert manager.active.version == "v2"
+    assert in_flight.version == "v1"
+    expected = make_predictor().predict_frame(infiltration_df)
+    pd.testing.assert_frame_equal(in_flight.predictor.predict_frame(infiltration_df), expected)
+    in_flight.release()
+
+    pinned = manager.lease("v1")
+    assert pinned.version == "v1" and manager.active.version == "v2"
+    pinned.release()
+    with pytest.raises(KeyError):
+        manager.lease("missing")
+    manager.shutdown()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_watcher_retries_a_failed_version_with_backoff(registry):
+    paths = make_predictor().artifact_paths
+    registry.publish("v3", paths["model"], paths["scaler"], paths["encoder"], paths["pca"])
+    good_bundle = registry.bundle_path("v3").read_bytes()
+    registry.bundle_path("v3").write_bytes(b"not a bundle")
+
+    manager = ModelManager(registry, fallback_source={}, predictor_options={})
+    attempts = []
+    load = manager._load
+    manager._load = lambda version, serve=False: attempts.append(version) or load(version, serve)
+    registry.set_active("v3")
+    manager.watch(0.02, max_backoff=0.16)
+
+    wait_for(lambda: len(attempts) >= 4)
+    assert manager.active.version == "v1" and manager.reload_status["failures"] >= 4
+    # Backoff: 0.04 + 0.08 + 0.16 s between the first four attempts, where
+    # polling alone would have retried about 14 times
+    time.sleep(0.3)
+    assert len(attempts) <= 7
+
+    registry.bundle_path("v3").write_bytes(good_bundle)
+    wait_for(lambda: manager.active.version == "v3", timeout=5)
+    assert "v3" not in manager._failures
+    manager.shutdown()
+
+
+def test_reload_endpoint_leaves_active_alone_when_busy(registry, monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend import main
+
+    manager = ModelManager(registry, fallback_source={}, predictor_options={})
+    monkeypatch.setattr(main, "models", manager)
+    client = TestClient(main.app)
+
+    manager._reload_lock.acquire()
+    assert client.post("/models/reload", params={"version": "v2"}).status_code == 409
+    assert registry.active_version() == "v1"
+    manager._reload_lock.release()
+
+    assert client.post("/models/reload", params={"version": "missing"}).status_code == 404
+    assert client.post("/models/reload", params={"version": "v2"}).status_code == 202
+    assert registry.active_version() == "v2"
+    wait_for(lambda: manager.reload_status["status"] in ("done", "failed"))
+    assert manager.active.version == "v2"
+    manager.shutdown()
@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.predict import RESULT_COLUMNS
+from backend.responses import arrow_results, columnar_results, ndjson_lines
+from test_inference import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def responses():
+    from backend import main
+
+    client = TestClient(main.app)
+    upload = pd.read_csv(DATA_DIR / "infiltration.csv", nrows=1200).to_csv(index=False).encode()
+
+    def post(response_format):
+        response = client.post("/predict", params={"response_format": response_format, "chunk_size": 500},
+                               files={"csv_file": ("flows.csv", upload, "text/csv")})
+        assert response.status_code == 200
+        return response
+
+    return {response_format: post(response_format) for response_format in ("json", "ndjson", "columnar", "arrow")}
+
+
+@pytest.fixture(scope="module")
+def expected(responses):
+    body = responses["json"].json()
+    assert body["total_flows"] == len(body["detailed_results"]) == 1200
+    return body
+
+
+def test_ndjson_has_a_line_per_flow_then_the_summary(responses, expected):
+    response = responses["ndjson"]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert lines[:-1] == expected["detailed_results"]
+    summary = lines[-1]["summary"]
+    assert summary["total_flows"] == 1200 and summary["attack_counts"] == expected["attack_counts"]
+
+
+def test_columnar_lists_each_label_once(responses, expected):
+    body = responses["columnar"].json()
+    assert len(body["labels"]) == len(set(body["labels"])) == len(expected["attack_counts"])
+
+    rows = expected["detailed_results"]
+    assert [body["labels"][code] for code in body["label_codes"]] == [row["predicted_label"] for row in rows]
+    assert [body["explanations"][code] for code in body["explanation_codes"]] == [row["explanation"] for row in rows]
+    assert body["confidence_scores"] == [row["confidence_score"] for row in rows]
+    assert body["total_flows"] == 1200
+
+
+def test_arrow_is_a_dictionary_encoded_stream(responses, expected):
+    table = pa.ipc.open_stream(responses["arrow"].content).read_all()
+    assert pa.types.is_dictionary(table.schema.field("predicted_label").type)
+    assert table.column("predicted_label").to_pylist() == [row["predicted_label"] for row in expected["detailed_results"]]
+
+    summary = json.loads(table.schema.metadata[b"summary"])
+    assert summary["total_flows"] == table.num_rows == 1200
+    assert summary["attack_counts"] == expected["attack_counts"]
+
+
+def test_empty_results_keep_their_shape():
+    empty = pd.DataFrame(columns=RESULT_COLUMNS)
+    assert ndjson_lines(empty) == b""
+    assert columnar_results([empty])["label_codes"] == []
+    table = pa.ipc.open_stream(arrow_results([], {"total_flows": 0})).read_all()
+    assert table.num_rows == 0 and table.column_names == ["predicted_label", "confidence_score", "explanation"]
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from backend.registry import LoadedModel
+from backend.shadow import ShadowScorer, ShadowMetrics, shares_preprocessing
+from test_inference import make_predictor, infiltration_df  # noqa: F401
+
+
+def test_shadow_reuses_projection_and_records_agreement(tmp_path, infiltration_df):
+    primary = make_predictor(dedup=True)
+    shadow = make_predictor()
+    assert shares_preprocessing(primary, shadow)
+
+    scorer = ShadowScorer(shadow, "candidate", ShadowMetrics(tmp_path / "shadow.sqlite3"), sample_rate=1.0)
+    capture = {}
+    results = primary.predict_frame(infiltration_df, capture=capture)
+    assert capture["projected"].shape[0] == results.attrs["dedup"]["unique_rows"]
+
+    scorer.submit(LoadedModel("current", primary, source={}), None, results, 0.01, capture)
+    scorer.shutdown()
+
+    [comparison] = scorer.stats()["comparisons"]
+    assert comparison["rows"] == len(infiltration_df)
+    assert comparison["agreement"] == 1.0
+    assert comparison["reused_projection_batches"] == 1
+    # Both sides time the model stage only
+    assert comparison["primary_seconds"] == round(results.attrs["stages"]["model"][0], 6)
+    assert sum(sum(counts.values()) for counts in comparison["confusion"].values()) == len(infiltration_df)
+
+
+def test_shadow_scores_the_primarys_distinct_rows(tmp_path, infiltration_df):
+    # Rows from the row cache have no projection to reuse
+    primary = make_predictor(dedup=True, row_cache_size=1000)
+    scorer = ShadowScorer(make_predictor(), "candidate", ShadowMetrics(tmp_path / "shadow.sqlite3"), sample_rate=1.0)
+    capture = {}
+    results = primary.predict_frame(infiltration_df, capture=capture)
+    assert "projected" not in capture and len(capture["rows"]) == results.attrs["dedup"]["unique_rows"]
+
+    scorer.submit(LoadedModel("current", primary, source={}), None, results, 0.01, capture)
+    scorer.shutdown()
+
+    [comparison] = scorer.stats()["comparisons"]
+    assert comparison["rows"] == len(infiltration_df)
+    assert comparison["agreement"] == 1.0
+    assert comparison["reused_projection_batches"] == 0
+    stages = results.attrs["stages"]
+    expected = sum(stages[name][0] for name in ("scale", "pca", "scale_pca", "model") if name in stages)
+    assert comparison["primary_seconds"] == round(expected, 6)
+
+
+def test_shadow_rescores_features_in_its_own_column_order(tmp_path, infiltration_df):
+    shadow = make_predictor()
+    results = shadow.predict_frame(infiltration_df)
+    # A primary trained on the same features in reverse order
+    primary = SimpleNamespace(feature_columns=shadow.feature_columns[::-1])
+    features = shadow.align(infiltration_df)[:, ::-1]
+
+    scorer = ShadowScorer(shadow, "candidate", ShadowMetrics(tmp_path / "shadow.sqlite3"), sample_rate=1.0)
+    scorer.submit(LoadedModel("current", primary, source={}), features, results, 0.01)
+    scorer.shutdown()
+
+    assert scorer.failed == 0
+    [comparison] = scorer.stats()["comparisons"]
+    assert comparison["rows"] == len(infiltration_df)
+    assert comparison["agreement"] == 1.0
+    assert comparison["reused_projection_batches"] == 0
+    # Both sides time a whole predict_frame
+    assert comparison["primary_seconds"] == 0.01